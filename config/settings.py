@@ -37,7 +37,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',   # ← sirve estáticos en producción
+    'votacion.estaticos.WhiteNoiseAsgi',            # ← sirve estáticos en producción (WhiteNoise, también bajo ASGI)
+    'votacion.metricas.MetricasMiddleware',         # ← Server-Timing y agregados por vista
+    'votacion.replica.ReplicaMiddleware',           # ← tras escribir, lee de la primaria un rato
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -50,7 +52,8 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que además mide el tiempo de render (votacion/metricas.py)
+        'BACKEND': 'votacion.metricas.PlantillasMedidas',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -65,15 +68,37 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 # ── Base de datos ─────────────────────────────────────────────────
 # En Railway llega DATABASE_URL automáticamente con PostgreSQL.
 # En local usa SQLite si no hay DATABASE_URL.
 DATABASE_URL = config('DATABASE_URL', default=None)
+# Réplica de solo lectura opcional para las vistas analíticas y la consulta
+# pública (votacion/replica.py). En local sirve una copia del archivo SQLite.
+DATABASE_REPLICA_URL = config('DATABASE_REPLICA_URL', default=None)
+# Pool de conexiones por proceso (votacion/pool_bd): acota las conexiones a
+# workers × BD_POOL_MAX en lugar de una persistente por hilo
+BD_POOL = config('BD_POOL', default=False, cast=bool)
+
+
+def _base_de_datos(url):
+    base = dj_database_url.parse(url, conn_max_age=600)
+    if BD_POOL and base['ENGINE'].endswith('postgresql'):
+        base['ENGINE'] = 'votacion.pool_bd'
+        base['CONN_MAX_AGE'] = 0
+        base.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': config('BD_POOL_MIN', default=2, cast=int),
+            'max_size': config('BD_POOL_MAX', default=10, cast=int),
+            'timeout': config('BD_POOL_TIMEOUT', default=10, cast=float),
+            'pre_ping': config('BD_POOL_PRE_PING', default=True, cast=bool),
+        }
+    return base
+
 
 if DATABASE_URL:
     DATABASES = {
-        'default': dj_database_url.parse(DATABASE_URL, conn_max_age=600)
+        'default': _base_de_datos(DATABASE_URL)
     }
 else:
     DATABASES = {
@@ -83,6 +108,15 @@ else:
         }
     }
 
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = _base_de_datos(DATABASE_REPLICA_URL)
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['votacion.replica.RouterReplica']
+# Segundos que un usuario lee de la primaria después de escribir (cubre el
+# retraso de replicación en el redirect y la página siguiente)
+REPLICA_FIJAR_SEGUNDOS = config('REPLICA_FIJAR_SEGUNDOS', default=15, cast=int)
+
 # ── Validación de contraseñas ─────────────────────────────────────
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -107,6 +141,61 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL  = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# ── Caché ─────────────────────────────────────────────────────────
+# Por defecto en disco, compartida entre los workers de gunicorn del mismo
+# contenedor. Se puede cambiar el backend por variable de entorno.
+# MAX_ENTRIES: con el valor de Django (300) la caché en disco descarta
+# entradas al azar en cuanto hay más claves en uso.
+CACHES = {
+    'default': {
+        'BACKEND':  config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache' / 'django')),
+        'OPTIONS':  {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=20000, cast=int)},
+    }
+}
+
+# Segundos entre recálculos completos (COUNT) de un contador del dashboard
+CONTADORES_TTL = config('CONTADORES_TTL', default=300, cast=int)
+# Segundos que vive el fragmento de estadísticas de un evento (se renueva antes
+# con cada encuesta; el TTL solo acota el atraso si se leyó de la réplica)
+ESTADISTICAS_CACHE_TTL = config('ESTADISTICAS_CACHE_TTL', default=600, cast=int)
+# Estadísticas en vivo (votacion/en_vivo.py): sondeo del difusor bajo ASGI y
+# reconexión del navegador bajo WSGI
+EN_VIVO_INTERVALO = config('EN_VIVO_INTERVALO', default=1.0, cast=float)
+EN_VIVO_REINTENTO_MS = config('EN_VIVO_REINTENTO_MS', default=3000, cast=int)
+
+# ── Mapa de calor: teselas precalculadas en disco ─────────────────
+TESELAS_DIR = config('TESELAS_DIR', default=str(BASE_DIR / 'cache' / 'teselas'))
+
+# ── Métricas por petición (votacion/metricas.py) ──────────────────
+# Fracción de peticiones medidas (0 desactiva, 1 mide todas); medir cuesta un
+# wrapper por consulta y una línea de log, así que por defecto solo el 1 %
+METRICAS_MUESTREO = config('METRICAS_MUESTREO', default=0.01, cast=float)
+# Cabecera Server-Timing en las peticiones medidas, solo para usuarios staff
+# (expone tiempos y número de consultas)
+METRICAS_SERVER_TIMING = config('METRICAS_SERVER_TIMING', default=True, cast=bool)
+# Minutos de agregados por vista que se conservan en caché
+METRICAS_VENTANA_MINUTOS = config('METRICAS_VENTANA_MINUTOS', default=120, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'mensaje': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'metricas': {'class': 'logging.StreamHandler', 'formatter': 'mensaje'},
+    },
+    'loggers': {
+        # Una línea JSON por petición medida
+        'votacion.metricas': {
+            'handlers': ['metricas'],
+            'level': config('METRICAS_LOG_NIVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # ── Misc ──────────────────────────────────────────────────────────
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -1,7 +1,17 @@
 from django.contrib import admin
+from import_export import resources
 from import_export.admin import ImportExportModelAdmin
+from .cedulas import normalizar as normalizar_cedula
 from .models import (Departamento, Municipio, PuestoVotacion, MesaVotacion,
-                     EventoElectoral, PartidoPolitico, Candidato, Votante, Encuesta)
+                     EventoElectoral, PartidoPolitico, Candidato, Votante, Encuesta,
+                     ConteoEncuesta, EncuestasPorDia, EncuestasPorHora)
+
+
+class MunicipioListFilter(admin.RelatedFieldListFilter):
+    """Filtro por municipio sin una consulta por opción (el __str__ muestra el departamento)."""
+
+    def field_choices(self, field, request, model_admin):
+        return [(m.pk, str(m)) for m in Municipio.objects.select_related('departamento')]
 
 
 @admin.register(Departamento)
@@ -20,13 +30,15 @@ class MunicipioAdmin(admin.ModelAdmin):
 @admin.register(PuestoVotacion)
 class PuestoVotacionAdmin(admin.ModelAdmin):
     list_display = ['nombre', 'municipio', 'direccion', 'codigo']
-    list_filter = ['municipio__departamento', 'municipio']
+    list_select_related = ['municipio__departamento']
+    list_filter = ['municipio__departamento', ('municipio', MunicipioListFilter)]
     search_fields = ['nombre', 'codigo', 'direccion']
 
 
 @admin.register(MesaVotacion)
 class MesaVotacionAdmin(admin.ModelAdmin):
     list_display = ['numero', 'puesto', 'zona']
+    list_select_related = ['puesto__municipio']
     list_filter = ['puesto__municipio__departamento']
     search_fields = ['puesto__nombre']
 
@@ -47,14 +59,27 @@ class PartidoPoliticoAdmin(admin.ModelAdmin):
 @admin.register(Candidato)
 class CandidatoAdmin(ImportExportModelAdmin):
     list_display = ['apellidos', 'nombres', 'evento', 'partido', 'cargo_aspirado', 'activo']
+    list_select_related = ['evento', 'partido']
     list_filter = ['evento', 'partido', 'activo', 'departamento']
     search_fields = ['nombres', 'apellidos', 'cedula']
 
 
+class VotanteResource(resources.ModelResource):
+    class Meta:
+        model = Votante
+
+    def before_import_row(self, row, **kwargs):
+        # Misma llave que VotanteForm: cédula normalizada
+        if row.get('cedula') is not None:
+            row['cedula'] = normalizar_cedula(str(row['cedula']))
+
+
 @admin.register(Votante)
 class VotanteAdmin(ImportExportModelAdmin):
+    resource_classes = [VotanteResource]
     list_display = ['cedula', 'apellidos', 'nombres', 'departamento', 'municipio', 'puesto', 'mesa']
-    list_filter = ['departamento', 'municipio']
+    list_select_related = ['departamento', 'municipio__departamento', 'puesto__municipio', 'mesa__puesto']
+    list_filter = ['departamento', ('municipio', MunicipioListFilter)]
     search_fields = ['cedula', 'nombres', 'apellidos']
     readonly_fields = ['creado_en', 'actualizado_en']
 
@@ -62,6 +87,33 @@ class VotanteAdmin(ImportExportModelAdmin):
 @admin.register(Encuesta)
 class EncuestaAdmin(admin.ModelAdmin):
     list_display = ['votante', 'evento', 'candidato', 'encuestador', 'fecha']
+    list_select_related = ['votante', 'evento', 'candidato__evento', 'encuestador']
     list_filter = ['evento', 'candidato__partido', 'encuestador']
     search_fields = ['votante__cedula', 'votante__nombres', 'votante__apellidos']
     readonly_fields = ['fecha', 'actualizado_en']
+
+
+@admin.register(ConteoEncuesta)
+class ConteoEncuestaAdmin(admin.ModelAdmin):
+    list_display = ['evento', 'candidato', 'votos', 'actualizado_en']
+    list_filter = ['evento']
+    list_select_related = ['evento', 'candidato__evento']
+    readonly_fields = ['evento', 'candidato', 'votos', 'actualizado_en']
+
+
+@admin.register(EncuestasPorDia)
+class EncuestasPorDiaAdmin(admin.ModelAdmin):
+    list_display = ['dia', 'evento', 'encuestador', 'municipio', 'encuestas']
+    list_filter = ['evento']
+    list_select_related = ['evento', 'encuestador', 'municipio__departamento']
+    readonly_fields = ['evento', 'encuestador', 'municipio', 'dia', 'encuestas']
+    date_hierarchy = 'dia'
+
+
+@admin.register(EncuestasPorHora)
+class EncuestasPorHoraAdmin(admin.ModelAdmin):
+    list_display = ['hora', 'evento', 'encuestador', 'municipio', 'encuestas']
+    list_filter = ['evento']
+    list_select_related = ['evento', 'encuestador', 'municipio__departamento']
+    readonly_fields = ['evento', 'encuestador', 'municipio', 'hora', 'encuestas']
+    date_hierarchy = 'hora'
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class VotacionConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'votacion'
+
+    def ready(self):
+        from . import metricas, signals  # noqa: F401  (registran los receptores)
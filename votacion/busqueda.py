@@ -0,0 +1,88 @@
+"""
+Búsqueda de votantes por nombre, indexada y tolerante a tildes.
+
+Votante.busqueda guarda "apellidos nombres" en minúscula, sin tildes ni
+signos ("Muñoz Peña Ana" → "munoz pena ana"); la señal pre_save y la carga
+masiva la mantienen. Sobre esa columna:
+
+- PostgreSQL: índice GIN de trigramas (pg_trgm). Cada palabra buscada debe
+  parecerse a alguna palabra del nombre (operador <%), y el resultado se
+  ordena por word_similarity, así "Munos" encuentra "Muñoz".
+- SQLite: tabla FTS5 con tokenizador trigram (votacion_votante_fts) que
+  triggers mantienen en sincronía; encuentra subcadenas y ordena por bm25.
+
+Las palabras de menos de 3 letras no tienen trigramas: se exigen con LIKE.
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import BooleanField, F, FloatField, Func, Q, Value
+
+TABLA_FTS = 'votacion_votante_fts'
+MIN_TRIGRAMA = 3
+
+_NO_ALFANUMERICO = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar(texto):
+    """'  Muñoz-Peña ' → 'munoz pena'."""
+    sin_tildes = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode()
+    return ' '.join(_NO_ALFANUMERICO.sub(' ', sin_tildes.lower()).split())
+
+
+def texto_votante(apellidos, nombres):
+    return normalizar(f'{apellidos} {nombres}')[:310]
+
+
+class _PalabraSimilar(Func):
+    # 'palabra' <% busqueda: usa el índice GIN gin_trgm_ops
+    arg_joiner = ' <%% '
+    template = '%(expressions)s'
+    output_field = BooleanField()
+
+
+class _SimilitudPalabra(Func):
+    function = 'WORD_SIMILARITY'
+    output_field = FloatField()
+
+
+def _postgresql(qs, largas):
+    similitud = None
+    for palabra in largas:
+        qs = qs.filter(_PalabraSimilar(Value(palabra), F('busqueda')))
+        termino = _SimilitudPalabra(Value(palabra), F('busqueda'))
+        similitud = termino if similitud is None else similitud + termino
+    return qs.annotate(similitud=similitud).order_by('-similitud', 'apellidos', 'nombres', 'id')
+
+
+def _sqlite(qs, largas):
+    consulta = ' '.join('"%s"' % palabra for palabra in largas)
+    tabla = qs.model._meta.db_table
+    return qs.extra(
+        tables=[TABLA_FTS],
+        where=[f'{TABLA_FTS}.rowid = {tabla}.id', f'{TABLA_FTS} MATCH %s'],
+        params=[consulta],
+        # bm25 es más negativo cuanto mejor coincide
+        select={'similitud': f'-{TABLA_FTS}.rank'},
+    ).order_by('-similitud', 'apellidos', 'nombres', 'id')
+
+
+def filtrar(qs, texto):
+    """Filtra un queryset de Votante por nombre y lo ordena por similitud."""
+    palabras = normalizar(texto).split()
+    if not palabras:
+        return qs
+    largas = [p for p in palabras if len(p) >= MIN_TRIGRAMA]
+    for corta in palabras:
+        if len(corta) < MIN_TRIGRAMA:
+            qs = qs.filter(Q(busqueda__startswith=corta) | Q(busqueda__contains=' ' + corta))
+    if not largas:
+        return qs
+    if connection.vendor == 'postgresql':
+        return _postgresql(qs, largas)
+    if connection.vendor == 'sqlite':
+        return _sqlite(qs, largas)
+    for palabra in largas:
+        qs = qs.filter(busqueda__contains=palabra)
+    return qs
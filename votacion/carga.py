@@ -0,0 +1,133 @@
+"""
+Inserción masiva de votantes (upsert por cédula).
+
+En PostgreSQL cada lote se copia con COPY a una tabla temporal y se pasa a
+votacion_votante con INSERT ... ON CONFLICT (cedula) DO UPDATE; en SQLite
+se ejecuta ese mismo INSERT con executemany (compilar el SQL con el ORM
+costaba más que insertar) y en otros motores se usa
+bulk_create(update_conflicts=True). Ningún camino dispara señales, así que
+al terminar hay que llamar a `despues_de_carga()` para refrescar las tablas
+y cachés derivadas.
+
+Solo se actualizan las columnas que traen las filas (más 'busqueda'): un
+archivo parcial no borra los datos que no incluye. Las filas nuevas toman el
+valor por defecto del modelo en las columnas que faltan.
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import busqueda, cedulas, contadores, estadisticas, teselas
+from .models import Departamento, MesaVotacion, Municipio, PuestoVotacion, Votante
+
+# Campos que se cargan/actualizan (además de creado_en / actualizado_en)
+CAMPOS = [
+    'cedula', 'nombres', 'apellidos', 'email', 'telefono', 'fecha_nacimiento',
+    'departamento_id', 'municipio_id', 'puesto_id', 'mesa_id',
+    'direccion', 'barrio', 'latitud', 'longitud', 'busqueda',
+]
+
+
+class MapaCodigos:
+    """Códigos DIVIPOLA/puesto/mesa → ids, construidos una sola vez en memoria."""
+
+    def __init__(self):
+        self.departamentos = dict(Departamento.objects.values_list('codigo', 'id'))
+        self.municipios = dict(Municipio.objects.values_list('codigo', 'id'))
+        self.municipio_departamento = dict(Municipio.objects.values_list('id', 'departamento_id'))
+        self.puestos = {
+            (municipio_id, codigo): pk
+            for pk, municipio_id, codigo in PuestoVotacion.objects.exclude(codigo='')
+            .values_list('id', 'municipio_id', 'codigo').iterator()
+        }
+        self.mesas = {
+            (puesto_id, numero): pk
+            for pk, puesto_id, numero in MesaVotacion.objects.values_list('id', 'puesto_id', 'numero').iterator()
+        }
+
+
+def _columna(campo):
+    return Votante._meta.get_field(campo).column
+
+
+def _columnas():
+    return [_columna(c) for c in CAMPOS] + ['creado_en', 'actualizado_en']
+
+
+def _actualizar(campos, excluido):
+    """SET del ON CONFLICT: solo las columnas cargadas, nunca la cédula ni creado_en."""
+    columnas = [_columna(c) for c in campos if c != 'cedula'] + ['actualizado_en']
+    return ', '.join(f'{c} = {excluido}.{c}' for c in columnas)
+
+
+def _valores(fila):
+    return [fila[c] if c in fila else Votante._meta.get_field(c).get_default() for c in CAMPOS]
+
+
+def _upsert_copy(filas, campos):
+    columnas = _columnas()
+    lista = ', '.join(columnas)
+    actualizar = _actualizar(campos, 'EXCLUDED')
+    ahora = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMP TABLE IF NOT EXISTS tmp_carga_votantes AS '
+            f'SELECT {lista} FROM {Votante._meta.db_table} WITH NO DATA'
+        )
+        cursor.execute('TRUNCATE tmp_carga_votantes')
+        with cursor.cursor.copy(f'COPY tmp_carga_votantes ({lista}) FROM STDIN') as copia:
+            for fila in filas:
+                copia.write_row(_valores(fila) + [ahora, ahora])
+        cursor.execute(
+            f'INSERT INTO {Votante._meta.db_table} ({lista}) '
+            f'SELECT {lista} FROM tmp_carga_votantes '
+            f'ON CONFLICT (cedula) DO UPDATE SET {actualizar}'
+        )
+
+
+def _upsert_executemany(filas, campos):
+    lista = ', '.join(_columnas())
+    ahora = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {Votante._meta.db_table} ({lista}) '
+            f'VALUES ({", ".join(["%s"] * (len(CAMPOS) + 2))}) '
+            f'ON CONFLICT (cedula) DO UPDATE SET {_actualizar(campos, "excluded")}',
+            [_valores(fila) + [ahora, ahora] for fila in filas],
+        )
+
+
+def _upsert_orm(filas, campos):
+    Votante.objects.bulk_create(
+        [Votante(**fila) for fila in filas],
+        update_conflicts=True,
+        unique_fields=['cedula'],
+        update_fields=[c for c in campos if c != 'cedula'] + ['actualizado_en'],
+    )
+
+
+def upsert_votantes(filas, usar_copy=True):
+    """Inserta o actualiza (por cédula) una lista de dicts con claves de CAMPOS.
+
+    Todas las filas deben traer las mismas claves (cedula, nombres y apellidos
+    siempre); en las existentes solo se actualizan esas. 'busqueda' se calcula
+    aquí a partir de apellidos y nombres."""
+    if not filas:
+        return
+    for fila in filas:
+        fila['busqueda'] = busqueda.texto_votante(fila['apellidos'], fila['nombres'])
+    campos = [c for c in CAMPOS if c in filas[0]]
+    with transaction.atomic():
+        if usar_copy and connection.vendor == 'postgresql':
+            _upsert_copy(filas, campos)
+        elif connection.vendor == 'sqlite':
+            _upsert_executemany(filas, campos)
+        else:
+            _upsert_orm(filas, campos)
+
+
+def despues_de_carga(teselas_z8=()):
+    """Refresca contadores, cédulas en caché y versiones de teselas y de estadísticas tras una carga sin señales."""
+    contadores.reconciliar()
+    cedulas.limpiar()
+    estadisticas.invalidar_todos()
+    teselas.invalidar_teselas(teselas_z8)
@@ -0,0 +1,137 @@
+"""
+Normalización y búsqueda de cédulas.
+
+Todas las cédulas se guardan normalizadas (solo letras y dígitos, en
+mayúscula y sin ceros a la izquierda), de modo que "01.234.567", "1 234 567"
+y "1234567" son la misma llave. `buscar()` resuelve una cédula a los datos de
+consulta del votante (puesto y mesa) pasando por la caché compartida de
+Django: los aciertos viven TTL_POSITIVO segundos y los fallos TTL_NEGATIVO.
+Las claves llevan una versión: las señales de Votante borran las cédulas
+afectadas y los cambios de geografía o las cargas masivas cambian la versión,
+lo que invalida todo en todos los workers a la vez. `abuscar()` es la misma
+búsqueda para las vistas async, con el ORM y la caché async.
+"""
+import re
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Votante
+
+PREFIJO = 'cedula:'
+CLAVE_VERSION = PREFIJO + 'version'
+TTL_POSITIVO = 300
+TTL_NEGATIVO = 30
+
+_NO_ALFANUMERICO = re.compile(r'[^0-9A-Za-z]')
+
+
+def normalizar(cedula):
+    """'01.234.567 ' → '1234567'. Devuelve '' si no queda ningún carácter válido."""
+    limpio = _NO_ALFANUMERICO.sub('', cedula or '').upper()
+    return limpio.lstrip('0') or limpio[:1]
+
+
+def _version():
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        # add: si otro worker la creó primero se usa la suya
+        nueva = format(time.time_ns(), 'x')
+        cache.add(CLAVE_VERSION, nueva, None)
+        version = cache.get(CLAVE_VERSION, nueva)
+    return version
+
+
+def _clave(version, cedula):
+    return f'{PREFIJO}{version}:{cedula}'
+
+
+def _filas(cedula):
+    return Votante.objects.filter(cedula=cedula).values(
+        'id', 'cedula', 'nombres', 'apellidos',
+        'departamento__nombre', 'municipio__nombre', 'municipio__departamento__nombre',
+        'puesto_id', 'puesto__nombre', 'puesto__direccion',
+        'mesa_id', 'mesa__numero', 'mesa__zona',
+    )
+
+
+def _formatear(fila):
+    if fila is None:
+        return None
+    municipio = fila['municipio__nombre']
+    if municipio and fila['municipio__departamento__nombre']:
+        municipio = f'{municipio} ({fila["municipio__departamento__nombre"]})'
+    return {
+        'id': fila['id'],
+        'cedula': fila['cedula'],
+        'nombre_completo': f'{fila["nombres"]} {fila["apellidos"]}',
+        'departamento': fila['departamento__nombre'] or '',
+        'municipio': municipio or '',
+        'puesto': {
+            'nombre': fila['puesto__nombre'], 'direccion': fila['puesto__direccion'],
+        } if fila['puesto_id'] else None,
+        'mesa': {
+            'numero': fila['mesa__numero'], 'zona': fila['mesa__zona'],
+        } if fila['mesa_id'] else None,
+    }
+
+
+async def _aversion():
+    version = await cache.aget(CLAVE_VERSION)
+    if version is None:
+        nueva = format(time.time_ns(), 'x')
+        await cache.aadd(CLAVE_VERSION, nueva, None)
+        version = await cache.aget(CLAVE_VERSION, nueva)
+    return version
+
+
+def _para_cache(resultado):
+    """(valor, ttl) a guardar: False marca que la cédula no existe (None es "no está en caché")."""
+    return (False, TTL_NEGATIVO) if resultado is None else (resultado, TTL_POSITIVO)
+
+
+def buscar(cedula):
+    """Datos de consulta del votante con esa cédula (normalizada) o None si no existe."""
+    cedula = normalizar(cedula)
+    if not cedula:
+        return None
+    clave = _clave(_version(), cedula)
+    resultado = cache.get(clave)
+    if resultado is not None:
+        return resultado or None
+    resultado = _formatear(_filas(cedula).first())
+    cache.set(clave, *_para_cache(resultado))
+    return resultado
+
+
+async def abuscar(cedula):
+    """Como buscar(), sin bloquear el bucle de eventos en el acceso a la base."""
+    cedula = normalizar(cedula)
+    if not cedula:
+        return None
+    clave = _clave(await _aversion(), cedula)
+    resultado = await cache.aget(clave)
+    if resultado is not None:
+        return resultado or None
+    resultado = _formatear(await _filas(cedula).afirst())
+    await cache.aset(clave, *_para_cache(resultado))
+    return resultado
+
+
+def invalidar(*cedulas):
+    """Borra las cédulas de la caché cuando se confirma la transacción que las cambió."""
+    normales = {normalizar(cedula) for cedula in cedulas if cedula} - {''}
+    if not normales:
+        return
+
+    def _borrar():
+        version = _version()
+        cache.delete_many([_clave(version, cedula) for cedula in normales])
+    # Borrar antes del commit dejaría a otro worker volver a guardar los datos viejos
+    transaction.on_commit(_borrar)
+
+
+def limpiar():
+    """Invalida todas las cédulas (p.ej. cuando cambia el nombre de un puesto o una mesa)."""
+    transaction.on_commit(lambda: cache.set(CLAVE_VERSION, format(time.time_ns(), 'x'), None))
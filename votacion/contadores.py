@@ -0,0 +1,78 @@
+"""
+Contadores globales (dashboard, encuestador, mapa de calor) sin COUNT por petición.
+
+Cada contador es una fila de Contador. Se calcula con un COUNT la primera vez
+y se vuelve a contar cuando tiene más de settings.CONTADORES_TTL segundos, lo
+que actúa como reconciliación periódica. Mientras tanto las señales lo
+mantienen al día: los modelos que cambian a menudo (Votante, Encuesta) suman
+o restan con un UPDATE atómico (valor = valor + delta) al confirmarse la
+transacción; los demás solo borran la fila para que se recalcule en la
+siguiente lectura. Todo vive en la base de datos, así que los workers ven
+los mismos valores y ningún incremento se pierde entre procesos.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Candidato, Contador, Encuesta, EventoElectoral, PuestoVotacion, Votante
+
+CONSULTAS = {
+    'votantes': lambda: Votante.objects.count(),
+    'votantes_geo': lambda: Votante.objects.filter(latitud__isnull=False).count(),
+    'candidatos_activos': lambda: Candidato.objects.filter(activo=True).count(),
+    'eventos_activos': lambda: EventoElectoral.objects.filter(activo=True).count(),
+    'puestos': lambda: PuestoVotacion.objects.count(),
+    'encuestas': lambda: Encuesta.objects.count(),
+}
+
+
+def _guardar(valores):
+    """Escribe {nombre: valor} recién contados (INSERT ... ON CONFLICT UPDATE)."""
+    ahora = timezone.now()
+    Contador.objects.bulk_create(
+        [Contador(nombre=nombre, valor=valor, recalculado_en=ahora) for nombre, valor in valores.items()],
+        update_conflicts=True, unique_fields=['nombre'], update_fields=['valor', 'recalculado_en'],
+    )
+
+
+def obtener(*nombres):
+    """Devuelve {nombre: valor}; los que no existan o estén vencidos se recalculan y guardan."""
+    nombres = nombres or tuple(CONSULTAS)
+    vigencia = timezone.now() - timedelta(seconds=settings.CONTADORES_TTL)
+    guardados = dict(
+        Contador.objects.filter(nombre__in=nombres, recalculado_en__gte=vigencia).values_list('nombre', 'valor')
+    )
+    faltantes = {nombre: CONSULTAS[nombre]() for nombre in nombres if nombre not in guardados}
+    if faltantes:
+        _guardar(faltantes)
+    return {nombre: guardados.get(nombre, faltantes.get(nombre)) for nombre in nombres}
+
+
+def valor(nombre):
+    return obtener(nombre)[nombre]
+
+
+def sumar(nombre, delta):
+    """Ajusta el contador al confirmarse la transacción; si aún no existe la fila no hace nada."""
+    # Fuera de la transacción de la escritura: el UPDATE no retiene el bloqueo
+    # de la fila mientras dura el resto de la transacción.
+    transaction.on_commit(lambda: Contador.objects.filter(nombre=nombre).update(valor=F('valor') + delta))
+
+
+def invalidar(*nombres):
+    transaction.on_commit(lambda: Contador.objects.filter(nombre__in=nombres).delete())
+
+
+def reconciliar():
+    """Recalcula todos los contadores; devuelve {nombre: (guardado, real)} de los desviados."""
+    guardados = dict(Contador.objects.values_list('nombre', 'valor'))
+    reales = {nombre: consulta() for nombre, consulta in CONSULTAS.items()}
+    _guardar(reales)
+    return {
+        nombre: (guardados[nombre], real)
+        for nombre, real in reales.items()
+        if nombre in guardados and guardados[nombre] != real
+    }
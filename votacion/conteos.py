@@ -0,0 +1,90 @@
+"""
+Conteo materializado de encuestas por (evento, candidato).
+
+Las señales de Encuesta llaman a `ajustar()` en cada alta, cambio de
+candidato o borrado, de modo que las estadísticas leen ConteoEncuesta en
+O(candidatos) sin recorrer la tabla de encuestas.
+`recalcular()` y `diferencias()` sirven para reconstruir la tabla y detectar
+desvíos (p.ej. tras un `QuerySet.update()` o una carga masiva que no dispara
+señales).
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import estadisticas
+from .models import ConteoEncuesta, Encuesta
+
+
+def ajustar(evento_id, candidato_id, delta):
+    """Suma `delta` (positivo o negativo) al conteo de (evento, candidato)."""
+    if not evento_id or not candidato_id or not delta:
+        return
+    filas = ConteoEncuesta.objects.filter(evento_id=evento_id, candidato_id=candidato_id)
+    # Greatest: descontar de un conteo ya desviado a 0 no debe violar el CHECK de
+    # PositiveIntegerField y abortar el guardado de la encuesta; `recalcular_conteos` lo corrige.
+    if filas.update(votos=Greatest(F('votos') + delta, 0), actualizado_en=timezone.now()):
+        return
+    if delta < 0:
+        # No hay fila que descontar: el conteo ya estaba desviado, lo corrige `recalcular_conteos`.
+        return
+    try:
+        with transaction.atomic():
+            ConteoEncuesta.objects.create(evento_id=evento_id, candidato_id=candidato_id, votos=delta)
+    except IntegrityError:
+        # Otra petición creó la fila entre el UPDATE y el INSERT
+        filas.update(votos=F('votos') + delta, actualizado_en=timezone.now())
+
+
+def conteos_reales(evento=None):
+    """Devuelve {(evento_id, candidato_id): votos} calculado desde Encuesta."""
+    qs = Encuesta.objects.all()
+    if evento is not None:
+        qs = qs.filter(evento=evento)
+    return {
+        (r['evento_id'], r['candidato_id']): r['votos']
+        for r in qs.order_by().values('evento_id', 'candidato_id').annotate(votos=Count('id'))
+    }
+
+
+def conteos_materializados(evento=None):
+    qs = ConteoEncuesta.objects.all()
+    if evento is not None:
+        qs = qs.filter(evento=evento)
+    return {
+        (evento_id, candidato_id): votos
+        for evento_id, candidato_id, votos in qs.values_list('evento_id', 'candidato_id', 'votos')
+    }
+
+
+def diferencias(evento=None):
+    """Lista de (evento_id, candidato_id, materializado, real) que no coinciden."""
+    reales = conteos_reales(evento)
+    materializados = conteos_materializados(evento)
+    desvios = []
+    for clave in sorted(set(reales) | set(materializados)):
+        real = reales.get(clave, 0)
+        guardado = materializados.get(clave, 0)
+        if real != guardado:
+            desvios.append((clave[0], clave[1], guardado, real))
+    return desvios
+
+
+@transaction.atomic
+def recalcular(evento=None):
+    """Reconstruye ConteoEncuesta desde cero. Devuelve el número de filas creadas."""
+    reales = conteos_reales(evento)
+    qs = ConteoEncuesta.objects.all()
+    if evento is not None:
+        qs = qs.filter(evento=evento)
+    qs.delete()
+    ConteoEncuesta.objects.bulk_create([
+        ConteoEncuesta(evento_id=evento_id, candidato_id=candidato_id, votos=votos)
+        for (evento_id, candidato_id), votos in reales.items()
+    ], batch_size=1000)
+    if evento is None:
+        estadisticas.invalidar_todos()
+    else:
+        estadisticas.invalidar(evento.pk)
+    return len(reales)
@@ -0,0 +1,173 @@
+"""
+Estadísticas en vivo por Server-Sent Events.
+
+La foto de un evento ({candidato_id: votos} desde ConteoEncuesta) se guarda
+en la caché bajo la versión de estadisticas.py: cada encuesta renueva la
+versión y la primera conexión que la ve consulta la base una vez; las demás,
+de cualquier worker, leen la foto de la caché. Los mensajes son
+
+    event: estado  {"conteos": {candidato: votos}, "total": n}
+    event: delta   {"deltas": [{"candidato", "votos": +/-n}], "total": n}
+
+con la versión como id, así EventSource manda Last-Event-ID al reconectar.
+
+Bajo ASGI la conexión queda abierta: un solo Difusor por proceso sondea la
+versión de los eventos con suscriptores cada EN_VIVO_INTERVALO segundos y
+reparte el mismo mensaje a todas las colas. Bajo WSGI un worker sync no
+puede quedarse esperando, así que cada petición responde lo ocurrido desde
+Last-Event-ID y cierra; el navegador reconecta a los EN_VIVO_REINTENTO_MS.
+"""
+import asyncio
+import json
+import logging
+import re
+import time
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from . import estadisticas
+from .models import ConteoEncuesta
+
+logger = logging.getLogger('votacion.en_vivo')
+
+CLAVE_FOTO = 'estadisticas:en_vivo:{}:{}'
+VIDA_FOTO = 300
+# Comentario SSE periódico para que proxies y balanceadores no corten la conexión
+LATIDO = 15
+# Bajo ASGI la conexión se cierra sola pasado este tiempo y el navegador reconecta
+DURACION = 300
+VERSION_VALIDA = re.compile(r'[0-9a-f-]{1,64}')
+
+
+def foto(evento_id):
+    """(versión, {candidato_id: votos}) del evento; una consulta por versión."""
+    version = estadisticas.version(evento_id)
+    clave = CLAVE_FOTO.format(evento_id, version)
+    conteos = cache.get(clave)
+    if conteos is None:
+        # Siempre de la primaria: una réplica atrasada dejaría datos viejos bajo la versión nueva
+        conteos = dict(
+            ConteoEncuesta.objects.filter(evento_id=evento_id, votos__gt=0)
+            .values_list('candidato_id', 'votos')
+        )
+        cache.set(clave, conteos, VIDA_FOTO)
+    return version, conteos
+
+
+def _mensaje(evento, version, datos):
+    return f'id: {version}\nevent: {evento}\ndata: {json.dumps(datos)}\n\n'
+
+
+def estado(version, conteos):
+    return _mensaje('estado', version, {
+        'conteos': {str(c): v for c, v in conteos.items()},
+        'total': sum(conteos.values()),
+    })
+
+
+def delta(version, antes, despues):
+    cambios = [
+        {'candidato': c, 'votos': despues.get(c, 0) - antes.get(c, 0)}
+        for c in sorted(set(antes) | set(despues))
+        if despues.get(c, 0) != antes.get(c, 0)
+    ]
+    return _mensaje('delta', version, {'deltas': cambios, 'total': sum(despues.values())})
+
+
+def reintento():
+    return f'retry: {settings.EN_VIVO_REINTENTO_MS}\n\n'
+
+
+def vuelta(evento_id, ultima):
+    """Respuesta completa para WSGI: lo ocurrido desde la versión `ultima` (Last-Event-ID)."""
+    version, conteos = foto(evento_id)
+    if ultima == version:
+        return reintento()
+    anteriores = None
+    if ultima and VERSION_VALIDA.fullmatch(ultima):
+        anteriores = cache.get(CLAVE_FOTO.format(evento_id, ultima))
+    if anteriores is None:
+        return reintento() + estado(version, conteos)
+    return reintento() + delta(version, anteriores, conteos)
+
+
+def _foto_y_cerrar(evento_id):
+    try:
+        return foto(evento_id)
+    finally:
+        # Hilo del executor, fuera de cualquier petición: nadie más cerraría la conexión
+        connection.close()
+
+
+class Difusor:
+    """Sondeo único por proceso (por event loop): reparte cada cambio a todas las conexiones."""
+
+    def __init__(self):
+        self.suscriptores = {}
+        self.fotos = {}
+        self.tarea = None
+
+    def suscribir(self, evento_id):
+        cola = asyncio.Queue()
+        self.suscriptores.setdefault(evento_id, set()).add(cola)
+        if evento_id in self.fotos:
+            cola.put_nowait(estado(*self.fotos[evento_id]))
+        if self.tarea is None or self.tarea.done():
+            self.tarea = asyncio.create_task(self._sondear())
+        return cola
+
+    def cancelar(self, evento_id, cola):
+        colas = self.suscriptores.get(evento_id, set())
+        colas.discard(cola)
+        if not colas:
+            self.suscriptores.pop(evento_id, None)
+            self.fotos.pop(evento_id, None)
+
+    async def _sondear(self):
+        while self.suscriptores:
+            for evento_id in list(self.suscriptores):
+                try:
+                    version, conteos = await sync_to_async(_foto_y_cerrar, thread_sensitive=False)(evento_id)
+                except Exception:
+                    logger.exception('No se pudo leer la foto del evento %s', evento_id)
+                    continue
+                anterior = self.fotos.get(evento_id)
+                if anterior is not None and anterior[0] == version:
+                    continue
+                if evento_id not in self.suscriptores:
+                    continue
+                mensaje = estado(version, conteos) if anterior is None else delta(version, anterior[1], conteos)
+                self.fotos[evento_id] = (version, conteos)
+                for cola in self.suscriptores[evento_id]:
+                    cola.put_nowait(mensaje)
+            await asyncio.sleep(settings.EN_VIVO_INTERVALO)
+
+
+_difusores = weakref.WeakKeyDictionary()
+
+
+def difusor():
+    loop = asyncio.get_running_loop()
+    if loop not in _difusores:
+        _difusores[loop] = Difusor()
+    return _difusores[loop]
+
+
+async def flujo(evento_id):
+    """Cuerpo de la respuesta ASGI: mensajes del difusor y latidos hasta DURACION."""
+    propio = difusor()
+    cola = propio.suscribir(evento_id)
+    fin = time.monotonic() + DURACION
+    try:
+        yield reintento()
+        while (restante := fin - time.monotonic()) > 0:
+            try:
+                yield await asyncio.wait_for(cola.get(), min(LATIDO, restante))
+            except asyncio.TimeoutError:
+                yield ': latido\n\n'
+    finally:
+        propio.cancelar(evento_id, cola)
@@ -0,0 +1,90 @@
+"""
+Caché de las estadísticas de encuesta, versionada por evento.
+
+Cada evento tiene un token de versión en la caché que se renueva al
+confirmarse cualquier escritura de Encuesta de ese evento (señales,
+lote_encuestas, conteos.recalcular) o de lo que las estadísticas muestran
+(candidatos, partidos, el propio evento, votantes del drill-down). El
+fragmento de resultados de encuestador/estadisticas.html y las respuestas
+del drill-down se guardan bajo esa versión: entre dos encuestas, repetir la
+vista no consulta la base ni vuelve a renderizar las tarjetas.
+
+Una versión global, renovada con `invalidar_todos()` (cargas masivas), se
+antepone a la de cada evento. Los tokens son nuevos en cada escritura, como
+en geografia.py, y no un contador: con FileBasedCache un incr no es atómico
+y dos escrituras simultáneas podrían quedar con el mismo número.
+
+ESTADISTICAS_CACHE_TTL acota lo que una entrada puede quedar atrasada si se
+armó leyendo de una réplica que aún no recibía la última escritura.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+CLAVE_GLOBAL = 'estadisticas:version'
+CLAVE_EVENTO = 'estadisticas:version:{}'
+
+
+def _token():
+    return format(time.time_ns(), 'x')
+
+
+def version(evento_id):
+    claves = [CLAVE_GLOBAL, CLAVE_EVENTO.format(evento_id)]
+    guardadas = cache.get_many(claves)
+    partes = []
+    for clave in claves:
+        valor = guardadas.get(clave)
+        if valor is None:
+            # Caché vacía: una versión nueva solo cuesta recalcular una vez
+            valor = _token()
+            if not cache.add(clave, valor, None):
+                valor = cache.get(clave, valor)
+        partes.append(valor)
+    return '-'.join(partes)
+
+
+def invalidar(*evento_ids):
+    """Renueva la versión de los eventos al confirmarse la transacción en curso."""
+    claves = {CLAVE_EVENTO.format(pk) for pk in evento_ids if pk is not None}
+    if claves:
+        transaction.on_commit(lambda: cache.set_many({clave: _token() for clave in claves}, None))
+
+
+def invalidar_todos():
+    transaction.on_commit(lambda: cache.set(CLAVE_GLOBAL, _token(), None))
+
+
+def _evento_id(request):
+    try:
+        return int(request.GET.get('evento', ''))
+    except ValueError:
+        return None
+
+
+def en_cache(vista):
+    """Decorador para las APIs JSON del drill-down: guarda la respuesta bajo la
+    versión del evento pedido (?evento=) y los parámetros de la consulta."""
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        evento_id = _evento_id(request)
+        if evento_id is None:
+            return vista(request, *args, **kwargs)
+        parametros = '&'.join(f'{k}={v}' for k, v in sorted(request.GET.items()))
+        clave = 'estadisticas:{}:{}:{}:{}'.format(
+            evento_id, version(evento_id), vista.__name__,
+            hashlib.md5(parametros.encode()).hexdigest(),
+        )
+        contenido = cache.get(clave)
+        if contenido is not None:
+            return HttpResponse(contenido, content_type='application/json')
+        response = vista(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(clave, response.content, settings.ESTADISTICAS_CACHE_TTL)
+        return response
+    return envoltura
@@ -0,0 +1,47 @@
+"""
+WhiteNoise para ambos modos del servidor (WSGI y ASGI).
+
+WhiteNoiseMiddleware 6.x solo es síncrono: bajo ASGI Django adapta toda la
+cadena que cuelga de él y cada petición vuelve a ocupar un hilo mientras la
+vista async espera a la base, que es justo lo que config.asgi quiere evitar.
+Esta subclase declara los dos modos: en WSGI se comporta igual que la
+original y en ASGI sirve los estáticos en un hilo (lectura de disco) y pasa
+el resto de peticiones sin salir del bucle de eventos. El archivo se entrega
+con un iterador async para que Django no tenga que consumirlo de una vez.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+async def _bloques(archivo, tamano):
+    leer = sync_to_async(archivo.read)
+    while bloque := await leer(tamano):
+        yield bloque
+
+
+class WhiteNoiseAsgi(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return await self.get_response(request)
+        response = await sync_to_async(self.serve)(static_file, request)
+        if response.file_to_stream is not None:
+            response.streaming_content = _bloques(response.file_to_stream, response.block_size)
+        return response
@@ -0,0 +1,239 @@
+"""
+Exportación en streaming de encuestas y votantes (CSV, NDJSON y XLSX).
+
+Las filas salen de `values_list().iterator(chunk_size=...)`, que en
+PostgreSQL usa un cursor del lado del servidor: la memoria se mantiene
+constante sin importar el tamaño del evento. Los tres formatos se escriben
+fila a fila: XLSX arma el zip sobre la marcha (entradas con descriptor de
+datos, sin volver atrás en el archivo), así que el primer byte sale en
+cuanto llega la primera fila y no hay archivo temporal.
+"""
+import csv
+import json
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Encuesta, Votante
+
+TAMANO_LOTE = 2000
+
+_ENCODER = DjangoJSONEncoder()
+
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+# (encabezado, ruta ORM)
+COLUMNAS_ENCUESTAS = [
+    ('id', 'id'),
+    ('fecha', 'fecha'),
+    ('evento_id', 'evento_id'),
+    ('evento', 'evento__nombre'),
+    ('candidato_id', 'candidato_id'),
+    ('candidato_nombres', 'candidato__nombres'),
+    ('candidato_apellidos', 'candidato__apellidos'),
+    ('partido', 'candidato__partido__sigla'),
+    ('cedula', 'votante__cedula'),
+    ('nombres', 'votante__nombres'),
+    ('apellidos', 'votante__apellidos'),
+    ('departamento', 'votante__departamento__nombre'),
+    ('municipio', 'votante__municipio__nombre'),
+    ('puesto', 'votante__puesto__nombre'),
+    ('mesa', 'votante__mesa__numero'),
+    ('barrio', 'votante__barrio'),
+    ('latitud', 'votante__latitud'),
+    ('longitud', 'votante__longitud'),
+    ('encuestador', 'encuestador__username'),
+    ('observacion', 'observacion'),
+]
+
+COLUMNAS_VOTANTES = [
+    ('id', 'id'),
+    ('cedula', 'cedula'),
+    ('nombres', 'nombres'),
+    ('apellidos', 'apellidos'),
+    ('email', 'email'),
+    ('telefono', 'telefono'),
+    ('fecha_nacimiento', 'fecha_nacimiento'),
+    ('departamento', 'departamento__nombre'),
+    ('municipio', 'municipio__nombre'),
+    ('puesto', 'puesto__nombre'),
+    ('mesa', 'mesa__numero'),
+    ('direccion', 'direccion'),
+    ('barrio', 'barrio'),
+    ('latitud', 'latitud'),
+    ('longitud', 'longitud'),
+    ('creado_en', 'creado_en'),
+]
+
+
+def filas_encuestas(evento_id=None):
+    qs = Encuesta.objects.order_by('id')
+    if evento_id:
+        qs = qs.filter(evento_id=evento_id)
+    rutas = [ruta for _, ruta in COLUMNAS_ENCUESTAS]
+    return [col for col, _ in COLUMNAS_ENCUESTAS], qs.values_list(*rutas).iterator(chunk_size=TAMANO_LOTE)
+
+
+def filas_votantes(departamento_id=None, municipio_id=None):
+    qs = Votante.objects.order_by('id')
+    if departamento_id:
+        qs = qs.filter(departamento_id=departamento_id)
+    if municipio_id:
+        qs = qs.filter(municipio_id=municipio_id)
+    rutas = [ruta for _, ruta in COLUMNAS_VOTANTES]
+    return [col for col, _ in COLUMNAS_VOTANTES], qs.values_list(*rutas).iterator(chunk_size=TAMANO_LOTE)
+
+
+class _Eco:
+    """Pseudo-buffer para csv.writer: devuelve lo escrito en lugar de guardarlo."""
+    def write(self, valor):
+        return valor
+
+
+def _celda(valor):
+    # Fechas y decimales como texto estable; None como celda vacía
+    if valor is None:
+        return ''
+    if isinstance(valor, (str, int)):
+        return valor
+    return _ENCODER.default(valor)
+
+
+def generar_csv(encabezados, filas):
+    writer = csv.writer(_Eco())
+    # BOM para que Excel abra el CSV como UTF-8
+    yield '\ufeff' + writer.writerow(encabezados)
+    for fila in filas:
+        yield writer.writerow([_celda(v) for v in fila])
+
+
+def generar_ndjson(encabezados, filas):
+    for fila in filas:
+        yield json.dumps(dict(zip(encabezados, fila)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+# ── XLSX en streaming ─────────────────────────────────────────────
+# Un libro mínimo de una hoja con cadenas en línea (inlineStr): no necesita
+# la tabla de cadenas compartidas, que obligaría a conocer todas las filas
+# antes de escribir la primera.
+
+_XLSX_PARTES = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+_XLSX_LIBRO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{titulo}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+)
+
+_XLSX_HOJA_INICIO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_XLSX_HOJA_FIN = '</sheetData></worksheet>'
+
+# Caracteres de control que XML 1.0 no admite ni escapados
+_CONTROL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class _Tubo:
+    """Archivo de solo escritura: guarda lo que escribe zipfile hasta que el generador lo entrega."""
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def _celda_xlsx(valor):
+    if isinstance(valor, bool):
+        valor = int(valor)
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c><v>{valor}</v></c>'
+    texto = _celda(valor)
+    if texto == '':
+        return '<c/>'
+    texto = escape(_CONTROL_XML.sub('', str(texto)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _fila_xlsx(valores):
+    return '<row>' + ''.join(_celda_xlsx(v) for v in valores) + '</row>'
+
+
+def generar_xlsx(encabezados, filas, titulo='Datos', tamano_bloque=64 * 1024):
+    """Genera el .xlsx en bloques de ~`tamano_bloque` bytes a medida que se recorren las filas."""
+    tubo = _Tubo()
+    # Con un destino sin seek, zipfile escribe cada entrada seguida de su descriptor de datos
+    with zipfile.ZipFile(tubo, 'w', compression=zipfile.ZIP_DEFLATED) as libro:
+        for nombre, contenido in _XLSX_PARTES.items():
+            libro.writestr(nombre, contenido)
+        libro.writestr('xl/workbook.xml', _XLSX_LIBRO.format(titulo=escape(titulo, {'"': '&quot;'})))
+        with libro.open('xl/worksheets/sheet1.xml', 'w') as hoja:
+            hoja.write((_XLSX_HOJA_INICIO + _fila_xlsx(encabezados)).encode())
+            pendiente = []
+            tamano = 0
+            for fila in filas:
+                xml = _fila_xlsx(fila).encode()
+                pendiente.append(xml)
+                tamano += len(xml)
+                if tamano >= tamano_bloque:
+                    hoja.write(b''.join(pendiente))
+                    pendiente, tamano = [], 0
+                    bloque = tubo.vaciar()
+                    if bloque:
+                        yield bloque
+            hoja.write(b''.join(pendiente) + _XLSX_HOJA_FIN.encode())
+    yield tubo.vaciar()
+
+
+def generar(formato, encabezados, filas, titulo='Datos'):
+    if formato == 'csv':
+        return generar_csv(encabezados, filas)
+    if formato == 'ndjson':
+        return generar_ndjson(encabezados, filas)
+    if formato == 'xlsx':
+        return generar_xlsx(encabezados, filas, titulo)
+    raise ValueError(f'Formato no soportado: {formato}')
@@ -4,6 +4,7 @@ from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Row, Column, Submit, Field, Div, HTML
 from .models import (Votante, Candidato, EventoElectoral, PartidoPolitico,
                      Departamento, Municipio, PuestoVotacion, MesaVotacion)
+from .cedulas import normalizar as normalizar_cedula
 
 
 class VotanteForm(forms.ModelForm):
@@ -25,6 +26,13 @@ class VotanteForm(forms.ModelForm):
             'longitud':   forms.HiddenInput(),
         }
 
+    def clean_cedula(self):
+        # Llave normalizada: sin puntos, espacios ni ceros a la izquierda
+        cedula = normalizar_cedula(self.cleaned_data.get('cedula'))
+        if not cedula:
+            raise forms.ValidationError('Ingrese un número de cédula válido.')
+        return cedula
+
     def save(self, commit=True):
         instance = super().save(commit=False)
         # municipio/puesto/mesa vienen como campos POST directos
@@ -63,6 +71,8 @@ class CandidatoForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # El __str__ de Municipio muestra el departamento: traerlo en la misma consulta
+        self.fields['municipio'].queryset = Municipio.objects.select_related('departamento')
         self.helper = FormHelper()
         self.helper.layout = Layout(
             HTML('<h5 class="text-primary mb-3"><i class="bi bi-person-check"></i> Información del Candidato</h5>'),
@@ -157,6 +167,7 @@ class PuestoVotacionForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.fields['municipio'].queryset = Municipio.objects.select_related('departamento')
         self.helper = FormHelper()
         self.helper.layout = Layout(
             Row(
@@ -182,6 +193,7 @@ class MesaVotacionForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.fields['puesto'].queryset = PuestoVotacion.objects.select_related('municipio')
         self.helper = FormHelper()
         self.helper.layout = Layout(
             Row(
@@ -201,7 +213,8 @@ class VotanteBuscarForm(forms.Form):
     cedula = forms.CharField(max_length=20, label='Número de Cédula', required=False)
     nombre = forms.CharField(max_length=200, label='Nombre o Apellido', required=False)
     departamento = forms.ModelChoiceField(queryset=Departamento.objects.all(), required=False, empty_label='Todos')
-    municipio = forms.ModelChoiceField(queryset=Municipio.objects.all(), required=False, empty_label='Todos')
+    municipio = forms.ModelChoiceField(queryset=Municipio.objects.select_related('departamento'),
+                                       required=False, empty_label='Todos')
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -216,3 +229,33 @@ class VotanteBuscarForm(forms.Form):
             ),
             Submit('buscar', 'Buscar', css_class='btn btn-primary')
         )
+
+
+class UbicacionFiltroForm(forms.Form):
+    """Filtro departamento → municipio (→ puesto) de los listados de puestos y mesas.
+    Cada lista solo trae las opciones del nivel anterior elegido."""
+    departamento = forms.ModelChoiceField(queryset=Departamento.objects.all(), required=False, empty_label='Todos')
+    municipio = forms.ModelChoiceField(queryset=Municipio.objects.none(), required=False, empty_label='Todos')
+    puesto = forms.ModelChoiceField(queryset=PuestoVotacion.objects.none(), required=False, empty_label='Todos')
+
+    def __init__(self, *args, con_puesto=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        departamento = self.data.get('departamento')
+        municipio = self.data.get('municipio')
+        if departamento and departamento.isdigit():
+            self.fields['municipio'].queryset = Municipio.objects.filter(departamento_id=departamento)
+        if municipio and municipio.isdigit():
+            self.fields['puesto'].queryset = PuestoVotacion.objects.filter(municipio_id=municipio)
+        # Solo el nombre: el __str__ de municipio/puesto consulta su padre por cada opción
+        self.fields['municipio'].label_from_instance = lambda m: m.nombre
+        self.fields['puesto'].label_from_instance = lambda p: p.nombre
+        for campo in self.fields.values():
+            campo.widget.attrs['onchange'] = 'this.form.submit()'
+        columnas = [Column('departamento', css_class='col-md-4 mb-3'), Column('municipio', css_class='col-md-4 mb-3')]
+        if con_puesto:
+            columnas.append(Column('puesto', css_class='col-md-4 mb-3'))
+        else:
+            del self.fields['puesto']
+        self.helper = FormHelper()
+        self.helper.method = 'GET'
+        self.helper.layout = Layout(Row(*columnas))
@@ -0,0 +1,93 @@
+"""
+Paquetes versionados de geografía electoral para los selectores en cascada.
+
+Un paquete por departamento trae sus municipios, puestos y mesas, así el
+formulario de votante resuelve municipio → puesto → mesa en el navegador tras
+una sola descarga. La versión es un token guardado en la caché que las señales
+de Departamento/Municipio/PuestoVotacion/MesaVotacion renuevan (y las cargas
+masivas llaman a `invalidar()`); forma parte de la URL y del ETag, de modo que
+el paquete puede cachearse como inmutable y las APIs sueltas responden 304.
+`aversion()`/`aetag()` son las variantes para las vistas async (ASGI).
+"""
+import gzip
+import json
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import MesaVotacion, Municipio, PuestoVotacion
+
+CLAVE_VERSION = 'geografia:version'
+
+
+def version():
+    valor = cache.get(CLAVE_VERSION)
+    if valor is None:
+        # Caché vacía (reinicio, otro backend): una versión nueva solo obliga a
+        # los navegadores a volver a descargar una vez
+        valor = format(time.time_ns(), 'x')
+        if not cache.add(CLAVE_VERSION, valor, None):
+            valor = cache.get(CLAVE_VERSION, valor)
+    return valor
+
+
+async def aversion():
+    valor = await cache.aget(CLAVE_VERSION)
+    if valor is None:
+        valor = format(time.time_ns(), 'x')
+        if not await cache.aadd(CLAVE_VERSION, valor, None):
+            valor = await cache.aget(CLAVE_VERSION, valor)
+    return valor
+
+
+def invalidar():
+    """Renueva la versión al confirmarse la transacción en curso."""
+    transaction.on_commit(lambda: cache.set(CLAVE_VERSION, format(time.time_ns(), 'x'), None))
+
+
+def etag(*partes):
+    return '"geo-' + '-'.join(str(p) for p in (version(),) + partes) + '"'
+
+
+async def aetag(*partes):
+    return '"geo-' + '-'.join(str(p) for p in (await aversion(),) + partes) + '"'
+
+
+def coincide(request, valor):
+    """True si el If-None-Match del cliente incluye el ETag (ignorando W/ de proxies)."""
+    enviados = request.headers.get('If-None-Match', '')
+    return any(e.strip().removeprefix('W/') == valor for e in enviados.split(','))
+
+
+def _construir(departamento_id):
+    municipios = list(
+        Municipio.objects.filter(departamento_id=departamento_id)
+        .order_by('nombre').values_list('id', 'nombre')
+    )
+    puestos, mesas = {}, {}
+    for pk, municipio_id, nombre, direccion in (
+        PuestoVotacion.objects.filter(municipio__departamento_id=departamento_id)
+        .order_by('nombre').values_list('id', 'municipio_id', 'nombre', 'direccion').iterator()
+    ):
+        puestos.setdefault(municipio_id, []).append([pk, nombre, direccion])
+    for pk, puesto_id, numero, zona in (
+        MesaVotacion.objects.filter(puesto__municipio__departamento_id=departamento_id)
+        .order_by('numero').values_list('id', 'puesto_id', 'numero', 'zona').iterator()
+    ):
+        mesas.setdefault(puesto_id, []).append([pk, numero, zona])
+    return {'municipios': municipios, 'puestos': puestos, 'mesas': mesas}
+
+
+def paquete(departamento_id):
+    """(JSON, JSON gzip) del paquete del departamento en la versión actual."""
+    v = version()
+    clave = f'geografia:paquete:{v}:{departamento_id}'
+    guardado = cache.get(clave)
+    if guardado is None:
+        datos = _construir(departamento_id)
+        datos['version'] = v
+        contenido = json.dumps(datos, ensure_ascii=False, separators=(',', ':')).encode()
+        guardado = (contenido, gzip.compress(contenido, mtime=0))
+        cache.set(clave, guardado, 24 * 3600)
+    return guardado
@@ -0,0 +1,247 @@
+"""
+Registro de encuestas por lote para los equipos de campo.
+
+El cliente (p.ej. un encuestador que trabajó sin conexión) envía
+{"encuestas": [{"clave", "cedula", "evento", "candidato", "observacion"}, ...]}
+y recibe un resultado por ítem, en el mismo orden. El número de consultas no
+depende del tamaño del lote: claves ya recibidas, votantes por cédula,
+eventos, candidatos y encuestas existentes se leen con una consulta cada uno,
+y las encuestas se escriben con un upsert en bloque sobre (votante, evento).
+
+La "clave" es la llave de idempotencia del ítem (EnvioEncuesta): un ítem con
+una clave ya aplicada se responde como "repetida" sin tocar la encuesta. Los
+ítems se aplican en orden, así que si dos del mismo lote apuntan al mismo
+(votante, evento) gana el último. El upsert no dispara señales: aquí mismo se
+ajustan los conteos, los resúmenes por hora/día, el contador de encuestas, las
+teselas del mapa de calor y la versión de las estadísticas de cada evento tocado.
+"""
+import json
+import zlib
+from collections import Counter
+
+from django.db import transaction
+
+from . import cedulas, contadores, conteos, estadisticas, resumenes, teselas
+from .models import Candidato, Encuesta, EnvioEncuesta, EventoElectoral, Votante
+
+MAX_ITEMS = 5000
+MAX_DESCOMPRIMIDO = 10 * 1024 * 1024
+LARGO_CLAVE = 64
+LARGO_OBSERVACION = 300
+# Rango de un id (BigAutoField): fuera de él el ORM lanza OverflowError
+MAX_ID = 2 ** 63 - 1
+
+
+class ErrorLote(ValueError):
+    """El lote completo es inválido (se responde 400)."""
+
+
+def leer_cuerpo(request):
+    """JSON del cuerpo de la petición, aceptando Content-Encoding: gzip."""
+    datos = request.body
+    if request.headers.get('Content-Encoding', '').lower() == 'gzip':
+        descompresor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            datos = descompresor.decompress(datos, MAX_DESCOMPRIMIDO)
+        except zlib.error:
+            raise ErrorLote('El cuerpo no es gzip válido')
+        if descompresor.unconsumed_tail:
+            raise ErrorLote('El lote descomprimido es demasiado grande')
+    try:
+        cuerpo = json.loads(datos)
+    except (ValueError, UnicodeDecodeError):
+        raise ErrorLote('El cuerpo no es JSON válido')
+    if not isinstance(cuerpo, dict):
+        raise ErrorLote('Se esperaba un objeto {"encuestas": [...]}')
+    return cuerpo
+
+
+def _entero(valor, campo):
+    if isinstance(valor, bool) or not isinstance(valor, (int, str)):
+        raise ValueError(f'{campo} inválido')
+    try:
+        numero = int(valor)
+    except ValueError:
+        raise ValueError(f'{campo} inválido')
+    if not 1 <= numero <= MAX_ID:
+        raise ValueError(f'{campo} inválido')
+    return numero
+
+
+def _validar(item):
+    """(clave, cédula normalizada, evento_id, candidato_id, observación) o ValueError."""
+    clave = item.get('clave')
+    if not isinstance(clave, str) or not clave.strip() or len(clave.strip()) > LARGO_CLAVE:
+        raise ValueError(f'clave obligatoria (texto de hasta {LARGO_CLAVE} caracteres)')
+    cedula = cedulas.normalizar(str(item.get('cedula') or ''))
+    if not cedula:
+        raise ValueError('cédula vacía o inválida')
+    observacion = item.get('observacion') or ''
+    if not isinstance(observacion, str):
+        raise ValueError('observacion debe ser texto')
+    return (clave.strip(), cedula, _entero(item.get('evento'), 'evento'),
+            _entero(item.get('candidato'), 'candidato'), observacion.strip()[:LARGO_OBSERVACION])
+
+
+@transaction.atomic
+def registrar(encuestador, items):
+    """Aplica el lote del encuestador y devuelve la lista de resultados por ítem."""
+    if not isinstance(items, list):
+        raise ErrorLote('"encuestas" debe ser una lista')
+    if len(items) > MAX_ITEMS:
+        raise ErrorLote(f'Máximo {MAX_ITEMS} encuestas por lote')
+
+    resultados = [None] * len(items)
+    validos, primera = [], {}
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            resultados[i] = {'clave': None, 'estado': 'rechazada', 'error': 'cada ítem debe ser un objeto'}
+            continue
+        clave = item.get('clave')
+        try:
+            fila = _validar(item)
+        except ValueError as e:
+            resultados[i] = {'clave': clave, 'estado': 'rechazada', 'error': str(e)}
+            continue
+        if fila[0] in primera:
+            # Clave repetida dentro del mismo lote: se responde como la primera
+            continue
+        primera[fila[0]] = i
+        validos.append((i, *fila))
+
+    # ── Claves ya aplicadas en envíos anteriores ──
+    aplicadas = dict(
+        EnvioEncuesta.objects.filter(encuestador=encuestador, clave__in=list(primera))
+        .values_list('clave', 'encuesta_id')
+    )
+    pendientes = []
+    for i, clave, *resto in validos:
+        if clave in aplicadas:
+            resultados[i] = {'clave': clave, 'estado': 'repetida', 'encuesta': aplicadas[clave]}
+        else:
+            pendientes.append((i, clave, *resto))
+
+    # ── Votantes, eventos y candidatos en una consulta cada uno ──
+    votantes = {
+        cedula: (pk, lat, lng, municipio_id) for cedula, pk, lat, lng, municipio_id in
+        Votante.objects.filter(cedula__in={p[2] for p in pendientes})
+        .values_list('cedula', 'id', 'latitud', 'longitud', 'municipio_id')
+    }
+    eventos = set(
+        EventoElectoral.objects.filter(id__in={p[3] for p in pendientes}, activo=True)
+        .values_list('id', flat=True)
+    )
+    candidatos = dict(
+        Candidato.objects.filter(id__in={p[4] for p in pendientes}).values_list('id', 'evento_id')
+    )
+    aceptados = []
+    for i, clave, cedula, evento_id, candidato_id, observacion in pendientes:
+        if cedula not in votantes:
+            error = f'no hay votante con la cédula {cedula}'
+        elif evento_id not in eventos:
+            error = 'evento inexistente o inactivo'
+        elif candidatos.get(candidato_id) != evento_id:
+            error = 'el candidato no pertenece al evento'
+        else:
+            aceptados.append((i, clave, votantes[cedula][0], evento_id, candidato_id, observacion))
+            continue
+        resultados[i] = {'clave': clave, 'estado': 'rechazada', 'error': error}
+
+    if aceptados:
+        _aplicar(encuestador, aceptados, votantes, resultados)
+
+    for i, item in enumerate(items):
+        if resultados[i] is None:
+            original = dict(resultados[primera[item['clave'].strip()]])
+            if original['estado'] != 'rechazada':
+                original['estado'] = 'repetida'
+            resultados[i] = original
+    return resultados
+
+
+def _aplicar(encuestador, aceptados, votantes, resultados):
+    ids_votantes = {a[2] for a in aceptados}
+    ids_eventos = {a[3] for a in aceptados}
+    existentes, autores = {}, {}
+    for votante_id, evento_id, candidato_id, encuestador_id, fecha in (
+            Encuesta.objects.filter(votante_id__in=ids_votantes, evento_id__in=ids_eventos)
+            .values_list('votante_id', 'evento_id', 'candidato_id', 'encuestador_id', 'fecha')):
+        existentes[(votante_id, evento_id)] = candidato_id
+        autores[(votante_id, evento_id)] = (encuestador_id, fecha)
+
+    # En orden: el primer ítem de un par nuevo lo crea, los siguientes lo actualizan
+    actuales = dict(existentes)
+    finales = {}
+    for i, clave, votante_id, evento_id, candidato_id, observacion in aceptados:
+        par = (votante_id, evento_id)
+        resultados[i] = {'clave': clave, 'estado': 'actualizada' if par in actuales else 'creada'}
+        actuales[par] = candidato_id
+        finales[par] = (candidato_id, observacion)
+
+    nuevas = [
+        Encuesta(votante_id=v, evento_id=e, candidato_id=c, encuestador=encuestador, observacion=o)
+        for (v, e), (c, o) in finales.items()
+    ]
+    Encuesta.objects.bulk_create(
+        nuevas,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['votante', 'evento'],
+        update_fields=['candidato', 'encuestador', 'observacion', 'actualizado_en'],
+    )
+    # update_conflicts no devuelve los ids en Django 4.2
+    ids = {
+        (votante_id, evento_id): pk for pk, votante_id, evento_id in
+        Encuesta.objects.filter(votante_id__in=ids_votantes, evento_id__in=ids_eventos)
+        .values_list('id', 'votante_id', 'evento_id')
+    }
+    for i, clave, votante_id, evento_id, *_ in aceptados:
+        resultados[i]['encuesta'] = ids[(votante_id, evento_id)]
+
+    EnvioEncuesta.objects.bulk_create(
+        [
+            EnvioEncuesta(encuestador=encuestador, clave=clave, encuesta_id=ids[(v, e)],
+                          creada=resultados[i]['estado'] == 'creada')
+            for i, clave, v, e, *_ in aceptados
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+    # Lo que harían las señales de Encuesta, agrupado por (evento, candidato)
+    deltas, creadas, tocados = Counter(), 0, set()
+    for (votante_id, evento_id), (candidato_id, _) in finales.items():
+        anterior = existentes.get((votante_id, evento_id))
+        if anterior == candidato_id:
+            continue
+        if anterior is None:
+            creadas += 1
+        else:
+            deltas[(evento_id, anterior)] -= 1
+        deltas[(evento_id, candidato_id)] += 1
+        tocados.add(votante_id)
+    for (evento_id, candidato_id), delta in deltas.items():
+        conteos.ajustar(evento_id, candidato_id, delta)
+    if creadas:
+        contadores.sumar('encuestas', creadas)
+    estadisticas.invalidar(*ids_eventos)
+    teselas.invalidar_teselas({
+        teselas.tesela_de(lat, lng, teselas.ZOOM_VERSION)
+        for pk, lat, lng, _ in votantes.values() if pk in tocados and lat is not None and lng is not None
+    })
+
+    # Resúmenes por hora/día: las nuevas cuentan ahora (fecha la puso bulk_create);
+    # una existente conserva su fecha y solo se mueve si cambió de encuestador
+    municipios = {pk: municipio_id for pk, _, _, municipio_id in votantes.values()}
+    cambios = Counter()
+    for encuesta in nuevas:
+        par = (encuesta.votante_id, encuesta.evento_id)
+        municipio_id = municipios[encuesta.votante_id]
+        if par not in autores:
+            cambios[(encuesta.evento_id, encuestador.pk, municipio_id, encuesta.fecha)] += 1
+            continue
+        anterior, fecha = autores[par]
+        if anterior != encuestador.pk:
+            cambios[(encuesta.evento_id, anterior, municipio_id, fecha)] -= 1
+            cambios[(encuesta.evento_id, encuestador.pk, municipio_id, fecha)] += 1
+    resumenes.ajustar(cambios)
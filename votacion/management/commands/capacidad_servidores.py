@@ -0,0 +1,217 @@
+"""
+Capacidad por worker: WSGI (gunicorn sync, como el Procfile) frente a ASGI (gunicorn + uvicorn).
+Uso: python manage.py capacidad_servidores [--concurrencias 1,4,16,64] [--duracion 15] [--objetivo-p95 500] [--servidores wsgi,asgi]
+
+Levanta cada servidor como subproceso con un solo worker, sobre la misma base
+configurada (DATABASE_URL), y para cada nivel de concurrencia corre ese número
+de clientes en bucle cerrado contra las vistas async: consulta pública (POST
+con cédula) y las APIs en cascada de municipios, puestos y mesas (sin
+If-None-Match, para que consulten la base). Por nivel reporta peticiones/s y
+p50/p95/p99; la capacidad de cada servidor es la mayor concurrencia que
+sostiene con p95 dentro de --objetivo-p95 y sin errores.
+
+Solo lee: puede correr sobre cualquier base con votantes (p.ej. la de
+generar_datos_sinteticos). ASGI necesita uvicorn-worker instalado. La ventaja
+de ASGI crece con la latencia de la base: contra SQLite local casi no hay
+espera que solapar, contra PostgreSQL remoto sí.
+"""
+import datetime
+import importlib.util
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from votacion.models import Departamento, MesaVotacion, Municipio, PuestoVotacion, Votante
+
+from .prueba_carga import _commit, _resumen, _Usuario
+
+SERVIDORES = {
+    'wsgi': ['config.wsgi'],
+    'asgi': ['config.asgi', '--worker-class', 'uvicorn_worker.UvicornWorker'],
+}
+ESPERA_ARRANQUE = 30
+# Muchas cédulas distintas: con pocas, la caché de cedulas.buscar respondería sin ir a la base
+MUESTRA_CEDULAS = 50000
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _escenario(u, datos, rng):
+    if settings.CSRF_COOKIE_NAME not in u.cookies:
+        u.pedir('consulta_formulario', '/consulta/')
+    azar = rng.random()
+    if azar < 0.4:
+        u.pedir('consulta', '/consulta/', {'cedula': rng.choice(datos['cedulas'])})
+    elif azar < 0.6:
+        u.pedir('api_municipios', f'/api/municipios/?departamento_id={rng.choice(datos["departamentos"])}')
+    elif azar < 0.8:
+        u.pedir('api_puestos', f'/api/puestos/?municipio_id={rng.choice(datos["municipios"])}')
+    else:
+        u.pedir('api_mesas', f'/api/mesas/?puesto_id={rng.choice(datos["puestos"])}')
+
+
+class Command(BaseCommand):
+    help = 'Compara la capacidad de un worker WSGI y uno ASGI con concurrencia creciente sobre las vistas async'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servidores', default='wsgi,asgi', help='Servidores a medir (wsgi, asgi)')
+        parser.add_argument('--concurrencias', default='1,4,16,64', help='Niveles de clientes concurrentes')
+        parser.add_argument('--duracion', type=float, default=15, help='Segundos de medición por nivel')
+        parser.add_argument('--calentamiento', type=float, default=2, help='Segundos iniciales de cada nivel que no se cuentan')
+        parser.add_argument('--objetivo-p95', type=float, default=500, help='p95 máximo (ms) para contar un nivel como sostenido')
+        parser.add_argument('--semilla', type=int, default=1, help='Semilla de las elecciones al azar')
+        parser.add_argument('--salida', help='Archivo JSON de resultados (por defecto capacidad_<commit>.json)')
+
+    def handle(self, *args, **options):
+        servidores = [s.strip() for s in options['servidores'].split(',') if s.strip()]
+        for nombre in servidores:
+            if nombre not in SERVIDORES:
+                raise CommandError(f'Servidor desconocido "{nombre}"; opciones: {", ".join(SERVIDORES)}')
+        try:
+            niveles = sorted({int(n) for n in options['concurrencias'].split(',') if n.strip()})
+        except ValueError:
+            raise CommandError('--concurrencias debe ser una lista de enteros, p.ej. 1,4,16,64')
+        if not niveles or niveles[0] < 1 or options['duracion'] <= 0:
+            raise CommandError('--concurrencias y --duracion deben ser positivos')
+        if importlib.util.find_spec('gunicorn') is None:
+            raise CommandError('gunicorn no está instalado')
+        if 'asgi' in servidores and importlib.util.find_spec('uvicorn_worker') is None:
+            raise CommandError('ASGI necesita uvicorn-worker: pip install uvicorn-worker')
+
+        datos = self._datos()
+        connections.close_all()
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING('⚠️  DEBUG=True: las cifras no son las de producción'))
+
+        informe = {
+            'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+            'commit': _commit(),
+            'base_datos': connection.vendor,
+            'debug': settings.DEBUG,
+            'objetivo_p95_ms': options['objetivo_p95'],
+            'duracion_s': options['duracion'],
+            'servidores': {},
+        }
+        for nombre in servidores:
+            self.stdout.write(f'\n{nombre.upper()}: gunicorn {" ".join(SERVIDORES[nombre])}, 1 worker')
+            niveles_medidos = self._medir(nombre, niveles, datos, options)
+            sostenidos = [n for n in niveles_medidos
+                          if n['errores'] == 0 and n['p95_ms'] <= options['objetivo_p95']]
+            informe['servidores'][nombre] = {
+                'niveles': niveles_medidos,
+                'capacidad': max(sostenidos, key=lambda n: n['concurrencia'])['concurrencia'] if sostenidos else 0,
+                'max_por_segundo': max(n['por_segundo'] for n in niveles_medidos),
+            }
+
+        salida = Path(options['salida'] or f'capacidad_{informe["commit"]}.json')
+        salida.write_text(json.dumps(informe, indent=2, ensure_ascii=False))
+        self.stdout.write('')
+        for nombre, r in informe['servidores'].items():
+            self.stdout.write(
+                f'{nombre.upper()}: sostiene {r["capacidad"]} clientes concurrentes con p95 ≤ '
+                f'{options["objetivo_p95"]:.0f} ms; máximo {r["max_por_segundo"]:.1f} pet/s'
+            )
+        self.stdout.write(self.style.SUCCESS(f'✅ Resultados en {salida}'))
+
+    def _datos(self):
+        cedulas = list(Votante.objects.order_by('id').values_list('cedula', flat=True)[:MUESTRA_CEDULAS])
+        if not cedulas:
+            raise CommandError('No hay votantes: cargue datos, p.ej. con generar_datos_sinteticos')
+        puestos = list(PuestoVotacion.objects.values_list('id', flat=True))
+        return {
+            'cedulas': cedulas,
+            'departamentos': list(Departamento.objects.order_by('id').values_list('id', flat=True)),
+            'municipios': sorted(set(PuestoVotacion.objects.values_list('municipio_id', flat=True)))
+            or list(Municipio.objects.order_by('id').values_list('id', flat=True)[:100]),
+            'puestos': sorted(set(MesaVotacion.objects.values_list('puesto_id', flat=True))) or puestos,
+        }
+
+    def _medir(self, nombre, niveles, datos, options):
+        puerto = _puerto_libre()
+        base = f'http://127.0.0.1:{puerto}'
+        registro = tempfile.TemporaryFile()
+        proceso = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', *SERVIDORES[nombre], '--workers', '1',
+             '--bind', f'127.0.0.1:{puerto}', '--timeout', '120'],
+            cwd=settings.BASE_DIR, env=os.environ.copy(), stdout=registro, stderr=subprocess.STDOUT,
+        )
+        try:
+            self._esperar(proceso, base, registro)
+            self.stdout.write(f'{"clientes":>9}{"pet.":>8}{"err.":>6}{"pet/s":>9}{"p50":>9}{"p95":>9}{"p99":>9}')
+            resultados = []
+            for nivel in niveles:
+                fila = self._nivel(base, nivel, datos, options)
+                resultados.append(fila)
+                self.stdout.write(
+                    f'{nivel:>9}{fila["peticiones"]:>8}{fila["errores"]:>6}{fila["por_segundo"]:>9.1f}'
+                    f'{fila["p50_ms"]:>9.1f}{fila["p95_ms"]:>9.1f}{fila["p99_ms"]:>9.1f}'
+                )
+            return resultados
+        finally:
+            proceso.terminate()
+            try:
+                proceso.wait(10)
+            except subprocess.TimeoutExpired:
+                proceso.kill()
+            registro.close()
+
+    def _esperar(self, proceso, base, registro):
+        limite = time.monotonic() + ESPERA_ARRANQUE
+        while time.monotonic() < limite:
+            if proceso.poll() is not None:
+                registro.seek(0)
+                salida = registro.read().decode(errors='replace')[-2000:]
+                raise CommandError(f'El servidor terminó al arrancar:\n{salida}')
+            usuario = _Usuario(base, [])
+            try:
+                if usuario.pedir('arranque', '/consulta/')[0] == 200:
+                    return
+            finally:
+                usuario.conexion.close()
+            time.sleep(0.5)
+        raise CommandError(f'El servidor no respondió en {ESPERA_ARRANQUE} s')
+
+    def _nivel(self, base, nivel, datos, options):
+        resultados = []
+        inicio = time.perf_counter()
+        desde = inicio + options['calentamiento']
+        hasta = desde + options['duracion']
+        hilos = [
+            threading.Thread(target=self._cliente, daemon=True, args=(
+                base, resultados, datos, random.Random(options['semilla'] * 1000 + i), hasta,
+            ))
+            for i in range(nivel)
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        segundos = min(time.perf_counter(), hasta) - desde
+        medidos = [f for f in resultados if f[4] >= desde and f[4] + f[1] <= hasta]
+        if not medidos:
+            raise CommandError(f'Con {nivel} clientes no se completó ninguna petición en la ventana de medición')
+        fila = _resumen(medidos, segundos)
+        del fila['consultas']
+        return {'concurrencia': nivel, **fila}
+
+    def _cliente(self, base, resultados, datos, rng, hasta):
+        usuario = _Usuario(base, resultados)
+        try:
+            while time.perf_counter() < hasta:
+                _escenario(usuario, datos, rng)
+        finally:
+            usuario.conexion.close()
@@ -1,94 +1,174 @@
 """
-Management command to load initial Colombia departamentos and municipios data.
-Usage: python manage.py cargar_datos_colombia
+Carga la división político-administrativa (DIVIPOLA) de Colombia y,
+opcionalmente, los puestos y mesas de votación.
+Uso: python manage.py cargar_datos_colombia [--archivo divipola.csv.gz] [--puestos puestos.csv.gz] [--forzar]
+
+El archivo DIVIPOLA (CSV, opcionalmente gzip) trae las columnas
+codigo_departamento, departamento, codigo_municipio, municipio; por defecto se
+usa el que viene con la aplicación en votacion/data/divipola.csv.gz. El de
+puestos trae codigo_municipio, codigo_puesto, puesto, direccion, mesas (número
+de mesas del puesto); si existe votacion/data/puestos.csv.gz se carga también.
+
+Los registros se insertan o actualizan en bloque por código DANE. La huella
+sha256 de los archivos queda en CargaDatos: si no cambió, el comando termina
+con una sola consulta (corre en cada despliegue, ver railway.json).
 """
-from django.core.management.base import BaseCommand
-from votacion.models import Departamento, Municipio
-
-
-DEPARTAMENTOS_MUNICIPIOS = {
-    "Amazonas": {"codigo": "91", "municipios": [("Leticia", "91001"), ("Puerto Nariño", "91540")]},
-    "Antioquia": {"codigo": "05", "municipios": [
-        ("Medellín", "05001"), ("Bello", "05088"), ("Itagüí", "05360"),
-        ("Envigado", "05266"), ("Apartadó", "05045"),
-        ("Turbo", "05837"), ("Caucasia", "05154"), ("Rionegro", "05615"),
-    ]},
-    "Arauca": {"codigo": "81", "municipios": [("Arauca", "81001"), ("Saravena", "81736"), ("Tame", "81794")]},
-    "Atlántico": {"codigo": "08", "municipios": [
-        ("Barranquilla", "08001"), ("Soledad", "08758"), ("Malambo", "08433"),
-        ("Sabanalarga", "08638"), ("Baranoa", "08078"),
-    ]},
-    "Bogotá D.C.": {"codigo": "11", "municipios": [("Bogotá D.C.", "11001")]},
-    "Bolívar": {"codigo": "13", "municipios": [
-        ("Cartagena de Indias", "13001"), ("Magangué", "13430"), ("Mompós", "13468"),
-    ]},
-    "Boyacá": {"codigo": "15", "municipios": [
-        ("Tunja", "15001"), ("Duitama", "15238"), ("Sogamoso", "15762"), ("Chiquinquirá", "15176"),
-    ]},
-    "Caldas": {"codigo": "17", "municipios": [
-        ("Manizales", "17001"), ("La Dorada", "17380"), ("Chinchiná", "17174"),
-    ]},
-    "Caquetá": {"codigo": "18", "municipios": [("Florencia", "18001"), ("San Vicente del Caguán", "18610")]},
-    "Casanare": {"codigo": "85", "municipios": [("Yopal", "85001"), ("Aguazul", "85010")]},
-    "Cauca": {"codigo": "19", "municipios": [("Popayán", "19001"), ("Santander de Quilichao", "19698")]},
-    "Cesar": {"codigo": "20", "municipios": [("Valledupar", "20001"), ("Aguachica", "20011")]},
-    "Chocó": {"codigo": "27", "municipios": [("Quibdó", "27001"), ("Istmina", "27361")]},
-    "Córdoba": {"codigo": "23", "municipios": [("Montería", "23001"), ("Lorica", "23417"), ("Sahagún", "23660")]},
-    "Cundinamarca": {"codigo": "25", "municipios": [
-        ("Fusagasugá", "25290"), ("Girardot", "25307"), ("Facatativá", "25269"),
-        ("Zipaquirá", "25899"), ("Soacha", "25754"), ("Chía", "25175"),
-        ("Mosquera", "25473"), ("Madrid", "25430"),
-    ]},
-    "Guajira": {"codigo": "44", "municipios": [("Riohacha", "44001"), ("Maicao", "44430")]},
-    "Huila": {"codigo": "41", "municipios": [("Neiva", "41001"), ("Pitalito", "41551"), ("Garzón", "41298")]},
-    "Magdalena": {"codigo": "47", "municipios": [("Santa Marta", "47001"), ("Ciénaga", "47189")]},
-    "Meta": {"codigo": "50", "municipios": [("Villavicencio", "50001"), ("Acacías", "50006"), ("Granada", "50313")]},
-    "Nariño": {"codigo": "52", "municipios": [("Pasto", "52001"), ("Tumaco", "52835"), ("Ipiales", "52356")]},
-    "Norte de Santander": {"codigo": "54", "municipios": [("Cúcuta", "54001"), ("Ocaña", "54498"), ("Pamplona", "54518")]},
-    "Putumayo": {"codigo": "86", "municipios": [("Mocoa", "86001"), ("Puerto Asís", "86568")]},
-    "Quindío": {"codigo": "63", "municipios": [("Armenia", "63001"), ("Calarcá", "63130"), ("Montenegro", "63470")]},
-    "Risaralda": {"codigo": "66", "municipios": [("Pereira", "66001"), ("Dosquebradas", "66170"), ("Santa Rosa de Cabal", "66682")]},
-    "San Andrés y Providencia": {"codigo": "88", "municipios": [("San Andrés", "88001")]},
-    "Santander": {"codigo": "68", "municipios": [
-        ("Bucaramanga", "68001"), ("Floridablanca", "68276"), ("Girón", "68307"),
-        ("Piedecuesta", "68547"), ("Barrancabermeja", "68081"),
-    ]},
-    "Sucre": {"codigo": "70", "municipios": [("Sincelejo", "70001"), ("Corozal", "70215")]},
-    "Tolima": {"codigo": "73", "municipios": [("Ibagué", "73001"), ("Espinal", "73268"), ("Honda", "73349")]},
-    "Valle del Cauca": {"codigo": "76", "municipios": [
-        ("Cali", "76001"), ("Buenaventura", "76109"), ("Palmira", "76520"),
-        ("Tuluá", "76834"), ("Buga", "76111"), ("Cartago", "76147"),
-    ]},
-    "Vaupés": {"codigo": "97", "municipios": [("Mitú", "97001")]},
-    "Vichada": {"codigo": "99", "municipios": [("Puerto Carreño", "99001")]},
-}
+import csv
+import gzip
+import hashlib
+import io
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from votacion import cedulas, contadores, geografia
+from votacion.models import CargaDatos, Departamento, MesaVotacion, Municipio, PuestoVotacion
+
+DATOS = Path(__file__).resolve().parents[2] / 'data'
+DIVIPOLA = DATOS / 'divipola.csv.gz'
+PUESTOS = DATOS / 'puestos.csv.gz'
+# Cambiar si cambia la forma de cargar, para forzar una recarga en el próximo despliegue
+VERSION_CARGADOR = '1'
+
+
+def _leer(ruta):
+    contenido = ruta.read_bytes()
+    texto = gzip.decompress(contenido) if contenido[:2] == b'\x1f\x8b' else contenido
+    filas = csv.DictReader(io.StringIO(texto.decode('utf-8-sig')))
+    filas.fieldnames = [c.strip().lower() for c in filas.fieldnames or []]
+    return contenido, list(filas)
+
+
+def _requerir(filas, columnas, ruta):
+    faltan = [c for c in columnas if filas and c not in filas[0]]
+    if faltan:
+        raise CommandError(f'{ruta}: faltan las columnas {", ".join(faltan)}')
 
 
 class Command(BaseCommand):
-    help = 'Carga datos iniciales de departamentos y municipios de Colombia'
+    help = 'Carga departamentos, municipios (DIVIPOLA) y puestos/mesas de Colombia'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--archivo', default=str(DIVIPOLA), help='CSV DIVIPOLA (puede ir en gzip)')
+        parser.add_argument('--puestos', help='CSV de puestos y mesas (puede ir en gzip)')
+        parser.add_argument('--forzar', action='store_true', help='Cargar aunque la huella no haya cambiado')
 
     def handle(self, *args, **options):
+        rutas = [Path(options['archivo'])]
+        if options['puestos']:
+            rutas.append(Path(options['puestos']))
+        elif PUESTOS.exists():
+            rutas.append(PUESTOS)
+        for ruta in rutas:
+            if not ruta.exists():
+                raise CommandError(f'No existe el archivo {ruta}')
+
+        huella = hashlib.sha256(VERSION_CARGADOR.encode())
+        datos = []
+        for ruta in rutas:
+            contenido, filas = _leer(ruta)
+            huella.update(contenido)
+            datos.append(filas)
+        huella = huella.hexdigest()
+
+        if not options['forzar'] and CargaDatos.objects.filter(nombre='divipola', huella=huella).exists():
+            self.stdout.write('Datos de Colombia sin cambios, nada que cargar.')
+            return
+
+        _requerir(datos[0], ['codigo_departamento', 'departamento', 'codigo_municipio', 'municipio'], rutas[0])
+        if len(datos) > 1:
+            _requerir(datos[1], ['codigo_municipio', 'codigo_puesto', 'puesto'], rutas[1])
+
         self.stdout.write('Cargando departamentos y municipios de Colombia...')
-        creados_dep = 0
-        creados_mun = 0
-
-        for nombre_dep, info in DEPARTAMENTOS_MUNICIPIOS.items():
-            dep, created = Departamento.objects.get_or_create(
-                codigo=info["codigo"],
-                defaults={"nombre": nombre_dep}
-            )
-            if created:
-                creados_dep += 1
-
-            for nombre_mun, codigo_mun in info["municipios"]:
-                _, mc = Municipio.objects.get_or_create(
-                    departamento=dep,
-                    codigo=codigo_mun,
-                    defaults={"nombre": nombre_mun}
+        with transaction.atomic():
+            deps = self._departamentos(datos[0])
+            muns = self._municipios(datos[0])
+            resumen = f'Departamentos: {deps} | Municipios: {muns}'
+            if len(datos) > 1:
+                puestos, mesas = self._puestos(datos[1])
+                resumen += f' | Puestos: {puestos} | Mesas nuevas: {mesas}'
+                contadores.invalidar('puestos')
+            CargaDatos.objects.update_or_create(nombre='divipola', defaults={'huella': huella})
+            # bulk_create/bulk_update no disparan señales: la consulta pública y los
+            # selectores guardan nombres de la geografía
+            cedulas.limpiar()
+            geografia.invalidar()
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Listo! {resumen} (creados o actualizados)'))
+
+    def _departamentos(self, filas):
+        nombres = {}
+        for fila in filas:
+            nombres[fila['codigo_departamento'].strip().zfill(2)] = fila['departamento'].strip()
+        existentes = {d.codigo: d for d in Departamento.objects.all()}
+        nuevos, cambiados = [], []
+        for codigo, nombre in nombres.items():
+            dep = existentes.get(codigo)
+            if dep is None:
+                nuevos.append(Departamento(codigo=codigo, nombre=nombre))
+            elif dep.nombre != nombre:
+                dep.nombre = nombre
+                cambiados.append(dep)
+        Departamento.objects.bulk_update(cambiados, ['nombre'])
+        Departamento.objects.bulk_create(nuevos)
+        return len(nuevos) + len(cambiados)
+
+    def _municipios(self, filas):
+        departamentos = dict(Departamento.objects.values_list('codigo', 'id'))
+        # La llave es el código DIVIPOLA: un municipio que estaba colgado de
+        # otro departamento se mueve en lugar de duplicarse
+        existentes = {m.codigo: m for m in Municipio.objects.all()}
+        nuevos, cambiados = [], []
+        for fila in filas:
+            codigo = fila['codigo_municipio'].strip().zfill(5)
+            nombre = fila['municipio'].strip()
+            departamento_id = departamentos[fila['codigo_departamento'].strip().zfill(2)]
+            mun = existentes.get(codigo)
+            if mun is None:
+                existentes[codigo] = mun = Municipio(codigo=codigo, nombre=nombre, departamento_id=departamento_id)
+                nuevos.append(mun)
+            elif (mun.nombre, mun.departamento_id) != (nombre, departamento_id):
+                mun.nombre, mun.departamento_id = nombre, departamento_id
+                cambiados.append(mun)
+        Municipio.objects.bulk_update(cambiados, ['nombre', 'departamento'], batch_size=500)
+        Municipio.objects.bulk_create(nuevos, batch_size=500)
+        return len(nuevos) + len(cambiados)
+
+    def _puestos(self, filas):
+        municipios = dict(Municipio.objects.values_list('codigo', 'id'))
+        existentes = {
+            (p.municipio_id, p.codigo): p for p in PuestoVotacion.objects.exclude(codigo='')
+        }
+        nuevos, cambiados, num_mesas = [], [], {}
+        for fila in filas:
+            municipio_id = municipios.get(fila['codigo_municipio'].strip().zfill(5))
+            if municipio_id is None:
+                raise CommandError(f'Puesto {fila["codigo_puesto"]}: municipio desconocido {fila["codigo_municipio"]}')
+            clave = (municipio_id, fila['codigo_puesto'].strip())
+            nombre = fila['puesto'].strip()[:200]
+            direccion = (fila.get('direccion') or '').strip()[:300]
+            puesto = existentes.get(clave)
+            if puesto is None:
+                existentes[clave] = puesto = PuestoVotacion(
+                    municipio_id=municipio_id, codigo=clave[1], nombre=nombre, direccion=direccion,
                 )
-                if mc:
-                    creados_mun += 1
+                nuevos.append(puesto)
+            elif (puesto.nombre, puesto.direccion) != (nombre, direccion):
+                puesto.nombre, puesto.direccion = nombre, direccion
+                cambiados.append(puesto)
+            num_mesas[clave] = int(fila.get('mesas') or 0)
+        PuestoVotacion.objects.bulk_update(cambiados, ['nombre', 'direccion'], batch_size=500)
+        PuestoVotacion.objects.bulk_create(nuevos, batch_size=500)
 
-        self.stdout.write(self.style.SUCCESS(
-            f'✅ Listo! Departamentos creados: {creados_dep} | Municipios creados: {creados_mun}'
-        ))
+        # Los ids de los puestos recién creados hacen falta para sus mesas
+        ids = {
+            (m, c): pk for pk, m, c in PuestoVotacion.objects.exclude(codigo='')
+            .values_list('id', 'municipio_id', 'codigo').iterator()
+        }
+        mesas = [
+            MesaVotacion(puesto_id=ids[clave], numero=numero)
+            for clave, total in num_mesas.items() for numero in range(1, total + 1)
+        ]
+        antes = MesaVotacion.objects.count()
+        MesaVotacion.objects.bulk_create(mesas, batch_size=2000, ignore_conflicts=True)
+        return len(nuevos) + len(cambiados), MesaVotacion.objects.count() - antes
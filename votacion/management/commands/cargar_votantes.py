@@ -0,0 +1,247 @@
+"""
+Carga masiva del censo electoral desde CSV o XLSX (upsert por cédula).
+Uso: python manage.py cargar_votantes archivo.csv [--lote 5000] [--rechazados rechazados.csv]
+
+Columnas reconocidas (encabezado, sin importar mayúsculas):
+cedula, nombres, apellidos, email, telefono, fecha_nacimiento,
+departamento (código DANE), municipio (código DIVIPOLA), puesto (código),
+mesa (número), direccion, barrio, latitud, longitud
+
+Solo se actualizan las columnas presentes en el archivo: recargar un archivo
+con menos columnas no borra los demás datos de los votantes existentes.
+"""
+import csv
+import datetime
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from votacion import carga, teselas
+from votacion.cedulas import normalizar as normalizar_cedula
+from votacion.models import Votante
+
+
+def _leer_csv(ruta, delimitador):
+    with open(ruta, newline='', encoding='utf-8-sig') as f:
+        lector = csv.reader(f, delimiter=delimitador)
+        encabezados = next(lector, None)
+        if encabezados is None:
+            return
+        yield encabezados
+        yield from lector
+
+
+def _leer_xlsx(ruta):
+    from openpyxl import load_workbook
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        for fila in libro.active.iter_rows(values_only=True):
+            yield ['' if v is None else v for v in fila]
+    finally:
+        libro.close()
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def _fecha(valor):
+    if isinstance(valor, datetime.datetime):
+        return valor.date()
+    if isinstance(valor, datetime.date):
+        return valor
+    texto = _texto(valor)
+    if not texto:
+        return None
+    for formato in ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y'):
+        try:
+            return datetime.datetime.strptime(texto, formato).date()
+        except ValueError:
+            pass
+    raise ValueError(f'fecha_nacimiento inválida: {texto}')
+
+
+# Columna del archivo → campos de Votante que llena (municipio también fija el departamento)
+COLUMNAS_CAMPOS = {
+    'email': ('email',),
+    'telefono': ('telefono',),
+    'fecha_nacimiento': ('fecha_nacimiento',),
+    'departamento': ('departamento_id',),
+    'municipio': ('municipio_id', 'departamento_id'),
+    'puesto': ('puesto_id',),
+    'mesa': ('mesa_id',),
+    'direccion': ('direccion',),
+    'barrio': ('barrio',),
+    'latitud': ('latitud', 'longitud'),
+    'longitud': ('latitud', 'longitud'),
+}
+
+
+def _campos_del_archivo(encabezados):
+    campos = {'cedula', 'nombres', 'apellidos'}
+    for columna in encabezados:
+        campos.update(COLUMNAS_CAMPOS.get(columna, ()))
+    return campos
+
+
+def _coordenada(valor, limite, nombre):
+    texto = _texto(valor).replace(',', '.')
+    if not texto:
+        return None
+    try:
+        numero = Decimal(texto).quantize(Decimal('0.0000001'))
+    except InvalidOperation:
+        raise ValueError(f'{nombre} inválida: {texto}')
+    if abs(numero) > limite:
+        raise ValueError(f'{nombre} fuera de rango: {texto}')
+    return numero
+
+
+class Command(BaseCommand):
+    help = 'Carga masiva de votantes desde CSV/XLSX con upsert por cédula'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo')
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por lote de inserción')
+        parser.add_argument('--delimitador', default=',', help='Delimitador del CSV')
+        parser.add_argument('--rechazados', help='CSV donde escribir las filas rechazadas '
+                                                 '(por defecto <archivo>.rechazados.csv)')
+        parser.add_argument('--sin-copy', action='store_true',
+                            help='En PostgreSQL usar bulk_create en lugar de COPY')
+
+    def handle(self, *args, **options):
+        ruta = Path(options['archivo'])
+        if not ruta.exists():
+            raise CommandError(f'No existe el archivo {ruta}')
+        if ruta.suffix.lower() in ('.xlsx', '.xlsm'):
+            filas = _leer_xlsx(ruta)
+        else:
+            filas = _leer_csv(ruta, options['delimitador'])
+
+        encabezados = next(filas, None)
+        if not encabezados:
+            raise CommandError('El archivo está vacío')
+        encabezados = [_texto(e).lower() for e in encabezados]
+        for requerido in ('cedula', 'nombres', 'apellidos'):
+            if requerido not in encabezados:
+                raise CommandError(f'Falta la columna obligatoria "{requerido}"')
+
+        ruta_rechazados = Path(options['rechazados'] or f'{ruta}.rechazados.csv')
+        self.codigos = carga.MapaCodigos()
+        self.campos = _campos_del_archivo(encabezados)
+        self.teselas_tocadas = set()
+        usar_copy = not options['sin_copy']
+        tamano = max(options['lote'], 1)
+
+        cargados = rechazados = 0
+        lote = {}
+        with open(ruta_rechazados, 'w', newline='', encoding='utf-8') as f_rechazados:
+            escritor = csv.writer(f_rechazados)
+            escritor.writerow(['linea', 'motivo'] + encabezados)
+            for linea, valores in enumerate(filas, start=2):
+                registro = dict(zip(encabezados, valores))
+                try:
+                    fila = self._convertir(registro)
+                except ValueError as e:
+                    rechazados += 1
+                    escritor.writerow([linea, str(e)] + [_texto(v) for v in valores])
+                    continue
+                # Dentro de un lote la última aparición de la cédula gana
+                lote[fila['cedula']] = fila
+                if len(lote) >= tamano:
+                    cargados += self._guardar(lote, usar_copy)
+                    lote = {}
+                    self.stdout.write(f'  {cargados} votantes cargados…')
+            cargados += self._guardar(lote, usar_copy)
+
+        carga.despues_de_carga(self.teselas_tocadas)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Listo! Votantes cargados: {cargados} | Rechazados: {rechazados}'
+        ))
+        if rechazados:
+            self.stdout.write(self.style.WARNING(f'⚠️  Filas rechazadas en {ruta_rechazados}'))
+        else:
+            ruta_rechazados.unlink(missing_ok=True)
+
+    def _convertir(self, registro):
+        cedula = normalizar_cedula(_texto(registro.get('cedula')))
+        nombres = _texto(registro.get('nombres'))
+        apellidos = _texto(registro.get('apellidos'))
+        if not cedula:
+            raise ValueError('cédula vacía o inválida')
+        if not nombres or not apellidos:
+            raise ValueError('nombres y apellidos son obligatorios')
+
+        codigos = self.codigos
+        departamento_id = municipio_id = puesto_id = mesa_id = None
+        cod_dep = _texto(registro.get('departamento'))
+        if cod_dep:
+            departamento_id = codigos.departamentos.get(cod_dep.zfill(2))
+            if departamento_id is None:
+                raise ValueError(f'departamento desconocido: {cod_dep}')
+        cod_mun = _texto(registro.get('municipio'))
+        if cod_mun:
+            municipio_id = codigos.municipios.get(cod_mun.zfill(5))
+            if municipio_id is None:
+                raise ValueError(f'municipio desconocido: {cod_mun}')
+            departamento_id = departamento_id or codigos.municipio_departamento[municipio_id]
+        cod_puesto = _texto(registro.get('puesto'))
+        if cod_puesto:
+            puesto_id = codigos.puestos.get((municipio_id, cod_puesto))
+            if puesto_id is None:
+                raise ValueError(f'puesto desconocido en el municipio: {cod_puesto}')
+        num_mesa = _texto(registro.get('mesa'))
+        if num_mesa:
+            try:
+                mesa_id = codigos.mesas.get((puesto_id, int(num_mesa)))
+            except ValueError:
+                mesa_id = None
+            if mesa_id is None:
+                raise ValueError(f'mesa desconocida en el puesto: {num_mesa}')
+
+        latitud = _coordenada(registro.get('latitud'), 90, 'latitud')
+        longitud = _coordenada(registro.get('longitud'), 180, 'longitud')
+        if (latitud is None) != (longitud is None):
+            raise ValueError('latitud y longitud deben venir juntas')
+
+        fila = {
+            'cedula': cedula[:20],
+            'nombres': nombres[:150],
+            'apellidos': apellidos[:150],
+            'email': _texto(registro.get('email'))[:254],
+            'telefono': _texto(registro.get('telefono'))[:20],
+            'fecha_nacimiento': _fecha(registro.get('fecha_nacimiento')),
+            'departamento_id': departamento_id,
+            'municipio_id': municipio_id,
+            'puesto_id': puesto_id,
+            'mesa_id': mesa_id,
+            'direccion': _texto(registro.get('direccion'))[:300],
+            'barrio': _texto(registro.get('barrio'))[:150],
+            'latitud': latitud,
+            'longitud': longitud,
+        }
+        return {campo: valor for campo, valor in fila.items() if campo in self.campos}
+
+    def _guardar(self, lote, usar_copy):
+        if not lote:
+            return 0
+        # Teselas del mapa de calor afectadas: ubicación anterior (si ya existía) y nueva.
+        # Sin columnas de coordenadas en el archivo la ubicación no cambia.
+        if 'latitud' in self.campos:
+            anteriores = Votante.objects.filter(
+                cedula__in=list(lote), latitud__isnull=False
+            ).values_list('latitud', 'longitud')
+            for lat, lng in anteriores.iterator():
+                self.teselas_tocadas.add(teselas.tesela_de(lat, lng, teselas.ZOOM_VERSION))
+            for fila in lote.values():
+                if fila['latitud'] is not None:
+                    self.teselas_tocadas.add(
+                        teselas.tesela_de(fila['latitud'], fila['longitud'], teselas.ZOOM_VERSION)
+                    )
+        carga.upsert_votantes(list(lote.values()), usar_copy=usar_copy)
+        return len(lote)
@@ -0,0 +1,60 @@
+"""
+Exporta encuestas o votantes a CSV, NDJSON o XLSX sin cargar todo en memoria.
+Uso: python manage.py exportar_datos encuestas --evento 3 --formato csv --salida encuestas.csv
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from votacion import exportar
+
+
+class Command(BaseCommand):
+    help = 'Exporta encuestas o votantes en streaming (csv, ndjson, xlsx)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('modelo', choices=['encuestas', 'votantes'])
+        parser.add_argument('--formato', choices=sorted(exportar.FORMATOS), default='csv')
+        parser.add_argument('--salida', help='Archivo de salida (por defecto stdout; obligatorio para xlsx)')
+        parser.add_argument('--evento', type=int, help='Solo encuestas de este evento (id)')
+        parser.add_argument('--departamento', type=int, help='Solo votantes de este departamento (id)')
+        parser.add_argument('--municipio', type=int, help='Solo votantes de este municipio (id)')
+
+    def handle(self, *args, **options):
+        formato = options['formato']
+        salida = options['salida']
+        if formato == 'xlsx' and not salida:
+            raise CommandError('El formato xlsx requiere --salida')
+
+        if options['modelo'] == 'encuestas':
+            encabezados, filas = exportar.filas_encuestas(options['evento'])
+            titulo = 'Encuestas'
+        else:
+            encabezados, filas = exportar.filas_votantes(options['departamento'], options['municipio'])
+            titulo = 'Votantes'
+
+        contador = _Contador(filas)
+        if formato == 'xlsx':
+            destino = open(salida, 'wb')
+        else:
+            destino = open(salida, 'w', encoding='utf-8', newline='') if salida else sys.stdout
+        try:
+            for trozo in exportar.generar(formato, encabezados, contador, titulo):
+                destino.write(trozo)
+        finally:
+            if salida:
+                destino.close()
+
+        if salida:
+            self.stdout.write(self.style.SUCCESS(f'✅ {contador.total} fila(s) exportadas a {salida}'))
+
+
+class _Contador:
+    """Envuelve el iterador de filas para contar lo exportado sin materializarlo."""
+    def __init__(self, filas):
+        self.filas = filas
+        self.total = 0
+
+    def __iter__(self):
+        for fila in self.filas:
+            self.total += 1
+            yield fila
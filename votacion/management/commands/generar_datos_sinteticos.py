@@ -0,0 +1,360 @@
+"""
+Genera un conjunto de datos electorales sintético y reproducible para pruebas de carga.
+Uso: python manage.py generar_datos_sinteticos [--votantes 5000000] [--semilla 42] [--hasta 2026-10-01]
+
+Sobre los municipios ya cargados (ver cargar_datos_colombia) crea puestos y
+mesas sintéticos, eventos con sus candidatos, encuestadores, votantes con
+coordenadas alrededor de su puesto y encuestas repartidas en los últimos días.
+El muestreo se hace por lotes con NumPy (vectorizado) y la inserción por las
+vías masivas: carga.upsert_votantes (COPY en PostgreSQL) y un INSERT ... ON
+CONFLICT (votante, evento) con executemany para las encuestas. Con la misma semilla, los mismos parámetros y la
+misma fecha --hasta los datos son idénticos, y volver a correr el comando
+actualiza en lugar de duplicar.
+
+Las cédulas sintéticas llevan el prefijo SD ("SD000000001"). Requiere numpy,
+que no es dependencia de producción: pip install numpy. Pensado para una base
+desechable de pruebas, no para producción.
+"""
+import datetime
+from math import pi
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from votacion import carga, conteos, contadores, geografia, resumenes, teselas
+from votacion.models import (TIPO_ELECCION_CHOICES, Candidato, Encuesta, EventoElectoral,
+                             MesaVotacion, Municipio, PartidoPolitico, PuestoVotacion, Votante)
+
+PREFIJO_CEDULA = 'SD'
+DIGITOS_CEDULA = 9
+PREFIJO_PUESTO = 'SD'
+PREFIJO_ENCUESTADOR = 'encuestador_sd'
+
+NOMBRES = [
+    'José', 'María', 'Luis', 'Ana', 'Carlos', 'Luz', 'Juan', 'Carmen', 'Jorge', 'Rosa',
+    'Andrés', 'Diana', 'Miguel', 'Sandra', 'Pedro', 'Claudia', 'Jhon', 'Martha', 'Camilo', 'Paola',
+    'Diego', 'Ángela', 'Alejandro', 'Gloria', 'Fernando', 'Patricia', 'Sebastián', 'Natalia', 'Óscar', 'Yolanda',
+    'Julián', 'Liliana', 'Santiago', 'Adriana', 'Daniel', 'Valentina', 'Felipe', 'Catalina', 'Mauricio', 'Marcela',
+    'Édgar', 'Luisa', 'Hernán', 'Daniela', 'Ricardo', 'Sofía', 'Jaime', 'Mónica', 'Iván', 'Lorena',
+    'Wilson', 'Esperanza', 'Germán', 'Beatriz', 'Alberto', 'Isabel', 'Fabio', 'Nelly', 'Rubén', 'Inés',
+]
+APELLIDOS = [
+    'Rodríguez', 'Gómez', 'González', 'Martínez', 'García', 'López', 'Hernández', 'Sánchez', 'Ramírez', 'Pérez',
+    'Díaz', 'Muñoz', 'Rojas', 'Moreno', 'Jiménez', 'Vargas', 'Castro', 'Gutiérrez', 'Álvarez', 'Ruiz',
+    'Romero', 'Ortiz', 'Suárez', 'Torres', 'Valencia', 'Quintero', 'Restrepo', 'Osorio', 'Cardona', 'Herrera',
+    'Mejía', 'Mosquera', 'Ospina', 'Cárdenas', 'Zapata', 'Parra', 'Arias', 'Guerrero', 'Peña', 'Salazar',
+    'Rincón', 'Acosta', 'Vásquez', 'Medina', 'Castaño', 'Bedoya', 'Benítez', 'Montoya', 'Londoño', 'Gil',
+    'Cruz', 'Reyes', 'Ríos', 'Correa', 'Bermúdez', 'Cifuentes', 'Ocampo', 'Agudelo', 'Palacios', 'Caicedo',
+    'Córdoba', 'Mendoza', 'Pineda', 'Galeano', 'Escobar', 'Duque', 'Buitrago', 'Patiño', 'Lozano', 'Guzmán',
+]
+CALLES = ['Calle', 'Carrera', 'Avenida', 'Diagonal', 'Transversal']
+# Caja aproximada del territorio continental (oeste, sur, este, norte) donde caen los municipios
+CONTINENTAL = (-77.5, 1.0, -72.0, 11.0)
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise CommandError('Este comando necesita numpy: pip install numpy')
+    return numpy
+
+
+def _zipf(np, n, s=0.8):
+    """Pesos decrecientes tipo Zipf: pocos nombres/apellidos muy frecuentes."""
+    pesos = 1.0 / np.arange(1, n + 1) ** s
+    return pesos / pesos.sum()
+
+
+def _cedula(i):
+    return f'{PREFIJO_CEDULA}{i + 1:0{DIGITOS_CEDULA}d}'
+
+
+def _teselas(np, lat, lng):
+    """Teselas (x, y) de ZOOM_VERSION que contienen los puntos, igual que teselas.tesela_de."""
+    n = 2 ** teselas.ZOOM_VERSION
+    x = np.clip(((lng + 180.0) / 360.0 * n).astype(np.int64), 0, n - 1)
+    lat_rad = np.radians(np.clip(lat, -85.0511, 85.0511))
+    y = np.clip(((1.0 - np.arcsinh(np.tan(lat_rad)) / pi) / 2.0 * n).astype(np.int64), 0, n - 1)
+    return set(zip(x.tolist(), y.tolist()))
+
+
+class Command(BaseCommand):
+    help = 'Genera votantes, candidatos y encuestas sintéticos y reproducibles para pruebas de carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--votantes', type=int, default=100000, help='Votantes a generar')
+        parser.add_argument('--eventos', type=int, default=2, help='Eventos electorales')
+        parser.add_argument('--candidatos', type=int, default=12, help='Candidatos por evento')
+        parser.add_argument('--partidos', type=int, default=15, help='Partidos políticos')
+        parser.add_argument('--encuestadores', type=int, default=200, help='Usuarios encuestadores')
+        parser.add_argument('--puestos', type=int, default=4, help='Puestos sintéticos por municipio')
+        parser.add_argument('--mesas', type=int, default=12, help='Mesas por puesto')
+        parser.add_argument('--tasa-encuesta', type=float, default=0.6,
+                            help='Probabilidad de que un votante tenga encuesta en cada evento')
+        parser.add_argument('--tasa-geo', type=float, default=0.7,
+                            help='Fracción de votantes con coordenadas')
+        parser.add_argument('--dias', type=int, default=30, help='Días hacia atrás en que se reparten las encuestas')
+        parser.add_argument('--hasta', help='Último día de encuestas, AAAA-MM-DD (por defecto hoy)')
+        parser.add_argument('--semilla', type=int, default=42, help='Semilla del generador')
+        parser.add_argument('--lote', type=int, default=50000, help='Votantes por lote')
+        parser.add_argument('--sin-copy', action='store_true',
+                            help='En PostgreSQL usar bulk_create en lugar de COPY')
+
+    def handle(self, *args, **options):
+        np = _numpy()
+        if options['votantes'] >= 10 ** DIGITOS_CEDULA:
+            raise CommandError(f'--votantes debe ser menor que {10 ** DIGITOS_CEDULA}')
+        for opcion in ('eventos', 'candidatos', 'partidos', 'encuestadores', 'puestos', 'mesas', 'lote'):
+            if options[opcion] < 1:
+                raise CommandError(f'--{opcion} debe ser al menos 1')
+        try:
+            hasta = datetime.date.fromisoformat(options['hasta']) if options['hasta'] else timezone.localdate()
+        except ValueError:
+            raise CommandError('--hasta debe tener el formato AAAA-MM-DD')
+
+        self.np = np
+        self.opciones = options
+        self.semilla = options['semilla']
+        # Fin del día --hasta; las encuestas caen en los --dias anteriores
+        self.fin = timezone.make_aware(datetime.datetime.combine(hasta + datetime.timedelta(days=1),
+                                                                 datetime.time()))
+
+        inicio = timezone.now()
+        with transaction.atomic():
+            self._geografia()
+            self._eventos(hasta)
+            self._encuestadores()
+        self.stdout.write(
+            f'Geografía: {len(self.puestos)} puestos sintéticos | Eventos: {len(self.eventos)} | '
+            f'Candidatos: {sum(len(c) for c in self.candidatos)} | Encuestadores: {len(self.encuestadores)}'
+        )
+
+        total, lote = options['votantes'], options['lote']
+        self.teselas_tocadas = set()
+        encuestas = 0
+        for numero, desde in enumerate(range(0, total, lote)):
+            encuestas += self._lote(numero, desde, min(desde + lote, total))
+            self.stdout.write(f'  {min(desde + lote, total)} votantes, {encuestas} encuestas…')
+
+        self.stdout.write('Recalculando conteos, resúmenes, contadores y teselas…')
+        conteos.recalcular()
+        resumenes.recalcular()
+        carga.despues_de_carga(self.teselas_tocadas)
+        segundos = (timezone.now() - inicio).total_seconds()
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Listo! Votantes: {total} | Encuestas: {encuestas} | {segundos:.0f} s (semilla {self.semilla})'
+        ))
+
+    def _rng(self, *flujo):
+        # Un flujo independiente por etapa y lote: el resultado no depende del orden de ejecución
+        return self.np.random.default_rng([self.semilla, *flujo])
+
+    # ── Catálogos ──
+
+    def _geografia(self):
+        np = self.np
+        municipios = list(Municipio.objects.order_by('codigo', 'id').values_list('id', 'departamento_id'))
+        if not municipios:
+            raise CommandError('No hay municipios: ejecute primero cargar_datos_colombia')
+        rng = self._rng(0)
+        por_municipio, mesas_por_puesto = self.opciones['puestos'], self.opciones['mesas']
+
+        # Población por municipio muy desigual (pocas ciudades grandes), como en el censo real
+        peso_municipio = rng.lognormal(0.0, 1.5, len(municipios))
+        oeste, sur, este, norte = CONTINENTAL
+        centro_lng = rng.uniform(oeste, este, len(municipios))
+        centro_lat = rng.uniform(sur, norte, len(municipios))
+
+        existentes = {
+            (p.municipio_id, p.codigo): p
+            for p in PuestoVotacion.objects.filter(codigo__startswith=PREFIJO_PUESTO)
+        }
+        nuevos, claves = [], []
+        for municipio_id, _ in municipios:
+            for j in range(por_municipio):
+                clave = (municipio_id, f'{PREFIJO_PUESTO}{j + 1:03d}')
+                claves.append(clave)
+                if clave not in existentes:
+                    existentes[clave] = PuestoVotacion(
+                        municipio_id=municipio_id, codigo=clave[1],
+                        nombre=f'Puesto sintético {j + 1}', direccion=f'Sede {j + 1}',
+                    )
+                    nuevos.append(existentes[clave])
+        PuestoVotacion.objects.bulk_create(nuevos, batch_size=2000)
+        ids = {
+            (m, c): pk for pk, m, c in PuestoVotacion.objects.filter(codigo__startswith=PREFIJO_PUESTO)
+            .values_list('id', 'municipio_id', 'codigo').iterator()
+        }
+        self.puestos = np.array([ids[clave] for clave in claves], dtype=np.int64)
+
+        MesaVotacion.objects.bulk_create([
+            MesaVotacion(puesto_id=pk, numero=numero)
+            for pk in self.puestos.tolist() for numero in range(1, mesas_por_puesto + 1)
+        ], batch_size=5000, ignore_conflicts=True)
+        mesas = dict(
+            ((puesto_id, numero), pk) for pk, puesto_id, numero in
+            MesaVotacion.objects.filter(puesto__codigo__startswith=PREFIJO_PUESTO, numero__lte=mesas_por_puesto)
+            .values_list('id', 'puesto_id', 'numero').iterator()
+        )
+        # mesas[i, k] = id de la mesa k+1 del puesto i
+        self.mesas = np.array([
+            [mesas[(pk, numero)] for numero in range(1, mesas_por_puesto + 1)] for pk in self.puestos.tolist()
+        ], dtype=np.int64)
+
+        # Cada puesto hereda municipio, departamento, peso y un centro cercano al del municipio
+        self.puesto_municipio = np.repeat(np.array([m for m, _ in municipios], dtype=np.int64), por_municipio)
+        self.puesto_departamento = np.repeat(np.array([d for _, d in municipios], dtype=np.int64), por_municipio)
+        pesos = np.repeat(peso_municipio / por_municipio, por_municipio)
+        self.puesto_pesos = pesos / pesos.sum()
+        self.puesto_lng = np.repeat(centro_lng, por_municipio) + rng.normal(0, 0.03, len(self.puestos))
+        self.puesto_lat = np.repeat(centro_lat, por_municipio) + rng.normal(0, 0.03, len(self.puestos))
+        if nuevos:
+            contadores.invalidar('puestos')
+            geografia.invalidar()
+
+    def _eventos(self, hasta):
+        np = self.np
+        rng = self._rng(1)
+        partidos = []
+        for k in range(self.opciones['partidos']):
+            partido, _ = PartidoPolitico.objects.get_or_create(
+                nombre=f'Partido Sintético {k + 1}',
+                defaults={'sigla': f'PS{k + 1}', 'color': '#%06x' % int(rng.integers(0, 0xFFFFFF))},
+            )
+            partidos.append(partido.id)
+
+        self.eventos, self.candidatos, self.preferencias = [], [], []
+        tipos = [tipo for tipo, _ in TIPO_ELECCION_CHOICES]
+        nombres, apellidos = _zipf(np, len(NOMBRES)), _zipf(np, len(APELLIDOS))
+        for e in range(self.opciones['eventos']):
+            evento, _ = EventoElectoral.objects.get_or_create(
+                nombre=f'Evento sintético {e + 1}',
+                defaults={'tipo': tipos[e % len(tipos)], 'fecha': hasta + datetime.timedelta(days=30)},
+            )
+            n = self.opciones['candidatos']
+            existentes = set(Candidato.objects.filter(evento=evento).values_list('numero_lista', flat=True))
+            elegidos_n = rng.choice(len(NOMBRES), n, p=nombres)
+            elegidos_a = rng.choice(len(APELLIDOS), (n, 2), p=apellidos)
+            elegidos_p = rng.integers(0, len(partidos), n)
+            Candidato.objects.bulk_create([
+                Candidato(
+                    evento=evento, partido_id=partidos[elegidos_p[j]], numero_lista=j + 1,
+                    nombres=NOMBRES[elegidos_n[j]],
+                    apellidos=f'{APELLIDOS[elegidos_a[j, 0]]} {APELLIDOS[elegidos_a[j, 1]]}',
+                )
+                for j in range(n) if j + 1 not in existentes
+            ], batch_size=1000)
+            ids = dict(Candidato.objects.filter(evento=evento, numero_lista__lte=n)
+                       .values_list('numero_lista', 'id'))
+            self.eventos.append(evento.id)
+            self.candidatos.append(np.array([ids[j + 1] for j in range(n)], dtype=np.int64))
+            # Intención de voto desigual: unos pocos candidatos punteros
+            self.preferencias.append(rng.dirichlet(np.full(n, 0.8)))
+
+    def _encuestadores(self):
+        np = self.np
+        nombres = [f'{PREFIJO_ENCUESTADOR}{k + 1:04d}' for k in range(self.opciones['encuestadores'])]
+        existentes = set(User.objects.filter(username__in=nombres).values_list('username', flat=True))
+        sin_clave = make_password(None)
+        User.objects.bulk_create([
+            User(username=nombre, password=sin_clave, first_name='Encuestador', last_name=nombre[-4:])
+            for nombre in nombres if nombre not in existentes
+        ], batch_size=1000)
+        ids = dict(User.objects.filter(username__in=nombres).values_list('username', 'id'))
+        self.encuestadores = np.array([ids[nombre] for nombre in nombres], dtype=np.int64)
+        # Productividad desigual entre encuestadores
+        self.encuestador_pesos = self._rng(2).gamma(2.0, 1.0, len(nombres))
+        self.encuestador_pesos /= self.encuestador_pesos.sum()
+
+    # ── Votantes y encuestas ──
+
+    def _lote(self, numero, desde, hasta):
+        np = self.np
+        rng = self._rng(3, numero)
+        n = hasta - desde
+
+        puesto = rng.choice(len(self.puestos), n, p=self.puesto_pesos)
+        mesa = self.mesas[puesto, rng.integers(0, self.mesas.shape[1], n)]
+        nombre = rng.choice(len(NOMBRES), (n, 2), p=_zipf(np, len(NOMBRES)))
+        segundo_nombre = rng.random(n) < 0.45
+        apellido = rng.choice(len(APELLIDOS), (n, 2), p=_zipf(np, len(APELLIDOS)))
+        nacimiento = rng.integers(18 * 365, 90 * 365, n)
+        telefono = rng.integers(300_000_0000, 350_000_0000, n)
+        calle = rng.integers(0, len(CALLES), n)
+        numeros = rng.integers(1, 200, (n, 3))
+        geo = rng.random(n) < self.opciones['tasa_geo']
+        lat = np.round(self.puesto_lat[puesto] + rng.normal(0, 0.004, n), 7)
+        lng = np.round(self.puesto_lng[puesto] + rng.normal(0, 0.004, n), 7)
+        self.teselas_tocadas |= _teselas(np, lat[geo], lng[geo])
+
+        hoy = self.fin.date()
+        filas = [
+            {
+                'cedula': _cedula(desde + i),
+                'nombres': NOMBRES[n1] + (' ' + NOMBRES[n2] if dos else ''),
+                'apellidos': f'{APELLIDOS[a1]} {APELLIDOS[a2]}',
+                'email': '',
+                'telefono': str(tel),
+                'fecha_nacimiento': hoy - datetime.timedelta(days=dias),
+                'departamento_id': dep,
+                'municipio_id': mun,
+                'puesto_id': pto,
+                'mesa_id': ms,
+                'direccion': f'{CALLES[c]} {n1c} # {n2c}-{n3c}',
+                'barrio': '',
+                'latitud': la if g else None,
+                'longitud': lo if g else None,
+            }
+            for i, ((n1, n2), dos, (a1, a2), dias, tel, dep, mun, pto, ms, c, (n1c, n2c, n3c), g, la, lo)
+            in enumerate(zip(
+                nombre.tolist(), segundo_nombre.tolist(), apellido.tolist(), nacimiento.tolist(),
+                telefono.tolist(), self.puesto_departamento[puesto].tolist(),
+                self.puesto_municipio[puesto].tolist(), self.puestos[puesto].tolist(), mesa.tolist(),
+                calle.tolist(), numeros.tolist(), geo.tolist(), lat.tolist(), lng.tolist(),
+            ))
+        ]
+
+        with transaction.atomic():
+            carga.upsert_votantes(filas, usar_copy=not self.opciones['sin_copy'])
+            # Las cédulas tienen largo fijo: el rango usa el índice único
+            votantes = dict(
+                Votante.objects.filter(cedula__gte=_cedula(desde), cedula__lte=_cedula(hasta - 1))
+                .values_list('cedula', 'id')
+            )
+            ids = np.array([votantes[_cedula(i)] for i in range(desde, hasta)], dtype=np.int64)
+            return self._encuestas(rng, ids)
+
+    def _encuestas(self, rng, votantes):
+        np = self.np
+        segundos = self.opciones['dias'] * 86400
+        fecha = connection.ops.adapt_datetimefield_value
+        ahora = fecha(timezone.now())
+        filas = []
+        for evento, candidatos, preferencia in zip(self.eventos, self.candidatos, self.preferencias):
+            encuestados = votantes[rng.random(len(votantes)) < self.opciones['tasa_encuesta']]
+            m = len(encuestados)
+            candidato = candidatos[rng.choice(len(candidatos), m, p=preferencia)]
+            encuestador = self.encuestadores[rng.choice(len(self.encuestadores), m, p=self.encuestador_pesos)]
+            # Más encuestas cerca de la fecha final que al comienzo
+            atras = (segundos * rng.power(0.6, m)).astype(np.int64)
+            filas.extend(
+                (v, evento, c, u, fecha(self.fin - datetime.timedelta(seconds=s + 1)), ahora, '')
+                for v, c, u, s in zip(encuestados.tolist(), candidato.tolist(), encuestador.tolist(),
+                                      atras.tolist())
+            )
+        # INSERT ... ON CONFLICT directo: Encuesta.fecha es auto_now_add y
+        # bulk_create no respetaría la fecha generada
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {Encuesta._meta.db_table} '
+                f'(votante_id, evento_id, candidato_id, encuestador_id, fecha, actualizado_en, observacion) '
+                f'VALUES (%s, %s, %s, %s, %s, %s, %s) '
+                f'ON CONFLICT (votante_id, evento_id) DO UPDATE SET candidato_id = excluded.candidato_id, '
+                f'encuestador_id = excluded.encuestador_id, fecha = excluded.fecha, '
+                f'actualizado_en = excluded.actualizado_en',
+                filas,
+            )
+        return len(filas)
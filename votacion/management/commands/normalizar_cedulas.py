@@ -0,0 +1,50 @@
+"""
+Normaliza las cédulas que quedaron sin normalizar y lista las que colisionan.
+La migración 0007 deja sin tocar los votantes cuya cédula normalizada ya usa
+otro votante; tras unificarlos o corregirlos (p.ej. desde el admin) este
+comando termina el trabajo. Con --verificar solo reporta y falla si queda algo.
+Uso: python manage.py normalizar_cedulas [--verificar]
+"""
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from votacion import cedulas
+from votacion.models import Votante
+
+
+class Command(BaseCommand):
+    help = 'Normaliza las cédulas pendientes y lista las que colisionan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verificar', action='store_true',
+                            help='Solo reporta pendientes y colisiones; falla si los hay')
+
+    def handle(self, *args, **options):
+        grupos = defaultdict(list)
+        for pk, cedula in Votante.objects.values_list('pk', 'cedula').iterator():
+            grupos[cedulas.normalizar(cedula) or cedula].append((pk, cedula))
+
+        conflictos = {normal: filas for normal, filas in grupos.items() if len(filas) > 1}
+        pendientes = [(filas[0][0], normal) for normal, filas in grupos.items()
+                      if len(filas) == 1 and filas[0][1] != normal]
+
+        for normal, filas in sorted(conflictos.items()):
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  {normal}: ' + ', '.join(f'id {pk} ({cedula!r})' for pk, cedula in filas)
+            ))
+
+        if options['verificar']:
+            if conflictos or pendientes:
+                raise CommandError(f'{len(pendientes)} cédula(s) sin normalizar, {len(conflictos)} colisión(es)')
+            self.stdout.write(self.style.SUCCESS('✅ Todas las cédulas están normalizadas'))
+            return
+
+        with transaction.atomic():
+            for pk, normal in pendientes:
+                Votante.objects.filter(pk=pk).update(cedula=normal)
+            cedulas.limpiar()
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Cédulas normalizadas: {len(pendientes)} | Colisiones sin resolver: {len(conflictos)}'
+        ))
@@ -0,0 +1,34 @@
+"""
+Pre-calcula las teselas del mapa de calor de los zoom bajos (caché en disco).
+Uso: python manage.py prerenderizar_teselas [--zoom-min 5] [--zoom-max 8] [--evento ID] [--candidato ID]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from votacion import teselas
+
+
+class Command(BaseCommand):
+    help = 'Pre-renderiza las teselas del mapa de calor para Colombia en los zoom indicados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--zoom-min', type=int, default=5)
+        parser.add_argument('--zoom-max', type=int, default=teselas.ZOOM_VERSION)
+        parser.add_argument('--evento', type=int, help='Filtro de evento (id)')
+        parser.add_argument('--candidato', type=int, help='Filtro de candidato (id); requiere --evento')
+
+    def handle(self, *args, **options):
+        zoom_min, zoom_max = options['zoom_min'], options['zoom_max']
+        if not 0 <= zoom_min <= zoom_max <= teselas.ZOOM_MAXIMO:
+            raise CommandError(f'Rango de zoom inválido (0 ≤ min ≤ max ≤ {teselas.ZOOM_MAXIMO})')
+        if options['candidato'] and not options['evento']:
+            raise CommandError('--candidato requiere --evento')
+
+        total = 0
+        for z in range(zoom_min, zoom_max + 1):
+            n = 0
+            for x, y in teselas.teselas_en(teselas.EXTENSION_COLOMBIA, z):
+                teselas.obtener(z, x, y, options['evento'], options['candidato'])
+                n += 1
+            total += n
+            self.stdout.write(f'  zoom {z}: {n} tesela(s)')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Teselas listas: {total}'))
@@ -0,0 +1,91 @@
+"""
+Presupuesto de consultas SQL por vista: detecta N+1 y regresiones de rendimiento.
+Uso: python manage.py presupuesto_consultas [--vista nombre] [--verbose]
+
+Siembra un conjunto de datos realista dentro de una transacción que se
+deshace al final, recorre TODAS las rutas con nombre de votacion/urls.py y
+los changelists del admin con el cliente de pruebas de Django (caché vacía y
+contadores sin calcular antes de cada petición, como tras un despliegue) y
+compara cada respuesta con su presupuesto de votacion/presupuestos.py:
+consultas y milisegundos de SQL. Las pruebas (manage.py test) exigen el
+mismo número de consultas con assertNumQueries. Una consulta que
+se repite UMBRAL_REPETIDAS veces o más con distintos parámetros es un N+1 y
+también hace fallar la vista. Termina con error y un reporte de consultas
+repetidas si alguna vista se pasa; una ruta nueva sin presupuesto también falla.
+"""
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from votacion import presupuestos, replica
+from votacion.presupuestos import PRESUPUESTOS, UMBRAL_REPETIDAS
+
+
+class Command(BaseCommand):
+    help = 'Verifica el presupuesto de consultas SQL de cada vista y del admin'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vista', action='append', help='Solo estas rutas (se puede repetir)')
+        parser.add_argument('--verbose', action='store_true', help='Mostrar las consultas repetidas de todas las vistas')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        fallos = []
+        cache_vacia = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                   'LOCATION': 'presupuesto-consultas'}}
+        try:
+            with tempfile.TemporaryDirectory() as teselas_dir, \
+                    override_settings(CACHES=cache_vacia, TESELAS_DIR=teselas_dir, METRICAS_MUESTREO=0), \
+                    transaction.atomic():
+                datos = presupuestos.sembrar()
+                cliente = Client()
+                cliente.force_login(datos['usuario'])
+                # Los datos sembrados solo existen en la transacción de la
+                # primaria: con réplica configurada, todas las lecturas van ahí
+                cliente.cookies[replica.COOKIE] = '1'
+                for nombre, metodo, url, payload in presupuestos.peticiones(datos, options['vista']):
+                    if not self._medir(cliente, nombre, metodo, url, payload, options['verbose']):
+                        fallos.append(nombre)
+                transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+
+        if fallos:
+            raise CommandError(f'{len(fallos)} vista(s) fuera de presupuesto: {", ".join(fallos)}')
+        self.stdout.write(self.style.SUCCESS('✅ Todas las vistas dentro del presupuesto'))
+
+    def _medir(self, cliente, nombre, metodo, url, payload, verbose):
+        presupuesto = PRESUPUESTOS.get(nombre)
+        if presupuesto is None:
+            self.stdout.write(self.style.ERROR(f'❌ {nombre}: ruta sin presupuesto en PRESUPUESTOS'))
+            return False
+        max_consultas, max_ms = presupuesto
+
+        presupuestos.preparar()
+        with CaptureQueriesContext(connection) as capturadas:
+            respuesta = presupuestos.pedir(cliente, metodo, url, payload)
+        consultas = capturadas.captured_queries
+        ms = sum(float(q['time']) for q in consultas) * 1000
+        dobles = presupuestos.repetidas(consultas)
+
+        problemas = []
+        if respuesta.status_code >= 400:
+            problemas.append(f'HTTP {respuesta.status_code}')
+        if len(consultas) > max_consultas:
+            problemas.append(f'{len(consultas)} consultas > {max_consultas}')
+        if ms > max_ms:
+            problemas.append(f'{ms:.0f} ms de SQL > {max_ms}')
+        if dobles and dobles[0][0] >= UMBRAL_REPETIDAS:
+            problemas.append(f'posible N+1 ({dobles[0][0]} consultas iguales)')
+
+        resumen = f'{nombre:<34} {len(consultas):>3}/{max_consultas:<3} consultas {ms:>7.1f} ms  {metodo.upper()} {url}'
+        if problemas:
+            self.stdout.write(self.style.ERROR(f'❌ {resumen} — {"; ".join(problemas)}'))
+        else:
+            self.stdout.write(f'✅ {resumen}')
+        if dobles and (problemas or verbose):
+            for veces, sql in dobles[:5]:
+                self.stdout.write(f'     {veces}× {sql[:200]}')
+        return not problemas
@@ -0,0 +1,396 @@
+"""
+Prueba de carga HTTP: usuarios simulados concurrentes contra la aplicación WSGI.
+Uso: python manage.py prueba_carga [--usuarios 20] [--duracion 30] [--mezcla consulta=5,encuestador=3,estadisticas=1,mapa=1] [--salida resultados.json] [--comparar anterior.json]
+
+Por defecto levanta en este proceso un servidor WSGI con hilos (el mismo de
+runserver) que sirve config.wsgi.application en un puerto local libre, así
+que no necesita servicios externos: corre contra la base configurada (SQLite
+o un PostgreSQL local). Con --url se mide otro servidor (gunicorn, por
+ejemplo) que use la misma base de datos.
+
+Escenarios, elegidos al azar por cada usuario según --mezcla:
+- consulta: cédula en /consulta/ (aciertos y, 1 de cada 10, cédulas inexistentes)
+- encuestador: inicio → buscar cédula → elegir evento → registrar voto
+- estadisticas: página de resultados y primer nivel del drill-down
+- mapa: página del mapa de calor, datos del recuadro y teselas
+
+Reporta por endpoint peticiones/s y latencias p50/p95/p99 y, con el servidor
+en proceso, consultas SQL por petición. Los resultados quedan en JSON (con el
+commit) para comparar con --comparar. Registra encuestas de verdad: úsese
+sobre una base de pruebas, p.ej. la de generar_datos_sinteticos. Cliente y
+servidor comparten el GIL; para cifras absolutas conviene --url contra un
+servidor aparte y DEBUG=False.
+"""
+import datetime
+import http.client
+import json
+import random
+import statistics
+import subprocess
+import threading
+import time
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from importlib import import_module
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connection, connections
+from votacion import teselas
+from votacion.models import Candidato, EventoElectoral, Votante
+
+ESCENARIOS = ('consulta', 'encuestador', 'estadisticas', 'mapa')
+MEZCLA = 'consulta=5,encuestador=3,estadisticas=1,mapa=1'
+CABECERA_CONSULTAS = 'X-Prueba-Consultas'
+MUESTRA_VOTANTES = 2000
+
+
+# ── Servidor en proceso ──
+
+def _contar_consultas(aplicacion):
+    """Envuelve la app WSGI y devuelve en una cabecera cuántas consultas hizo la petición."""
+    def app(environ, start_response):
+        consultas = [0]
+        respuesta = {}
+
+        def contar(execute, sql, params, many, context):
+            consultas[0] += 1
+            return execute(sql, params, many, context)
+
+        def diferido(status, headers, exc_info=None):
+            respuesta['inicio'] = (status, headers, exc_info)
+
+        with connection.execute_wrapper(contar):
+            cuerpo = aplicacion(environ, diferido)
+        status, headers, exc_info = respuesta['inicio']
+        start_response(status, headers + [(CABECERA_CONSULTAS, str(consultas[0]))], exc_info)
+        return cuerpo
+    return app
+
+
+class _Silencioso(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def _servidor():
+    from config.wsgi import application
+
+    servidor = ThreadedWSGIServer(('127.0.0.1', 0), _Silencioso)
+    servidor.set_app(_contar_consultas(application))
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f'http://127.0.0.1:{servidor.server_address[1]}'
+
+
+# ── Cliente ──
+
+class _Usuario:
+    """Un navegador simulado: conexión keep-alive, cookies y token CSRF propios."""
+
+    def __init__(self, base, resultados, cookies=None):
+        partes = urlsplit(base)
+        self.conexion = http.client.HTTPConnection(partes.hostname, partes.port, timeout=60)
+        self.prefijo = partes.path.rstrip('/')
+        self.cookies = dict(cookies or {})
+        self.resultados = resultados
+
+    def pedir(self, nombre, ruta, datos=None):
+        cabeceras = {}
+        cuerpo = None
+        if self.cookies:
+            cabeceras['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        if datos is not None:
+            datos = dict(datos, csrfmiddlewaretoken=self.cookies.get(settings.CSRF_COOKIE_NAME, ''))
+            cuerpo = urlencode(datos)
+            cabeceras['Content-Type'] = 'application/x-www-form-urlencoded'
+        inicio = time.perf_counter()
+        try:
+            self.conexion.request('POST' if datos is not None else 'GET', self.prefijo + ruta, cuerpo, cabeceras)
+            respuesta = self.conexion.getresponse()
+            contenido = respuesta.read()
+        except (OSError, http.client.HTTPException):
+            self.conexion.close()
+            self.resultados.append((nombre, time.perf_counter() - inicio, 0, None, inicio))
+            return 0, b''
+        duracion = time.perf_counter() - inicio
+        for valor in respuesta.headers.get_all('Set-Cookie') or []:
+            for clave, morsel in SimpleCookie(valor).items():
+                self.cookies[clave] = morsel.value
+        consultas = respuesta.getheader(CABECERA_CONSULTAS)
+        self.resultados.append((nombre, duracion, respuesta.status, int(consultas) if consultas else None, inicio))
+        return respuesta.status, contenido
+
+
+def _sesion(usuario):
+    """Crea una sesión autenticada en el almacén de sesiones (como Client.force_login)."""
+    sesion = import_module(settings.SESSION_ENGINE).SessionStore()
+    sesion[SESSION_KEY] = str(usuario.pk)
+    sesion[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    sesion[HASH_SESSION_KEY] = usuario.get_session_auth_hash()
+    sesion.save()
+    return {settings.SESSION_COOKIE_NAME: sesion.session_key}
+
+
+# ── Escenarios ──
+
+def _consulta(u, datos, rng):
+    if settings.CSRF_COOKIE_NAME not in u.cookies:
+        u.pedir('consulta_formulario', '/consulta/')
+    if rng.random() < 0.1:
+        cedula = f'NOEXISTE{rng.randrange(10 ** 6)}'
+    else:
+        cedula = rng.choice(datos['votantes'])[1]
+    u.pedir('consulta', '/consulta/', {'cedula': cedula})
+
+
+def _encuestador(u, datos, rng):
+    if not datos['eventos']:
+        return
+    u.pedir('encuestador_inicio', '/encuestador/')
+    votante_id, cedula = rng.choice(datos['votantes'])
+    u.pedir('encuestador_buscar', '/encuestador/', {'cedula': cedula})
+    u.pedir('encuestador_elegir_evento', f'/encuestador/votante/{votante_id}/eventos/')
+    evento_id, candidatos = rng.choice(datos['eventos'])
+    ruta = f'/encuestador/votante/{votante_id}/evento/{evento_id}/votar/'
+    u.pedir('encuestador_registrar_voto', ruta)
+    u.pedir('encuestador_guardar_voto', ruta, {'candidato_id': rng.choice(candidatos), 'observacion': ''})
+
+
+def _estadisticas(u, datos, rng):
+    if not datos['eventos']:
+        u.pedir('estadisticas', '/encuestador/estadisticas/')
+        return
+    evento_id, candidatos = rng.choice(datos['eventos'])
+    u.pedir('estadisticas', f'/encuestador/estadisticas/?evento={evento_id}')
+    parametros = urlencode({'evento': evento_id, 'candidato': rng.choice(candidatos)})
+    u.pedir('estadisticas_municipios', f'/api/estadisticas/municipios/?{parametros}')
+
+
+def _mapa(u, datos, rng):
+    u.pedir('mapa_calor', '/encuestador/mapa-calor/')
+    if not datos['puntos']:
+        return
+    lat, lng = rng.choice(datos['puntos'])
+    bbox = f'{lng - 0.2:.4f},{lat - 0.2:.4f},{lng + 0.2:.4f},{lat + 0.2:.4f}'
+    u.pedir('mapa_calor_datos', f'/api/mapa-calor/?bbox={bbox}&z=11')
+    z = rng.randint(6, 12)
+    x, y = teselas.tesela_de(lat, lng, z)
+    for dx, dy in ((0, 0), (1, 0), (0, 1), (1, 1)):
+        u.pedir('mapa_calor_tesela', f'/encuestador/mapa-calor/tiles/{z}/{x + dx}/{y + dy}/')
+
+
+FUNCIONES = {'consulta': _consulta, 'encuestador': _encuestador, 'estadisticas': _estadisticas, 'mapa': _mapa}
+
+
+# ── Resultados ──
+
+def _percentiles(duraciones):
+    if len(duraciones) == 1:
+        return duraciones * 3
+    cortes = statistics.quantiles(duraciones, n=100, method='inclusive')
+    return cortes[49], cortes[94], cortes[98]
+
+
+def _resumen(filas, segundos):
+    duraciones = [f[1] * 1000 for f in filas]
+    consultas = [f[3] for f in filas if f[3] is not None]
+    p50, p95, p99 = _percentiles(duraciones)
+    return {
+        'peticiones': len(filas),
+        'errores': sum(1 for f in filas if not f[2] or f[2] >= 400),
+        'por_segundo': round(len(filas) / segundos, 2),
+        'p50_ms': round(p50, 2),
+        'p95_ms': round(p95, 2),
+        'p99_ms': round(p99, 2),
+        'max_ms': round(max(duraciones), 2),
+        'consultas': round(statistics.mean(consultas), 2) if consultas else None,
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconocido'
+
+
+class Command(BaseCommand):
+    help = 'Prueba de carga HTTP con usuarios concurrentes; reporta p50/p95/p99 y consultas por petición'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=20, help='Usuarios simulados concurrentes')
+        parser.add_argument('--duracion', type=float, default=30, help='Segundos de medición')
+        parser.add_argument('--calentamiento', type=float, default=3,
+                            help='Segundos iniciales que no se cuentan')
+        parser.add_argument('--mezcla', default=MEZCLA, help='Pesos de los escenarios, p.ej. consulta=1,mapa=1')
+        parser.add_argument('--url', help='Medir un servidor ya levantado en lugar del servidor en proceso')
+        parser.add_argument('--semilla', type=int, default=1, help='Semilla de las elecciones al azar')
+        parser.add_argument('--salida', help='Archivo JSON de resultados (por defecto prueba_carga_<commit>.json)')
+        parser.add_argument('--comparar', help='JSON de una corrida anterior para mostrar la diferencia')
+
+    def handle(self, *args, **options):
+        mezcla = self._mezcla(options['mezcla'])
+        if options['usuarios'] < 1 or options['duracion'] <= 0:
+            raise CommandError('--usuarios y --duracion deben ser positivos')
+        anterior = None
+        if options['comparar']:
+            try:
+                anterior = json.loads(Path(options['comparar']).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f'No se pudo leer {options["comparar"]}: {e}')
+
+        datos = self._datos()
+        sesiones = self._sesiones(options['usuarios']) if {'encuestador', 'estadisticas', 'mapa'} & set(mezcla) else []
+        connections.close_all()
+
+        servidor = None
+        if options['url']:
+            base = options['url'].rstrip('/')
+        else:
+            servidor, base = _servidor()
+            if settings.DEBUG:
+                self.stdout.write(self.style.WARNING('⚠️  DEBUG=True: las cifras no son las de producción'))
+        self.stdout.write(
+            f'Midiendo {base} con {options["usuarios"]} usuarios durante {options["duracion"]:.0f} s '
+            f'(+{options["calentamiento"]:.0f} s de calentamiento)…'
+        )
+
+        resultados = []
+        inicio = time.perf_counter()
+        desde = inicio + options['calentamiento']
+        hasta = desde + options['duracion']
+        hilos = [
+            threading.Thread(target=self._usuario, daemon=True, args=(
+                base, resultados, sesiones[i % len(sesiones)] if sesiones else None,
+                mezcla, datos, random.Random(options['semilla'] * 1000 + i), hasta,
+            ))
+            for i in range(options['usuarios'])
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        if servidor:
+            servidor.shutdown()
+            servidor.server_close()
+
+        segundos = min(time.perf_counter(), hasta) - desde
+        medidos = [f for f in resultados if f[4] >= desde and f[4] + f[1] <= hasta]
+        if not medidos:
+            raise CommandError('No se completó ninguna petición en la ventana de medición')
+        por_endpoint = defaultdict(list)
+        for fila in medidos:
+            por_endpoint[fila[0]].append(fila)
+        informe = {
+            'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+            'commit': _commit(),
+            'base_datos': connection.vendor,
+            'servidor': options['url'] or 'wsgi en proceso',
+            'debug': settings.DEBUG,
+            'usuarios': options['usuarios'],
+            'duracion_s': round(segundos, 2),
+            'mezcla': mezcla,
+            'total': _resumen(medidos, segundos),
+            'endpoints': {nombre: _resumen(filas, segundos) for nombre, filas in sorted(por_endpoint.items())},
+        }
+        self._imprimir(informe, anterior)
+
+        salida = Path(options['salida'] or f'prueba_carga_{informe["commit"]}.json')
+        salida.write_text(json.dumps(informe, indent=2, ensure_ascii=False))
+        total = informe['total']
+        mensaje = (f'{total["peticiones"]} peticiones, {total["por_segundo"]}/s, '
+                   f'p95 {total["p95_ms"]} ms. Resultados en {salida}')
+        if total['errores']:
+            self.stdout.write(self.style.WARNING(f'⚠️  {total["errores"]} errores | {mensaje}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ {mensaje}'))
+
+    def _mezcla(self, texto):
+        mezcla = {}
+        for parte in filter(None, texto.split(',')):
+            nombre, _, peso = parte.partition('=')
+            nombre = nombre.strip()
+            if nombre not in ESCENARIOS:
+                raise CommandError(f'Escenario desconocido "{nombre}"; opciones: {", ".join(ESCENARIOS)}')
+            try:
+                mezcla[nombre] = float(peso or 1)
+            except ValueError:
+                raise CommandError(f'Peso inválido para {nombre}: {peso}')
+        mezcla = {n: p for n, p in mezcla.items() if p > 0}
+        if not mezcla:
+            raise CommandError('La mezcla no tiene ningún escenario')
+        return mezcla
+
+    def _datos(self):
+        """Muestra fija de votantes, eventos y puntos para que cada corrida pida lo mismo."""
+        maximo = Votante.objects.order_by('-id').values_list('id', flat=True).first()
+        if not maximo:
+            raise CommandError('No hay votantes: cargue datos, p.ej. con generar_datos_sinteticos')
+        azar = random.Random(0)
+        ids = azar.sample(range(1, maximo + 1), min(maximo, MUESTRA_VOTANTES * 2))
+        filas = list(
+            Votante.objects.filter(id__in=ids).order_by('id')
+            .values_list('id', 'cedula', 'latitud', 'longitud')[:MUESTRA_VOTANTES]
+        )
+        candidatos = defaultdict(list)
+        for evento_id, candidato_id in Candidato.objects.filter(
+            activo=True, evento__in=EventoElectoral.objects.filter(activo=True)
+        ).values_list('evento_id', 'id'):
+            candidatos[evento_id].append(candidato_id)
+        return {
+            'votantes': [(pk, cedula) for pk, cedula, _, _ in filas],
+            'eventos': sorted(candidatos.items()),
+            'puntos': [(float(lat), float(lng)) for _, _, lat, lng in filas if lat is not None],
+        }
+
+    def _sesiones(self, n):
+        usuarios = list(User.objects.filter(username__startswith='encuestador_sd', is_active=True)
+                        .order_by('username')[:n])
+        if not usuarios:
+            usuario, _ = User.objects.get_or_create(username='prueba_carga', defaults={'first_name': 'Prueba'})
+            usuarios = [usuario]
+        return [_sesion(u) for u in usuarios]
+
+    def _usuario(self, base, resultados, cookies, mezcla, datos, rng, hasta):
+        usuario = _Usuario(base, resultados, cookies)
+        nombres, pesos = list(mezcla), list(mezcla.values())
+        try:
+            while time.perf_counter() < hasta:
+                FUNCIONES[rng.choices(nombres, pesos)[0]](usuario, datos, rng)
+        finally:
+            usuario.conexion.close()
+
+    def _imprimir(self, informe, anterior):
+        columnas = f'{"endpoint":<28}{"pet.":>7}{"err.":>6}{"pet/s":>9}{"p50":>9}{"p95":>9}{"p99":>9}{"consultas":>11}'
+        self.stdout.write(columnas)
+        self.stdout.write('─' * len(columnas))
+        previos = (anterior or {}).get('endpoints', {})
+        filas = list(informe['endpoints'].items()) + [('TOTAL', informe['total'])]
+        for nombre, r in filas:
+            consultas = '' if r['consultas'] is None else f'{r["consultas"]:.1f}'
+            self.stdout.write(
+                f'{nombre:<28}{r["peticiones"]:>7}{r["errores"]:>6}{r["por_segundo"]:>9.1f}'
+                f'{r["p50_ms"]:>9.1f}{r["p95_ms"]:>9.1f}{r["p99_ms"]:>9.1f}{consultas:>11}'
+            )
+            previo = anterior.get('total') if anterior and nombre == 'TOTAL' else previos.get(nombre)
+            if previo:
+                self.stdout.write(
+                    f'{"  vs " + anterior.get("commit", "anterior"):<28}{"":>13}'
+                    f'{_delta(r["por_segundo"], previo["por_segundo"]):>9}'
+                    f'{_delta(r["p50_ms"], previo["p50_ms"]):>9}{_delta(r["p95_ms"], previo["p95_ms"]):>9}'
+                    f'{_delta(r["p99_ms"], previo["p99_ms"]):>9}'
+                )
+
+
+def _delta(actual, previo):
+    if not previo:
+        return ''
+    return f'{(actual - previo) / previo * 100:+.0f}%'
@@ -0,0 +1,50 @@
+"""
+Reconstruye las tablas derivadas de encuestas (ConteoEncuesta y los resúmenes
+EncuestasPorHora / EncuestasPorDia) o verifica desvíos.
+Uso: python manage.py recalcular_conteos [--evento ID] [--verificar]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from votacion import conteos, resumenes
+from votacion.models import EventoElectoral
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los conteos materializados de encuestas y sus resúmenes por hora y día'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--evento', type=int, help='Solo este evento (id)')
+        parser.add_argument('--verificar', action='store_true',
+                            help='Solo reporta desvíos; falla si los hay y no modifica nada')
+
+    def handle(self, *args, **options):
+        evento = None
+        if options['evento']:
+            try:
+                evento = EventoElectoral.objects.get(pk=options['evento'])
+            except EventoElectoral.DoesNotExist:
+                raise CommandError(f'No existe el evento {options["evento"]}')
+
+        desvios = conteos.diferencias(evento)
+        for evento_id, candidato_id, guardado, real in desvios:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  Evento {evento_id} / candidato {candidato_id}: conteo {guardado}, real {real}'
+            ))
+        desvios_resumen = resumenes.diferencias(evento)
+        for tabla, (evento_id, encuestador_id, municipio_id, cubeta), guardado, real in desvios_resumen:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  Resumen por {tabla} {cubeta} evento {evento_id} / encuestador {encuestador_id} / '
+                f'municipio {municipio_id}: {guardado}, real {real}'
+            ))
+
+        if options['verificar']:
+            if desvios or desvios_resumen:
+                raise CommandError(f'{len(desvios)} conteo(s) y {len(desvios_resumen)} resumen(es) desviado(s)')
+            self.stdout.write(self.style.SUCCESS('✅ Conteos y resúmenes al día'))
+            return
+
+        filas = conteos.recalcular(evento)
+        filas_resumen = resumenes.recalcular(evento)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Conteos reconstruidos: {filas} fila(s), resúmenes: {filas_resumen} fila(s) | '
+            f'Desvíos corregidos: {len(desvios) + len(desvios_resumen)}'
+        ))
@@ -0,0 +1,17 @@
+"""
+Recalcula los contadores del dashboard y reporta los que estaban desviados.
+Pensado para ejecutarse periódicamente (cron de Railway) además del recálculo por CONTADORES_TTL.
+Uso: python manage.py reconciliar_contadores
+"""
+from django.core.management.base import BaseCommand
+from votacion import contadores
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores del dashboard (votantes, encuestas, candidatos, ...)'
+
+    def handle(self, *args, **options):
+        desvios = contadores.reconciliar()
+        for nombre, (guardado, real) in desvios.items():
+            self.stdout.write(self.style.WARNING(f'⚠️  {nombre}: guardado {guardado}, real {real}'))
+        self.stdout.write(self.style.SUCCESS(f'✅ Contadores recalculados | Desvíos corregidos: {len(desvios)}'))
@@ -0,0 +1,53 @@
+"""
+Verifica con EXPLAIN que las consultas más usadas de las vistas usan índices.
+Uso: python manage.py verificar_planes [--sembrar 20000] [--verbose]
+
+Con --sembrar se insertan datos sintéticos dentro de una transacción que se
+deshace al final (la base queda igual). En PostgreSQL se desactiva el seq scan
+dentro de esa transacción para que el plan muestre si existe un índice
+utilizable aunque la tabla sea pequeña. Termina con error si alguna consulta
+recorre completa una de las tablas vigiladas, sea la tabla o un índice
+entero; sirve como chequeo en CI. Las consultas y el criterio están en
+votacion/planes.py, compartidos con las pruebas.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from votacion import planes
+
+
+class Command(BaseCommand):
+    help = 'Verifica con EXPLAIN que las consultas frecuentes usan índices'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sembrar', type=int, default=0,
+                            help='Votantes sintéticos a insertar (se deshacen al terminar)')
+        parser.add_argument('--verbose', action='store_true', help='Mostrar todos los planes')
+
+    def handle(self, *args, **options):
+        fallos = []
+        with transaction.atomic():
+            if options['sembrar']:
+                ids = planes.sembrar(options['sembrar'])
+                planes.analizar()
+                self.stdout.write(f'Sembrados {options["sembrar"]} votantes (se deshacen al terminar)')
+            else:
+                ids = planes.ids_existentes()
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for nombre, qs, vigiladas, recorrido_ordenado in planes.consultas(ids):
+                plan, completas = planes.escaneos_completos(qs, recorrido_ordenado)
+                completas &= set(vigiladas)
+                if completas:
+                    fallos.append(nombre)
+                    self.stdout.write(self.style.ERROR(f'❌ {nombre}: recorre {", ".join(sorted(completas))}'))
+                    self.stdout.write(f'   {plan}')
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'✅ {nombre}'))
+                    if options['verbose']:
+                        self.stdout.write(f'   {plan}')
+            transaction.set_rollback(True)
+
+        if fallos:
+            raise CommandError(f'{len(fallos)} consulta(s) sin índice')
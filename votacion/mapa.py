@@ -0,0 +1,113 @@
+"""
+Agregación en cuadrícula para el mapa de calor de votantes.
+
+En vez de serializar cada votante con coordenadas, la base de datos agrupa
+los puntos del área visible en celdas lat/lng cuyo tamaño depende del zoom
+(o del tamaño del recuadro) y devuelve solo el centroide y el conteo de cada
+celda. Si en el recuadro hay pocos puntos se devuelven individualmente, con
+los datos del ciudadano para el popup del marcador.
+"""
+import math
+
+from django.db.models import Avg, Count, F, FloatField, Value
+from django.db.models.functions import Cast, Floor
+
+from .models import Encuesta, Votante
+
+# Tamaño aproximado de una celda en pantalla
+PIXELES_CELDA = 24
+# Por debajo de este número de puntos se envían los votantes uno a uno
+UMBRAL_PUNTOS = 1500
+# Celdas por lado cuando no se indica zoom
+CELDAS_POR_LADO = 64
+# Tope de celdas por lado del recuadro, sea cual sea el zoom pedido
+MAX_CELDAS_POR_LADO = 96
+
+
+def votantes_geo(evento_id=None, candidato_id=None):
+    """Votantes con coordenadas, opcionalmente solo los encuestados en el evento/candidato."""
+    qs = Votante.objects.filter(latitud__isnull=False, longitud__isnull=False)
+    if evento_id:
+        encuestas = Encuesta.objects.filter(evento_id=evento_id)
+        if candidato_id:
+            encuestas = encuestas.filter(candidato_id=candidato_id)
+        qs = qs.filter(pk__in=encuestas.values('votante_id'))
+    return qs
+
+
+def parsear_bbox(valor):
+    """'oeste,sur,este,norte' (formato de Leaflet toBBoxString) → tupla de floats o None."""
+    try:
+        oeste, sur, este, norte = (float(x) for x in (valor or '').split(','))
+    except ValueError:
+        return None
+    if not all(math.isfinite(x) for x in (oeste, sur, este, norte)):
+        return None
+    if sur > norte or oeste > este:
+        return None
+    return oeste, sur, este, norte
+
+
+def tamano_celda(bbox=None, zoom=None):
+    """
+    Lado de la celda en grados para el zoom de Leaflet o, si no hay zoom, para el recuadro.
+    Nunca es menor que el lado mayor del recuadro / MAX_CELDAS_POR_LADO: un zoom que no
+    corresponde al recuadro no puede disparar el número de celdas de la respuesta.
+    """
+    if bbox:
+        oeste, sur, este, norte = bbox
+        extension = max(norte - sur, este - oeste, 1e-6)
+    else:
+        extension = 360.0
+    if zoom is not None:
+        grados_por_pixel = 360.0 / (256 * 2 ** max(0, min(int(zoom), 22)))
+        return max(grados_por_pixel * PIXELES_CELDA, extension / MAX_CELDAS_POR_LADO)
+    return extension / CELDAS_POR_LADO
+
+
+def filtrar_bbox(qs, bbox):
+    if not bbox:
+        return qs
+    oeste, sur, este, norte = bbox
+    return qs.filter(latitud__range=(sur, norte), longitud__range=(oeste, este))
+
+
+def agregar_celdas(qs, celda):
+    """Lista de [lat, lng, n] con el centroide de cada celda, calculada con GROUP BY en la BD."""
+    celda_valor = Value(celda, output_field=FloatField())
+    filas = (
+        qs.order_by()
+        .annotate(
+            fila=Floor(Cast('latitud', FloatField()) / celda_valor),
+            columna=Floor(Cast('longitud', FloatField()) / celda_valor),
+        )
+        .values('fila', 'columna')
+        .annotate(n=Count('id'), lat=Avg(Cast(F('latitud'), FloatField())),
+                  lng=Avg(Cast(F('longitud'), FloatField())))
+        .values_list('lat', 'lng', 'n')
+    )
+    return [[round(lat, 6), round(lng, 6), n] for lat, lng, n in filas]
+
+
+def puntos_individuales(qs):
+    filas = qs.order_by().values_list(
+        'latitud', 'longitud', 'nombres', 'apellidos', 'cedula', 'municipio__nombre', 'direccion'
+    )
+    return [
+        {
+            'lat': float(lat), 'lng': float(lng),
+            'nombre': f'{nombres} {apellidos}', 'cedula': cedula,
+            'mun': mun or '', 'dir': direccion or '',
+        }
+        for lat, lng, nombres, apellidos, cedula, mun, direccion in filas
+    ]
+
+
+def datos_mapa(evento_id=None, candidato_id=None, bbox=None, zoom=None):
+    """Celdas agregadas o puntos individuales del recuadro pedido."""
+    qs = filtrar_bbox(votantes_geo(evento_id, candidato_id), bbox)
+    total = qs.count()
+    if total <= UMBRAL_PUNTOS:
+        return {'modo': 'puntos', 'total': total, 'puntos': puntos_individuales(qs)}
+    celda = tamano_celda(bbox, zoom)
+    return {'modo': 'celdas', 'total': total, 'celda': celda, 'celdas': agregar_celdas(qs, celda)}
@@ -0,0 +1,341 @@
+"""
+Instrumentación por petición: SQL, plantillas, vista y tamaño de respuesta.
+
+MetricasMiddleware mide una fracción de las peticiones
+(settings.METRICAS_MUESTREO) y para cada una:
+
+- cuenta las consultas y suma su duración con un execute_wrapper que cada
+  conexión instala al abrirse (bajo ASGI el ORM async corre en hilos con
+  conexiones propias, así que no basta envolver las del hilo del middleware);
+- suma el tiempo de render de plantillas (el backend PlantillasMedidas mide
+  solo el render exterior, así los includes y crispy no se cuentan dos veces;
+  incluye el SQL perezoso que se ejecute dentro de la plantilla);
+- toma el tiempo de la vista desde process_view hasta la respuesta y el total
+  del middleware hacia adentro;
+- escribe una línea JSON en el logger 'votacion.metricas' y, si el usuario
+  es staff, responde con la cabecera Server-Timing (a los demás no se les
+  muestran tiempos ni número de consultas).
+
+El middleware funciona en ambos modos (WSGI y ASGI); la medición en curso
+viaja en una ContextVar, que asgiref copia a los hilos de sync_to_async.
+
+Los agregados por vista y por minuto se acumulan en memoria y cada
+VOLCADO_SEGUNDOS se guardan en la caché con una clave por proceso (solo ese
+proceso la escribe, así los workers de gunicorn no se pisan). `resumen()` los
+junta para la página de staff /metricas/; los percentiles salen de un
+histograma de cubetas fijas y son aproximados. En el mismo volcado va una
+foto del pool de conexiones del proceso (votacion.pool_bd, si está activo)
+que `pools()` lista.
+"""
+import copy
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from . import pool_bd
+
+logger = logging.getLogger('votacion.metricas')
+
+# Límites superiores (ms) de las cubetas del histograma de duración total
+CUBETAS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float('inf'))
+VOLCADO_SEGUNDOS = 10
+# Una foto de pool más vieja que esto es de un proceso que ya no está
+VIDA_FOTO_POOL = 6 * VOLCADO_SEGUNDOS
+PREFIJO = 'metricas:'
+PROCESO = f'{socket.gethostname()}-{os.getpid()}'
+
+_actual = ContextVar('metricas_actual', default=None)
+
+
+class Medicion:
+    __slots__ = ('consultas', 'sql', 'plantillas', 'profundidad', 'inicio_vista', 'vista')
+
+    def __init__(self):
+        self.consultas = 0
+        self.sql = self.plantillas = self.vista = 0.0
+        self.profundidad = 0
+        self.inicio_vista = None
+
+
+def _medir_sql(execute, sql, params, many, context):
+    medicion = _actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.sql += time.perf_counter() - inicio
+        medicion.consultas += 1
+
+
+@receiver(connection_created)
+def _instalar(sender, connection, **kwargs):
+    # Al principio de la lista: un execute_wrapper() activo saca el último al salir
+    if _medir_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _medir_sql)
+
+
+# ── Plantillas ──
+
+class _PlantillaMedida(Template):
+    def render(self, context=None, request=None):
+        medicion = _actual.get()
+        if medicion is None:
+            return super().render(context, request)
+        medicion.profundidad += 1
+        inicio = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            medicion.profundidad -= 1
+            if not medicion.profundidad:
+                medicion.plantillas += time.perf_counter() - inicio
+
+
+class PlantillasMedidas(DjangoTemplates):
+    """DjangoTemplates que informa a la medición en curso cuánto tarda cada render."""
+
+    def from_string(self, template_code):
+        return _PlantillaMedida(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return _PlantillaMedida(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+# ── Agregados por vista ──
+
+def _minuto(instante=None):
+    return int((instante or time.time()) // 60)
+
+
+def _vacio():
+    return {'n': 0, 'total': 0.0, 'vista': 0.0, 'sql': 0.0, 'plantillas': 0.0,
+            'consultas': 0, 'bytes': 0, 'max': 0.0, 'cubetas': [0] * len(CUBETAS_MS)}
+
+
+def _sumar(destino, origen):
+    for campo in ('n', 'total', 'vista', 'sql', 'plantillas', 'consultas', 'bytes'):
+        destino[campo] += origen[campo]
+    destino['max'] = max(destino['max'], origen['max'])
+    destino['cubetas'] = [a + b for a, b in zip(destino['cubetas'], origen['cubetas'])]
+
+
+class _Agregador:
+    """Agregados {minuto: {vista: ...}} de este proceso, volcados a la caché cada tanto."""
+
+    def __init__(self):
+        self.minutos = {}
+        self.pendientes = set()
+        self.ultimo_volcado = time.monotonic()
+        self.lock = threading.Lock()
+
+    def registrar(self, vista, datos):
+        minuto = _minuto()
+        with self.lock:
+            agregado = self.minutos.setdefault(minuto, {}).setdefault(vista, _vacio())
+            agregado['n'] += 1
+            for campo in ('total', 'vista', 'sql', 'plantillas', 'consultas', 'bytes'):
+                agregado[campo] += datos[campo]
+            agregado['max'] = max(agregado['max'], datos['total'])
+            agregado['cubetas'][next(i for i, limite in enumerate(CUBETAS_MS) if datos['total'] <= limite)] += 1
+            self.pendientes.add(minuto)
+            vencido = time.monotonic() - self.ultimo_volcado >= VOLCADO_SEGUNDOS
+        if vencido:
+            self.volcar()
+
+    def volcar(self):
+        ventana = settings.METRICAS_VENTANA_MINUTOS
+        with self.lock:
+            self.ultimo_volcado = time.monotonic()
+            limite = _minuto() - ventana
+            for minuto in [m for m in self.minutos if m < limite]:
+                del self.minutos[minuto]
+            copias = {m: copy.deepcopy(self.minutos[m]) for m in self.pendientes if m in self.minutos}
+            self.pendientes.clear()
+        duracion = (ventana + 5) * 60
+        for minuto, vistas in copias.items():
+            cache.set(f'{PREFIJO}{minuto}:{PROCESO}', vistas, duracion)
+            # Índice de procesos del minuto; si dos procesos se pisan, el que
+            # falte se vuelve a anotar en su próximo volcado de ese minuto
+            procesos = cache.get(f'{PREFIJO}{minuto}') or []
+            if PROCESO not in procesos:
+                cache.set(f'{PREFIJO}{minuto}', procesos + [PROCESO], duracion)
+        pools = pool_bd.estadisticas()
+        if pools:
+            cache.set(f'{PREFIJO}pool:{PROCESO}', {'instante': time.time(), 'pools': pools}, VIDA_FOTO_POOL)
+            procesos = cache.get(f'{PREFIJO}pool') or []
+            if PROCESO not in procesos:
+                cache.set(f'{PREFIJO}pool', procesos + [PROCESO], None)
+
+
+_agregador = _Agregador()
+
+
+def _percentil(cubetas, n, q):
+    acumulado = 0
+    for limite, cantidad in zip(CUBETAS_MS, cubetas):
+        acumulado += cantidad
+        if acumulado >= q * n:
+            return limite
+    return CUBETAS_MS[-1]
+
+
+def _leer(minutos):
+    """{vista: agregado} sumando todos los procesos de los minutos dados."""
+    indices = cache.get_many([f'{PREFIJO}{m}' for m in minutos])
+    claves = [f'{PREFIJO}{m}:{p}' for m in minutos for p in indices.get(f'{PREFIJO}{m}', [])]
+    total = {}
+    for vistas in cache.get_many(claves).values():
+        for vista, agregado in vistas.items():
+            _sumar(total.setdefault(vista, _vacio()), agregado)
+    return total
+
+
+def _fila(agregado):
+    n = agregado['n']
+    # Por encima de la última cubeta finita solo se sabe el máximo
+    p50, p95 = (min(_percentil(agregado['cubetas'], n, q), round(agregado['max'], 1)) for q in (0.5, 0.95))
+    return {
+        'peticiones': n,
+        'total_ms': round(agregado['total'] / n, 1),
+        'p50_ms': p50,
+        'p95_ms': p95,
+        'max_ms': round(agregado['max'], 1),
+        'vista_ms': round(agregado['vista'] / n, 1),
+        'sql_ms': round(agregado['sql'] / n, 1),
+        'consultas': round(agregado['consultas'] / n, 1),
+        'plantillas_ms': round(agregado['plantillas'] / n, 1),
+        'bytes': round(agregado['bytes'] / n),
+    }
+
+
+def resumen(minutos):
+    """Agregados por vista de los últimos `minutos` y de los `minutos` anteriores."""
+    _agregador.volcar()
+    ahora = _minuto()
+    actual = _leer(range(ahora - minutos + 1, ahora + 1))
+    anterior = _leer(range(ahora - 2 * minutos + 1, ahora - minutos + 1))
+    vistas = []
+    for vista, agregado in sorted(actual.items(), key=lambda par: -par[1]['total']):
+        fila = _fila(agregado)
+        fila['vista'] = vista
+        fila['anterior'] = _fila(anterior[vista]) if vista in anterior else None
+        vistas.append(fila)
+    return vistas
+
+
+def pools():
+    """Última foto del pool de conexiones de cada proceso vivo, una fila por (proceso, alias)."""
+    _agregador.volcar()
+    procesos = cache.get(f'{PREFIJO}pool') or []
+    fotos = cache.get_many([f'{PREFIJO}pool:{p}' for p in procesos])
+    vivos = [p for p in procesos if f'{PREFIJO}pool:{p}' in fotos]
+    if vivos != procesos:
+        cache.set(f'{PREFIJO}pool', vivos, None)
+    filas = []
+    for proceso in vivos:
+        foto = fotos[f'{PREFIJO}pool:{proceso}']
+        for alias, datos in sorted(foto['pools'].items()):
+            filas.append({'proceso': proceso, 'alias': alias, 'hace_s': round(time.time() - foto['instante']), **datos})
+    return filas
+
+
+# ── Middleware ──
+
+def _es_staff(request):
+    usuario = getattr(request, 'user', None)
+    return bool(usuario and usuario.is_staff)
+
+
+class MetricasMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        if random.random() >= settings.METRICAS_MUESTREO:
+            return self.get_response(request)
+        medicion = Medicion()
+        token = _actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _actual.reset(token)
+        self._reportar(request, response, medicion, inicio)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= settings.METRICAS_MUESTREO:
+            return await self.get_response(request)
+        medicion = Medicion()
+        token = _actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _actual.reset(token)
+        self._reportar(request, response, medicion, inicio)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        medicion = _actual.get()
+        if medicion is not None:
+            medicion.inicio_vista = time.perf_counter()
+
+    def _reportar(self, request, response, medicion, inicio):
+        fin = time.perf_counter()
+        total = fin - inicio
+        if medicion.inicio_vista is not None:
+            medicion.vista = fin - medicion.inicio_vista
+        tamano = len(response.content) if not response.streaming else 0
+        datos = {
+            'total': total * 1000,
+            'vista': medicion.vista * 1000,
+            'sql': medicion.sql * 1000,
+            'plantillas': medicion.plantillas * 1000,
+            'consultas': medicion.consultas,
+            'bytes': tamano,
+        }
+        coincidencia = getattr(request, 'resolver_match', None)
+        vista = coincidencia.view_name if coincidencia else '(sin ruta)'
+        if settings.METRICAS_SERVER_TIMING and _es_staff(request):
+            response['Server-Timing'] = ', '.join([
+                f'sql;dur={datos["sql"]:.1f};desc="{medicion.consultas} consultas"',
+                f'plantillas;dur={datos["plantillas"]:.1f}',
+                f'vista;dur={datos["vista"]:.1f}',
+                f'total;dur={datos["total"]:.1f}',
+            ])
+        logger.info(json.dumps({
+            'vista': vista, 'metodo': request.method, 'ruta': request.path, 'estado': response.status_code,
+            'total_ms': round(datos['total'], 2), 'vista_ms': round(datos['vista'], 2),
+            'sql_ms': round(datos['sql'], 2), 'consultas': medicion.consultas,
+            'plantillas_ms': round(datos['plantillas'], 2),
+            'bytes': tamano if not response.streaming else None,
+        }))
+        _agregador.registrar(vista, datos)
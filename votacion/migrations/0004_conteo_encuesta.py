@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def poblar_conteos(apps, schema_editor):
+    Encuesta = apps.get_model('votacion', 'Encuesta')
+    ConteoEncuesta = apps.get_model('votacion', 'ConteoEncuesta')
+    filas = (Encuesta.objects.order_by().values('evento_id', 'candidato_id')
+             .annotate(votos=models.Count('id')))
+    ConteoEncuesta.objects.bulk_create([
+        ConteoEncuesta(evento_id=f['evento_id'], candidato_id=f['candidato_id'], votos=f['votos'])
+        for f in filas
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('votacion', '0003_votante_geolocalizacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConteoEncuesta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('votos', models.PositiveIntegerField(default=0)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('candidato', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conteos', to='votacion.candidato')),
+                ('evento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conteos', to='votacion.eventoelectoral')),
+            ],
+            options={
+                'verbose_name': 'Conteo de Encuestas',
+                'verbose_name_plural': 'Conteos de Encuestas',
+                'ordering': ['evento', '-votos'],
+                'unique_together': {('evento', 'candidato')},
+            },
+        ),
+        migrations.RunPython(poblar_conteos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('votacion', '0004_conteo_encuesta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionTesela',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('z', models.PositiveSmallIntegerField()),
+                ('x', models.PositiveIntegerField()),
+                ('y', models.PositiveIntegerField()),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Versión de Tesela',
+                'verbose_name_plural': 'Versiones de Teselas',
+                'unique_together': {('z', 'x', 'y')},
+            },
+        ),
+    ]
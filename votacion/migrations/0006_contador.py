@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('votacion', '0005_version_tesela'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Contador',
+            fields=[
+                ('nombre', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('valor', models.BigIntegerField(default=0)),
+                ('recalculado_en', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Contador',
+                'verbose_name_plural': 'Contadores',
+            },
+        ),
+    ]
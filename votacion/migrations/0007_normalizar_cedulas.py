@@ -0,0 +1,52 @@
+import re
+from collections import defaultdict
+
+from django.db import migrations
+
+MAX_CONFLICTOS_LISTADOS = 50
+
+
+def _normalizar(cedula):
+    # Misma regla que votacion.cedulas.normalizar
+    limpio = re.sub(r'[^0-9A-Za-z]', '', cedula or '').upper()
+    return limpio.lstrip('0') or limpio[:1]
+
+
+def normalizar_cedulas(apps, schema_editor):
+    """Normaliza las cédulas existentes (misma regla que votacion.cedulas.normalizar).
+
+    Si dos o más registros colapsan en la misma cédula no se tocan y se listan
+    en la salida: fallar aquí dejaría el despliegue reiniciándose en migrate.
+    Después de unificar o corregir esos votantes, `normalizar_cedulas`
+    normaliza los que quedaron pendientes.
+    """
+    Votante = apps.get_model('votacion', 'Votante')
+    grupos = defaultdict(list)
+    for pk, cedula in Votante.objects.values_list('pk', 'cedula').iterator():
+        grupos[_normalizar(cedula) or cedula].append((pk, cedula))
+
+    conflictos = {}
+    for normal, filas in grupos.items():
+        if len(filas) > 1:
+            conflictos[normal] = filas
+        elif filas[0][1] != normal:
+            Votante.objects.filter(pk=filas[0][0]).update(cedula=normal)
+
+    if conflictos:
+        print(f'\n⚠️  {len(conflictos)} cédula(s) quedarían repetidas al normalizarse y no se modificaron:')
+        for normal, filas in sorted(conflictos.items())[:MAX_CONFLICTOS_LISTADOS]:
+            print(f'  {normal}: ' + ', '.join(f'id {pk} ({cedula!r})' for pk, cedula in filas))
+        if len(conflictos) > MAX_CONFLICTOS_LISTADOS:
+            print(f'  … y {len(conflictos) - MAX_CONFLICTOS_LISTADOS} más')
+        print('   Unifique o corrija esos votantes y ejecute: python manage.py normalizar_cedulas')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('votacion', '0006_contador'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalizar_cedulas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('votacion', '0007_normalizar_cedulas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CargaDatos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('huella', models.CharField(max_length=64)),
+                ('cargado_en', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Carga de Datos',
+                'verbose_name_plural': 'Cargas de Datos',
+            },
+        ),
+    ]
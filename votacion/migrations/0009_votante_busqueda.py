@@ -0,0 +1,83 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:51
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+def poblar_busqueda(apps, schema_editor):
+    """Llena Votante.busqueda (misma regla que votacion.busqueda.texto_votante)."""
+    Votante = apps.get_model('votacion', 'Votante')
+    lote = []
+    for votante in Votante.objects.only('id', 'apellidos', 'nombres').iterator(chunk_size=2000):
+        texto = unicodedata.normalize('NFKD', f'{votante.apellidos} {votante.nombres}')
+        texto = texto.encode('ascii', 'ignore').decode().lower()
+        votante.busqueda = ' '.join(re.sub(r'[^0-9a-z]+', ' ', texto).split())[:310]
+        lote.append(votante)
+        if len(lote) >= 2000:
+            Votante.objects.bulk_update(lote, ['busqueda'])
+            lote = []
+    Votante.objects.bulk_update(lote, ['busqueda'])
+
+
+SQL_POSTGRESQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS votacion_votante_busqueda_trgm '
+    'ON votacion_votante USING gin (busqueda gin_trgm_ops)',
+]
+SQL_POSTGRESQL_REVERSA = ['DROP INDEX IF EXISTS votacion_votante_busqueda_trgm']
+
+# Tabla FTS5 de contenido externo: guarda solo el índice de trigramas y lee
+# el texto de votacion_votante; los triggers la mantienen al día incluso con
+# bulk_create/UPSERT, que no disparan señales.
+SQL_SQLITE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS votacion_votante_fts USING fts5("
+    "busqueda, content='votacion_votante', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS votacion_votante_fts_ai AFTER INSERT ON votacion_votante BEGIN "
+    "INSERT INTO votacion_votante_fts(rowid, busqueda) VALUES (new.id, new.busqueda); END",
+    "CREATE TRIGGER IF NOT EXISTS votacion_votante_fts_ad AFTER DELETE ON votacion_votante BEGIN "
+    "INSERT INTO votacion_votante_fts(votacion_votante_fts, rowid, busqueda) "
+    "VALUES ('delete', old.id, old.busqueda); END",
+    "CREATE TRIGGER IF NOT EXISTS votacion_votante_fts_au AFTER UPDATE OF busqueda ON votacion_votante BEGIN "
+    "INSERT INTO votacion_votante_fts(votacion_votante_fts, rowid, busqueda) "
+    "VALUES ('delete', old.id, old.busqueda); "
+    "INSERT INTO votacion_votante_fts(rowid, busqueda) VALUES (new.id, new.busqueda); END",
+    "INSERT INTO votacion_votante_fts(votacion_votante_fts) VALUES ('rebuild')",
+]
+SQL_SQLITE_REVERSA = [
+    'DROP TRIGGER IF EXISTS votacion_votante_fts_ai',
+    'DROP TRIGGER IF EXISTS votacion_votante_fts_ad',
+    'DROP TRIGGER IF EXISTS votacion_votante_fts_au',
+    'DROP TABLE IF EXISTS votacion_votante_fts',
+]
+
+
+def _ejecutar(schema_editor, por_motor):
+    for sentencia in por_motor.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sentencia)
+
+
+def crear_indice(apps, schema_editor):
+    _ejecutar(schema_editor, {'postgresql': SQL_POSTGRESQL, 'sqlite': SQL_SQLITE})
+
+
+def borrar_indice(apps, schema_editor):
+    _ejecutar(schema_editor, {'postgresql': SQL_POSTGRESQL_REVERSA, 'sqlite': SQL_SQLITE_REVERSA})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('votacion', '0008_carga_datos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='votante',
+            name='busqueda',
+            field=models.CharField(blank=True, editable=False, max_length=310),
+        ),
+        migrations.RunPython(poblar_busqueda, migrations.RunPython.noop),
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('votacion', '0009_votante_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='votante',
+            index=models.Index(fields=['apellidos', 'nombres', 'id'], name='votante_orden_idx'),
+        ),
+    ]
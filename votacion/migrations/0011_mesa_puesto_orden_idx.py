@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('votacion', '0010_votante_orden_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mesavotacion',
+            index=models.Index(fields=['puesto', 'numero', 'id'], name='mesa_orden_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='puestovotacion',
+            index=models.Index(fields=['municipio', 'nombre', 'id'], name='puesto_orden_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('votacion', '0011_mesa_puesto_orden_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='encuesta',
+            index=models.Index(fields=['evento', 'candidato', 'votante'], name='encuesta_evento_cand_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='encuesta',
+            index=models.Index(fields=['encuestador', 'fecha'], name='encuesta_encuestador_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='votante',
+            index=models.Index(fields=['-creado_en'], name='votante_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='votante',
+            index=models.Index(condition=models.Q(('latitud__isnull', False)), fields=['latitud', 'longitud'], name='votante_geo_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('votacion', '0012_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnvioEncuesta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=64)),
+                ('creada', models.BooleanField(help_text='El envío creó la encuesta (si no, la actualizó)')),
+                ('recibido_en', models.DateTimeField(auto_now_add=True)),
+                ('encuesta', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='envios', to='votacion.encuesta')),
+                ('encuestador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='envios_encuestas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Envío de Encuesta',
+                'verbose_name_plural': 'Envíos de Encuestas',
+                'unique_together': {('encuestador', 'clave')},
+            },
+        ),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import TruncHour
+
+
+def poblar_resumenes(apps, schema_editor):
+    Encuesta = apps.get_model('votacion', 'Encuesta')
+    EncuestasPorHora = apps.get_model('votacion', 'EncuestasPorHora')
+    EncuestasPorDia = apps.get_model('votacion', 'EncuestasPorDia')
+    por_hora, por_dia = {}, {}
+    filas = (Encuesta.objects.order_by()
+             .values_list('evento_id', 'encuestador_id', 'votante__municipio_id', TruncHour('fecha'))
+             .annotate(n=models.Count('id')))
+    for evento_id, encuestador_id, municipio_id, hora, n in filas:
+        clave = (evento_id, encuestador_id, municipio_id)
+        por_hora[clave + (hora,)] = por_hora.get(clave + (hora,), 0) + n
+        por_dia[clave + (hora.date(),)] = por_dia.get(clave + (hora.date(),), 0) + n
+    for modelo, campo, filas in ((EncuestasPorHora, 'hora', por_hora), (EncuestasPorDia, 'dia', por_dia)):
+        modelo.objects.bulk_create([
+            modelo(evento_id=e, encuestador_id=u, municipio_id=m, encuestas=n, **{campo: cubeta})
+            for (e, u, m, cubeta), n in filas.items()
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('votacion', '0013_envio_encuesta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EncuestasPorDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('encuestas', models.PositiveIntegerField(default=0)),
+                ('dia', models.DateField()),
+                ('encuestador', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('evento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='votacion.eventoelectoral')),
+                ('municipio', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='votacion.municipio')),
+            ],
+            options={
+                'verbose_name': 'Encuestas por Día',
+                'verbose_name_plural': 'Encuestas por Día',
+            },
+        ),
+        migrations.CreateModel(
+            name='EncuestasPorHora',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('encuestas', models.PositiveIntegerField(default=0)),
+                ('hora', models.DateTimeField(help_text='Inicio de la hora (hora local)')),
+                ('encuestador', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('evento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='votacion.eventoelectoral')),
+                ('municipio', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='votacion.municipio')),
+            ],
+            options={
+                'verbose_name': 'Encuestas por Hora',
+                'verbose_name_plural': 'Encuestas por Hora',
+                'indexes': [models.Index(fields=['evento', 'hora'], name='resumen_hora_evento_idx'), models.Index(fields=['encuestador', 'hora'], name='resumen_hora_encuestador_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='encuestasporhora',
+            constraint=models.UniqueConstraint(condition=models.Q(('encuestador__isnull', False), ('municipio__isnull', False)), fields=('evento', 'encuestador', 'municipio', 'hora'), name='resumen_hora_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='encuestasporhora',
+            constraint=models.UniqueConstraint(condition=models.Q(('encuestador__isnull', True), ('municipio__isnull', False)), fields=('evento', 'municipio', 'hora'), name='resumen_hora_sin_encuestador'),
+        ),
+        migrations.AddConstraint(
+            model_name='encuestasporhora',
+            constraint=models.UniqueConstraint(condition=models.Q(('encuestador__isnull', False), ('municipio__isnull', True)), fields=('evento', 'encuestador', 'hora'), name='resumen_hora_sin_municipio'),
+        ),
+        migrations.AddConstraint(
+            model_name='encuestasporhora',
+            constraint=models.UniqueConstraint(condition=models.Q(('encuestador__isnull', True), ('municipio__isnull', True)), fields=('evento', 'hora'), name='resumen_hora_sin_ambos'),
+        ),
+        migrations.AddIndex(
+            model_name='encuestaspordia',
+            index=models.Index(fields=['evento', 'dia'], name='resumen_dia_evento_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='encuestaspordia',
+            index=models.Index(fields=['encuestador', 'dia'], name='resumen_dia_encuestador_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='encuestaspordia',
+            constraint=models.UniqueConstraint(condition=models.Q(('encuestador__isnull', False), ('municipio__isnull', False)), fields=('evento', 'encuestador', 'municipio', 'dia'), name='resumen_dia_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='encuestaspordia',
+            constraint=models.UniqueConstraint(condition=models.Q(('encuestador__isnull', True), ('municipio__isnull', False)), fields=('evento', 'municipio', 'dia'), name='resumen_dia_sin_encuestador'),
+        ),
+        migrations.AddConstraint(
+            model_name='encuestaspordia',
+            constraint=models.UniqueConstraint(condition=models.Q(('encuestador__isnull', False), ('municipio__isnull', True)), fields=('evento', 'encuestador', 'dia'), name='resumen_dia_sin_municipio'),
+        ),
+        migrations.AddConstraint(
+            model_name='encuestaspordia',
+            constraint=models.UniqueConstraint(condition=models.Q(('encuestador__isnull', True), ('municipio__isnull', True)), fields=('evento', 'dia'), name='resumen_dia_sin_ambos'),
+        ),
+        migrations.RunPython(poblar_resumenes, migrations.RunPython.noop),
+    ]
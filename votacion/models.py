@@ -46,6 +46,10 @@ class PuestoVotacion(models.Model):
 
     class Meta:
         ordering = ['municipio', 'nombre']
+        indexes = [
+            # Paginación por cursor del listado (ver votacion/paginacion.py)
+            models.Index(fields=['municipio', 'nombre', 'id'], name='puesto_orden_idx'),
+        ]
         verbose_name = 'Puesto de Votación'
         verbose_name_plural = 'Puestos de Votación'
 
@@ -61,6 +65,9 @@ class MesaVotacion(models.Model):
     class Meta:
         ordering = ['puesto', 'numero']
         unique_together = ('puesto', 'numero')
+        indexes = [
+            models.Index(fields=['puesto', 'numero', 'id'], name='mesa_orden_idx'),
+        ]
         verbose_name = 'Mesa de Votación'
         verbose_name_plural = 'Mesas de Votación'
 
@@ -185,8 +192,21 @@ class Votante(models.Model):
     creado_en = models.DateTimeField(auto_now_add=True)
     actualizado_en = models.DateTimeField(auto_now=True)
 
+    # "apellidos nombres" sin tildes ni mayúsculas, indexado para la búsqueda
+    # por nombre (ver votacion/busqueda.py)
+    busqueda = models.CharField(max_length=310, blank=True, editable=False)
+
     class Meta:
         ordering = ['apellidos', 'nombres']
+        indexes = [
+            # Paginación por cursor del listado (ver votacion/paginacion.py)
+            models.Index(fields=['apellidos', 'nombres', 'id'], name='votante_orden_idx'),
+            # Últimos registrados del dashboard
+            models.Index(fields=['-creado_en'], name='votante_creado_idx'),
+            # Mapa de calor: solo los votantes geolocalizados
+            models.Index(fields=['latitud', 'longitud'], name='votante_geo_idx',
+                         condition=models.Q(latitud__isnull=False)),
+        ]
         verbose_name = 'Votante'
         verbose_name_plural = 'Votantes'
 
@@ -219,8 +239,211 @@ class Encuesta(models.Model):
     class Meta:
         unique_together = ('votante', 'evento')
         ordering = ['-fecha']
+        indexes = [
+            # Encuestas de un evento/candidato (estadísticas, mapa de calor);
+            # incluye votante para resolver el semi-join solo con el índice
+            models.Index(fields=['evento', 'candidato', 'votante'], name='encuesta_evento_cand_idx'),
+            # "Mis encuestas de hoy" del encuestador
+            models.Index(fields=['encuestador', 'fecha'], name='encuesta_encuestador_idx'),
+        ]
         verbose_name = 'Encuesta'
         verbose_name_plural = 'Encuestas'
 
     def __str__(self):
         return f'{self.votante.nombre_completo} → {self.candidato.nombre_completo} ({self.evento.nombre})'
+
+
+# ──────────────────────────────────────────────
+# CONTEO MATERIALIZADO DE ENCUESTAS
+# ──────────────────────────────────────────────
+
+class ConteoEncuesta(models.Model):
+    """
+    Total de encuestas por (evento, candidato), mantenido por las señales de
+    Encuesta (ver votacion/conteos.py). Evita el GROUP BY sobre toda la tabla
+    de encuestas en las estadísticas; se reconstruye con `recalcular_conteos`.
+    """
+    evento = models.ForeignKey(EventoElectoral, on_delete=models.CASCADE, related_name='conteos')
+    candidato = models.ForeignKey(Candidato, on_delete=models.CASCADE, related_name='conteos')
+    votos = models.PositiveIntegerField(default=0)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('evento', 'candidato')
+        ordering = ['evento', '-votos']
+        verbose_name = 'Conteo de Encuestas'
+        verbose_name_plural = 'Conteos de Encuestas'
+
+    def __str__(self):
+        return f'{self.evento_id}/{self.candidato_id}: {self.votos}'
+
+
+# ──────────────────────────────────────────────
+# CONTADORES GLOBALES DEL DASHBOARD
+# ──────────────────────────────────────────────
+
+class Contador(models.Model):
+    """
+    Total global (votantes, encuestas, ...) mantenido por las señales con un
+    UPDATE atómico valor = valor + delta (ver votacion/contadores.py).
+    `recalculado_en` marca el último COUNT real; pasado settings.CONTADORES_TTL
+    el contador se vuelve a contar en la siguiente lectura.
+    """
+    nombre = models.CharField(max_length=50, primary_key=True)
+    valor = models.BigIntegerField(default=0)
+    recalculado_en = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Contador'
+        verbose_name_plural = 'Contadores'
+
+    def __str__(self):
+        return f'{self.nombre}: {self.valor}'
+
+
+# ──────────────────────────────────────────────
+# RESÚMENES DE ENCUESTAS POR HORA Y POR DÍA
+# ──────────────────────────────────────────────
+
+class ResumenEncuestas(models.Model):
+    """
+    Encuestas realizadas por (evento, encuestador, municipio del votante) en
+    una cubeta de tiempo según Encuesta.fecha. Los mantienen las señales de
+    Encuesta y las escrituras en bloque (ver votacion/resumenes.py); se
+    reconstruyen con `recalcular_conteos`.
+    """
+    evento = models.ForeignKey(EventoElectoral, on_delete=models.CASCADE, related_name='+')
+    encuestador = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    municipio = models.ForeignKey(Municipio, on_delete=models.SET_NULL, null=True, related_name='+')
+    encuestas = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+def _unicos_resumen(cubeta, prefijo):
+    """
+    Una fila por (evento, encuestador, municipio, cubeta), también cuando
+    encuestador o municipio son NULL: en SQL NULL no es igual a NULL y un
+    UNIQUE sobre las cuatro columnas aceptaría filas repetidas (Django 4.2 no
+    tiene nulls_distinct). Cada combinación de nulos tiene su índice parcial
+    sobre las columnas no nulas.
+    """
+    restricciones = []
+    for sufijo, sin_encuestador, sin_municipio in (
+            ('unico', False, False), ('sin_encuestador', True, False),
+            ('sin_municipio', False, True), ('sin_ambos', True, True)):
+        campos = ['evento'] + ([] if sin_encuestador else ['encuestador']) \
+            + ([] if sin_municipio else ['municipio']) + [cubeta]
+        restricciones.append(models.UniqueConstraint(
+            fields=campos, name=f'{prefijo}_{sufijo}',
+            condition=models.Q(encuestador__isnull=sin_encuestador, municipio__isnull=sin_municipio),
+        ))
+    return restricciones
+
+
+class EncuestasPorHora(ResumenEncuestas):
+    hora = models.DateTimeField(help_text='Inicio de la hora (hora local)')
+
+    class Meta:
+        constraints = _unicos_resumen('hora', 'resumen_hora')
+        indexes = [
+            models.Index(fields=['evento', 'hora'], name='resumen_hora_evento_idx'),
+            models.Index(fields=['encuestador', 'hora'], name='resumen_hora_encuestador_idx'),
+        ]
+        verbose_name = 'Encuestas por Hora'
+        verbose_name_plural = 'Encuestas por Hora'
+
+    def __str__(self):
+        return f'{self.evento_id}/{self.encuestador_id}/{self.municipio_id} {self.hora:%Y-%m-%d %H}h: {self.encuestas}'
+
+
+class EncuestasPorDia(ResumenEncuestas):
+    dia = models.DateField()
+
+    class Meta:
+        constraints = _unicos_resumen('dia', 'resumen_dia')
+        indexes = [
+            models.Index(fields=['evento', 'dia'], name='resumen_dia_evento_idx'),
+            # "Mis encuestas de hoy" del encuestador
+            models.Index(fields=['encuestador', 'dia'], name='resumen_dia_encuestador_idx'),
+        ]
+        verbose_name = 'Encuestas por Día'
+        verbose_name_plural = 'Encuestas por Día'
+
+    def __str__(self):
+        return f'{self.evento_id}/{self.encuestador_id}/{self.municipio_id} {self.dia}: {self.encuestas}'
+
+
+# ──────────────────────────────────────────────
+# VERSIÓN DE TESELAS DEL MAPA DE CALOR
+# ──────────────────────────────────────────────
+
+class VersionTesela(models.Model):
+    """
+    Contador de cambios por tesela (z/x/y) del mapa de calor en el zoom
+    teselas.ZOOM_VERSION. Se incrementa cuando cambia un votante o una encuesta
+    dentro de la tesela; la caché en disco usa la versión como parte de la
+    clave. Las teselas de zoom menor derivan la suya de estas filas.
+    """
+    z = models.PositiveSmallIntegerField()
+    x = models.PositiveIntegerField()
+    y = models.PositiveIntegerField()
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('z', 'x', 'y')
+        verbose_name = 'Versión de Tesela'
+        verbose_name_plural = 'Versiones de Teselas'
+
+    def __str__(self):
+        return f'{self.z}/{self.x}/{self.y} v{self.version}'
+
+
+# ──────────────────────────────────────────────
+# HUELLAS DE CARGAS DE DATOS
+# ──────────────────────────────────────────────
+
+class CargaDatos(models.Model):
+    """
+    Huella (sha256) del último archivo de datos cargado por un comando, p.ej.
+    la DIVIPOLA de `cargar_datos_colombia`. Si el archivo no cambió, el comando
+    termina con una sola consulta en vez de recorrer toda la geografía.
+    """
+    nombre = models.CharField(max_length=50, unique=True)
+    huella = models.CharField(max_length=64)
+    cargado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Carga de Datos'
+        verbose_name_plural = 'Cargas de Datos'
+
+    def __str__(self):
+        return f'{self.nombre} ({self.huella[:12]})'
+
+
+# ──────────────────────────────────────────────
+# ENVÍOS DE ENCUESTAS POR LOTE (IDEMPOTENCIA)
+# ──────────────────────────────────────────────
+
+class EnvioEncuesta(models.Model):
+    """
+    Clave de idempotencia de cada ítem recibido por la API de lotes
+    (votacion/lote_encuestas.py). Si el cliente reintenta un envío cuya
+    respuesta no le llegó, los ítems con clave ya registrada se responden con
+    el resultado original sin volver a aplicarse (un reintento tardío no debe
+    deshacer un cambio posterior de la misma encuesta).
+    """
+    encuestador = models.ForeignKey(User, on_delete=models.CASCADE, related_name='envios_encuestas')
+    clave = models.CharField(max_length=64)
+    encuesta = models.ForeignKey(Encuesta, on_delete=models.SET_NULL, null=True, related_name='envios')
+    creada = models.BooleanField(help_text='El envío creó la encuesta (si no, la actualizó)')
+    recibido_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('encuestador', 'clave')
+        verbose_name = 'Envío de Encuesta'
+        verbose_name_plural = 'Envíos de Encuestas'
+
+    def __str__(self):
+        return f'{self.encuestador_id}/{self.clave}'
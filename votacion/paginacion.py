@@ -0,0 +1,169 @@
+"""
+Paginación por cursor (keyset) para listados grandes.
+
+En lugar de OFFSET/LIMIT se recuerda la última fila entregada y la página
+siguiente se pide con `(campo1, campo2, ...) > (valor1, valor2, ...)`, que el
+motor resuelve con el índice correspondiente sin recorrer las filas previas.
+El cursor viaja al cliente como un token opaco (JSON en base64 urlsafe).
+
+`paginar()` arma una página de un listado HTML con enlaces anterior/siguiente
+a partir de esos cursores y un único COUNT (o ninguno, si quien llama ya
+conoce el total).
+"""
+import base64
+import json
+from urllib.parse import urlencode
+
+from django.db import models
+from django.db.models import Q
+
+# Rango de un entero de 64 bits: fuera de él la base de datos rechaza el parámetro
+_ENTERO_MAXIMO = 2 ** 63
+
+
+def codificar_cursor(valores):
+    crudo = json.dumps(list(valores), separators=(',', ':'), default=str).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip('=')
+
+
+def decodificar_cursor(token, tipos):
+    """
+    Devuelve la lista de valores del cursor o None si el token no es válido.
+    `tipos` es el tipo esperado de cada campo del orden, p.ej. (str, str, int):
+    un valor de otro tipo (o un id fuera de rango) llegaría a la consulta y
+    terminaría en un error 500.
+    """
+    if not token:
+        return None
+    try:
+        relleno = '=' * (-len(token) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(token + relleno))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(valores, list) or len(valores) != len(tipos):
+        return None
+    for valor, tipo in zip(valores, tipos):
+        # bool es subclase de int: true/false no es un id válido
+        if isinstance(valor, bool) or not isinstance(valor, tipo):
+            return None
+        if tipo is int and not -_ENTERO_MAXIMO <= valor < _ENTERO_MAXIMO:
+            return None
+    return valores
+
+
+def _tipos(modelo, campos):
+    """Tipo de cada campo para decodificar_cursor: int en enteros y llaves foráneas, str en el resto."""
+    tipos = []
+    for nombre in campos:
+        campo = modelo._meta.get_field(nombre)
+        if campo.is_relation:
+            campo = campo.target_field
+        tipos.append(int if isinstance(campo, models.IntegerField) else str)
+    return tuple(tipos)
+
+
+def _filtro(campos, valores, lookup):
+    condicion = Q()
+    for i, campo in enumerate(campos):
+        paso = Q(**{f'{campo}__{lookup}': valores[i]})
+        for previo, valor in zip(campos[:i], valores[:i]):
+            paso &= Q(**{previo: valor})
+        condicion |= paso
+    # Cota redundante sobre el primer campo: sin ella el motor no sabe dónde
+    # empezar en el índice y lo recorre desde el principio (SCAN en vez de SEARCH)
+    return Q(**{f'{campos[0]}__{lookup}e': valores[0]}) & condicion
+
+
+def filtro_despues(campos, valores):
+    """Q equivalente a (campos) > (valores) en orden lexicográfico ascendente."""
+    return _filtro(campos, valores, 'gt')
+
+
+def filtro_antes(campos, valores):
+    """Q equivalente a (campos) < (valores) en orden lexicográfico ascendente."""
+    return _filtro(campos, valores, 'lt')
+
+
+class Pagina:
+    """Filas de una página, el total y los tokens/enlaces a la anterior y la siguiente.
+
+    `anterior` y `siguiente` son los tokens (para clientes JSON); los enlaces
+    `url_anterior` / `url_siguiente` conservan el resto del querystring.
+    """
+
+    def __init__(self, objetos, total, anterior, siguiente, parametros, clave_anterior='antes'):
+        self.objetos = objetos
+        self.total = total
+        self.anterior = anterior
+        self.siguiente = siguiente
+        self.parametros = parametros
+        self.clave_anterior = clave_anterior
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+    def _url(self, clave, token):
+        if token is None:
+            return None
+        return '?' + urlencode({**self.parametros, clave: token})
+
+    @property
+    def url_anterior(self):
+        return self._url(self.clave_anterior, self.anterior)
+
+    @property
+    def url_siguiente(self):
+        return self._url('despues', self.siguiente)
+
+    @property
+    def has_other_pages(self):
+        return bool(self.anterior or self.siguiente)
+
+
+def paginar(qs, request, campos=None, por_pagina=20, total=None):
+    """Página del queryset según los cursores ?despues= / ?antes= del request.
+
+    `campos` son los campos (ascendentes y únicos en conjunto, p.ej. terminando
+    en 'id') por los que se ordena y se pagina con keyset; deben ser columnas
+    de la propia tabla ('municipio_id', no 'municipio__nombre') para que un
+    índice sirva el orden. Con campos=None se respeta el orden propio del
+    queryset (p.ej. un ranking de búsqueda) y el token guarda un desplazamiento. Si `total` es None se hace un solo COUNT.
+    """
+    parametros = {k: v for k, v in request.GET.items() if k not in ('despues', 'antes', 'page')}
+    n = por_pagina
+
+    if campos is None:
+        desplazamiento = max((decodificar_cursor(request.GET.get('despues'), (int,)) or [0])[0], 0)
+        filas = list(qs[desplazamiento:desplazamiento + n + 1])
+        siguiente = codificar_cursor([desplazamiento + n]) if len(filas) > n else None
+        anterior = codificar_cursor([max(desplazamiento - n, 0)]) if desplazamiento else None
+        filas = filas[:n]
+        clave_anterior = 'despues'
+    else:
+        tipos = _tipos(qs.model, campos)
+        antes = decodificar_cursor(request.GET.get('antes'), tipos)
+        despues = decodificar_cursor(request.GET.get('despues'), tipos)
+        if antes:
+            inverso = [f'-{c}' for c in campos]
+            filas = list(qs.filter(filtro_antes(campos, antes)).order_by(*inverso)[:n + 1])
+            hay_previas = len(filas) > n
+            filas = filas[:n][::-1]
+            siguiente = codificar_cursor([getattr(filas[-1], c) for c in campos]) if filas else None
+            anterior = codificar_cursor([getattr(filas[0], c) for c in campos]) if hay_previas else None
+        else:
+            base = qs.order_by(*campos)
+            if despues:
+                base = base.filter(filtro_despues(campos, despues))
+            filas = list(base[:n + 1])
+            siguiente = codificar_cursor([getattr(filas[n - 1], c) for c in campos]) if len(filas) > n else None
+            filas = filas[:n]
+            anterior = codificar_cursor([getattr(filas[0], c) for c in campos]) if despues and filas else None
+        clave_anterior = 'antes'
+
+    if total is None:
+        completa = not request.GET.get('despues') and not request.GET.get('antes') and len(filas) < n
+        total = len(filas) if completa else qs.count()
+    return Pagina(filas, total, anterior, siguiente, parametros, clave_anterior)
@@ -0,0 +1,189 @@
+"""
+Consultas frecuentes de las vistas y lectura de sus planes (EXPLAIN).
+
+Lo usan el comando `verificar_planes` (sobre la base real o con datos
+sembrados) y las pruebas de votacion/tests.py, para que ambos vigilen las
+mismas consultas con el mismo criterio: una tabla vigilada no debe
+recorrerse completa, ni la tabla ni un índice entero (SCAN ... USING INDEX en
+SQLite, Index Scan sin Index Cond en PostgreSQL). Solo las consultas marcadas
+como recorrido ordenado con LIMIT pueden leer un índice desde el principio.
+"""
+import datetime
+import json
+import random
+import re
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.utils import timezone
+
+from . import mapa
+from .models import (Candidato, ConteoEncuesta, Departamento, Encuesta, EventoElectoral, MesaVotacion,
+                     Municipio, PartidoPolitico, PuestoVotacion, Votante)
+from .paginacion import filtro_despues
+
+ENCUESTA = Encuesta._meta.db_table
+VOTANTE = Votante._meta.db_table
+PUESTO = PuestoVotacion._meta.db_table
+MESA = MesaVotacion._meta.db_table
+
+# Órdenes de paginación de los listados (ver views.py)
+ORDEN_VOTANTES = ['apellidos', 'nombres', 'id']
+ORDEN_PUESTOS = ['municipio_id', 'nombre', 'id']
+ORDEN_MESAS = ['puesto_id', 'numero', 'id']
+
+
+def cursor_medio(modelo, campos, defecto):
+    """Cursor de una página a mitad del listado (como el de ?despues=)."""
+    mitad = modelo.objects.count() // 2
+    filas = list(modelo.objects.order_by(*campos).values_list(*campos)[mitad:mitad + 1])
+    return list(filas[0]) if filas else defecto
+
+
+def _cursores():
+    return {
+        'cursor_votante': cursor_medio(Votante, ORDEN_VOTANTES, ['M', 'M', 0]),
+        'cursor_puesto': cursor_medio(PuestoVotacion, ORDEN_PUESTOS, [0, 'M', 0]),
+        'cursor_mesa': cursor_medio(MesaVotacion, ORDEN_MESAS, [0, 0, 0]),
+    }
+
+
+def consultas(ids):
+    """(nombre, queryset, tablas que no deben recorrerse completas, recorrido ordenado).
+
+    Con recorrido ordenado=True se acepta leer un índice en orden desde el
+    principio: el LIMIT corta tras unas pocas filas (primera página, últimos).
+    """
+    hoy = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    return [
+        ('Encuestas por evento y candidato',
+         Encuesta.objects.filter(evento_id=ids['evento'], candidato_id=ids['candidato']).values('votante_id'),
+         [ENCUESTA], False),
+        ('Encuestas por candidato',
+         Encuesta.objects.filter(candidato_id=ids['candidato']).values('votante_id'),
+         [ENCUESTA], False),
+        ('Mis encuestas de hoy (encuestador_inicio)',
+         Encuesta.objects.filter(encuestador_id=ids['encuestador'], fecha__gte=hoy,
+                                 fecha__lt=hoy + datetime.timedelta(days=1)),
+         [ENCUESTA], False),
+        ('Conteos materializados del evento',
+         ConteoEncuesta.objects.filter(evento_id=ids['evento']),
+         [ConteoEncuesta._meta.db_table], False),
+        ('Últimos votantes (dashboard)',
+         Votante.objects.order_by('-creado_en')[:5],
+         [VOTANTE], True),
+        ('Votante por cédula (consulta pública)',
+         Votante.objects.filter(cedula='1000001'),
+         [VOTANTE], False),
+        ('Primera página del listado de votantes',
+         Votante.objects.order_by(*ORDEN_VOTANTES)[:21],
+         [VOTANTE], True),
+        ('Página intermedia del listado de votantes (cursor)',
+         Votante.objects.filter(filtro_despues(ORDEN_VOTANTES, ids['cursor_votante']))
+         .order_by(*ORDEN_VOTANTES)[:21],
+         [VOTANTE], False),
+        ('Página intermedia del listado de puestos (cursor)',
+         PuestoVotacion.objects.filter(filtro_despues(ORDEN_PUESTOS, ids['cursor_puesto']))
+         .order_by(*ORDEN_PUESTOS)[:51],
+         [PUESTO], False),
+        ('Página intermedia del listado de mesas (cursor)',
+         MesaVotacion.objects.filter(filtro_despues(ORDEN_MESAS, ids['cursor_mesa']))
+         .order_by(*ORDEN_MESAS)[:51],
+         [MESA], False),
+        ('Votantes geolocalizados en un área (mapa de calor)',
+         mapa.filtrar_bbox(mapa.votantes_geo(), (-75.7, 6.1, -75.5, 6.3)),
+         [VOTANTE], False),
+        ('Votantes geolocalizados de un candidato (mapa de calor)',
+         mapa.filtrar_bbox(mapa.votantes_geo(ids['evento'], ids['candidato']), (-75.7, 6.1, -75.5, 6.3)),
+         [VOTANTE, ENCUESTA], False),
+    ]
+
+
+def _nodos(nodo):
+    yield nodo
+    for hijo in nodo.get('Plans', ()):
+        yield from _nodos(hijo)
+
+
+def escaneos_completos(qs, recorrido_ordenado=False):
+    """(plan, tablas recorridas completas) de la consulta en SQLite o PostgreSQL.
+
+    Cuenta como completo el recorrido de la tabla y el de un índice sin
+    condición (salvo recorrido_ordenado). En SQLite SEARCH entra al índice por
+    una condición; SCAN lo lee desde el principio, use índice o no.
+    """
+    if connection.vendor == 'postgresql':
+        plan = qs.explain(format='json')
+        completas = set()
+        for nodo in _nodos(json.loads(plan)[0]['Plan']):
+            tipo = nodo['Node Type']
+            if tipo == 'Seq Scan':
+                completas.add(nodo['Relation Name'])
+            elif (tipo in ('Index Scan', 'Index Only Scan') and 'Index Cond' not in nodo
+                  and not recorrido_ordenado):
+                completas.add(nodo['Relation Name'])
+        return plan, completas
+    plan = qs.explain()
+    completas = set()
+    for tabla, resto in re.findall(r'\bSCAN (\w+)(.*)', plan):
+        if recorrido_ordenado and 'USING' in resto:
+            continue
+        completas.add(tabla)
+    return plan, completas
+
+
+def ids_existentes():
+    """Ids y cursores tomados de los datos ya cargados."""
+    encuesta = Encuesta.objects.order_by().first()
+    return {
+        'evento': encuesta.evento_id if encuesta else 1,
+        'candidato': encuesta.candidato_id if encuesta else 1,
+        'encuestador': encuesta.encuestador_id if encuesta else 1,
+        **_cursores(),
+    }
+
+
+def sembrar(n):
+    """Inserta n votantes sintéticos (con encuestas, puestos y mesas) y devuelve sus ids y cursores."""
+    aleatorio = random.Random(42)
+    encuestador = User.objects.create(username='verificar_planes_tmp')
+    evento = EventoElectoral.objects.create(
+        nombre='Verificación de planes', tipo='PRESIDENCIA', fecha=datetime.date.today()
+    )
+    partido = PartidoPolitico.objects.create(nombre='Verificación', sigla='VP')
+    candidatos = Candidato.objects.bulk_create([
+        Candidato(evento=evento, partido=partido, nombres=f'Candidato {i}', apellidos='Prueba')
+        for i in range(8)
+    ])
+    departamento = Departamento.objects.create(nombre='Verificación de planes', codigo='VP')
+    municipios = Municipio.objects.bulk_create([
+        Municipio(departamento=departamento, nombre=f'Municipio {i}', codigo=f'VP{i}') for i in range(20)
+    ])
+    puestos = PuestoVotacion.objects.bulk_create([
+        PuestoVotacion(municipio=municipios[i % 20], nombre=f'Puesto {i}', direccion='Sin dirección')
+        for i in range(max(n // 50, 20))
+    ], batch_size=2000)
+    MesaVotacion.objects.bulk_create([
+        MesaVotacion(puesto=puesto, numero=numero) for puesto in puestos for numero in range(1, 4)
+    ], batch_size=2000)
+    votantes = Votante.objects.bulk_create([
+        Votante(
+            cedula=f'VP{i}', nombres=f'Nombre{i % 997}', apellidos=f'Apellido{i % 1499}',
+            busqueda=f'apellido{i % 1499} nombre{i % 997}',
+            latitud=round(aleatorio.uniform(-4, 12), 6) if i % 3 else None,
+            longitud=round(aleatorio.uniform(-79, -67), 6) if i % 3 else None,
+        )
+        for i in range(n)
+    ], batch_size=2000)
+    Encuesta.objects.bulk_create([
+        Encuesta(votante=v, evento=evento, candidato=aleatorio.choice(candidatos), encuestador=encuestador)
+        for v in votantes if aleatorio.random() < 0.6
+    ], batch_size=2000)
+    return {'evento': evento.id, 'candidato': candidatos[0].id, 'encuestador': encuestador.id, **_cursores()}
+
+
+def analizar():
+    """Estadísticas al día tras sembrar, para que el planificador vea los datos nuevos."""
+    with connection.cursor() as cursor:
+        for tabla in (VOTANTE, ENCUESTA, PUESTO, MESA):
+            cursor.execute(f'ANALYZE {tabla}')
@@ -0,0 +1,67 @@
+"""
+Backend PostgreSQL con un pool de conexiones por proceso (psycopg_pool).
+
+Con ENGINE = 'votacion.pool_bd' cada alias de base de datos comparte un
+ConnectionPool entre todos los hilos del proceso: Django "abre" la conexión
+tomándola del pool y al "cerrarla" (fin de petición, CONN_MAX_AGE = 0) la
+devuelve. Así el número de conexiones a PostgreSQL queda acotado por
+workers × max_size sin importar cuántos hilos o peticiones async haya.
+
+Opciones en DATABASES[alias]['OPTIONS']['pool'] (settings las arma desde
+BD_POOL_*):
+- min_size / max_size: conexiones abiertas de reposo y tope por proceso;
+- timeout: segundos máximos esperando una conexión libre (luego OperationalError);
+- pre_ping: verifica la conexión con el servidor antes de entregarla;
+- max_idle / max_lifetime: se pasan tal cual a ConnectionPool.
+
+`estadisticas()` no importa psycopg: solo lee lo que los pools de este
+proceso registraron, para la página de métricas.
+"""
+import threading
+
+_pools = {}
+_esperas = {}
+_lock = threading.Lock()
+
+
+def registrar(alias, pool):
+    """Guarda el pool del alias (si otro hilo se adelantó, gana el primero)."""
+    with _lock:
+        _esperas.setdefault(alias, [0, 0.0, 0.0])
+        return _pools.setdefault(alias, pool)
+
+
+def anotar_espera(alias, segundos):
+    with _lock:
+        espera = _esperas[alias]
+        espera[0] += 1
+        espera[1] += segundos
+        espera[2] = max(espera[2], segundos)
+
+
+def estadisticas():
+    """{alias: {...}} del pool de cada alias en este proceso. La latencia de
+    entrega (espera_*) es la del lapso desde la llamada anterior; agotados
+    (timeouts) y conexiones_perdidas, acumulados desde que arrancó."""
+    resultado = {}
+    with _lock:
+        esperas = {alias: list(valores) for alias, valores in _esperas.items()}
+        for valores in _esperas.values():
+            valores[:] = [0, 0.0, 0.0]
+    for alias, pool in list(_pools.items()):
+        datos = pool.get_stats()
+        entregas, total, maximo = esperas.get(alias, (0, 0.0, 0.0))
+        resultado[alias] = {
+            'tamano': datos.get('pool_size', 0),
+            'en_uso': datos.get('pool_size', 0) - datos.get('pool_available', 0),
+            'disponibles': datos.get('pool_available', 0),
+            'esperando': datos.get('requests_waiting', 0),
+            'min': pool.min_size,
+            'max': pool.max_size,
+            'entregas': entregas,
+            'espera_media_ms': round(total / entregas * 1000, 2) if entregas else 0.0,
+            'espera_max_ms': round(maximo * 1000, 2),
+            'agotados': datos.get('requests_errors', 0),
+            'conexiones_perdidas': datos.get('connections_lost', 0),
+        }
+    return resultado
@@ -0,0 +1,73 @@
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel, is_psycopg3
+from django.db.backends.base.base import NO_DB_ALIAS
+
+from . import _pools, anotar_espera, registrar
+
+OPCIONES_POOL = ('min_size', 'max_size', 'timeout', 'max_idle', 'max_lifetime')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.settings_dict.get('CONN_MAX_AGE'):
+            raise ImproperlyConfigured(
+                'votacion.pool_bd maneja la vida de las conexiones: use CONN_MAX_AGE = 0'
+            )
+        if not is_psycopg3:
+            raise ImproperlyConfigured('votacion.pool_bd necesita psycopg 3 (psycopg[pool])')
+
+    @property
+    def _opciones_pool(self):
+        return dict(self.settings_dict['OPTIONS'].get('pool') or {})
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def _pool(self, conn_params):
+        pool = _pools.get(self.alias)
+        if pool is None:
+            try:
+                from psycopg_pool import ConnectionPool
+            except ImportError as e:
+                raise ImproperlyConfigured('votacion.pool_bd necesita psycopg_pool: pip install "psycopg[pool]"') from e
+            opciones = self._opciones_pool
+            pool = ConnectionPool(
+                kwargs=conn_params,
+                open=False,
+                check=ConnectionPool.check_connection if opciones.get('pre_ping', True) else None,
+                name=f'django-{self.alias}',
+                **{clave: opciones[clave] for clave in OPCIONES_POOL if clave in opciones},
+            )
+            pool = registrar(self.alias, pool)
+        # Se abre en el primer uso, ya dentro del worker (después del fork)
+        pool.open()
+        return pool
+
+    def get_new_connection(self, conn_params):
+        if self.alias == NO_DB_ALIAS:
+            # Conexión suelta a la base 'postgres' (crear/borrar bases de prueba)
+            return super().get_new_connection(conn_params)
+        nivel = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = IsolationLevel(nivel) if nivel is not None else IsolationLevel.READ_COMMITTED
+        pool = self._pool(conn_params)
+        inicio = time.perf_counter()
+        conexion = pool.getconn()
+        anotar_espera(self.alias, time.perf_counter() - inicio)
+        if nivel is not None:
+            conexion.isolation_level = self.isolation_level
+        return conexion
+
+    def _close(self):
+        if self.connection is None or self.alias == NO_DB_ALIAS:
+            return super()._close()
+        with self.wrap_database_errors:
+            # putconn revierte una transacción abierta y descarta la conexión si
+            # quedó rota; después de devolverla esta envoltura ya no la usa
+            _pools[self.alias].putconn(self.connection)
+            self.connection = None
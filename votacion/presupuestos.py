@@ -0,0 +1,242 @@
+"""
+Presupuesto de consultas SQL por vista: datos sembrados, peticiones y límites.
+
+Lo usan el comando `presupuesto_consultas` (reporte con tiempos y N+1) y las
+pruebas de votacion/tests.py, que exigen con assertNumQueries el número
+exacto de PRESUPUESTOS para cada ruta. Cada petición se mide en frío: caché
+vacía y contadores sin calcular, como tras un despliegue, así el número no
+depende del orden en que se recorren las rutas.
+"""
+import datetime
+import json
+import re
+from collections import Counter
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import URLPattern, reverse
+
+from . import conteos, resumenes, teselas, urls
+from .models import (Candidato, Contador, Departamento, Encuesta, EventoElectoral, MesaVotacion,
+                     Municipio, PartidoPolitico, PuestoVotacion, Votante)
+
+UMBRAL_REPETIDAS = 5
+MS_POR_DEFECTO = 250
+
+# Ruta → (consultas, máximo de ms de SQL) sobre los datos de sembrar(). El
+# comando falla si una vista se pasa; las pruebas exigen el número exacto, así
+# que al quitar una consulta también hay que bajar el presupuesto.
+PRESUPUESTOS = {
+    'dashboard': (11, MS_POR_DEFECTO),
+    'consulta_publica': (1, MS_POR_DEFECTO),
+    'api_municipios': (1, MS_POR_DEFECTO),
+    'api_puestos': (1, MS_POR_DEFECTO),
+    'api_mesas': (1, MS_POR_DEFECTO),
+    'api_geografia': (3, MS_POR_DEFECTO),
+    'votante_lista': (8, MS_POR_DEFECTO),
+    'votante_crear': (3, MS_POR_DEFECTO),
+    'votante_detalle': (8, MS_POR_DEFECTO),
+    'votante_editar': (4, MS_POR_DEFECTO),
+    'votante_eliminar': (3, MS_POR_DEFECTO),
+    'candidato_lista': (4, MS_POR_DEFECTO),
+    'candidato_crear': (6, MS_POR_DEFECTO),
+    'candidato_detalle': (8, MS_POR_DEFECTO),
+    'candidato_editar': (7, MS_POR_DEFECTO),
+    'candidato_eliminar': (4, MS_POR_DEFECTO),
+    'evento_lista': (3, MS_POR_DEFECTO),
+    'evento_crear': (2, MS_POR_DEFECTO),
+    'evento_editar': (3, MS_POR_DEFECTO),
+    'evento_eliminar': (3, MS_POR_DEFECTO),
+    'partido_lista': (3, MS_POR_DEFECTO),
+    'partido_crear': (2, MS_POR_DEFECTO),
+    'partido_editar': (3, MS_POR_DEFECTO),
+    'partido_eliminar': (3, MS_POR_DEFECTO),
+    'puesto_lista': (8, MS_POR_DEFECTO),
+    'puesto_crear': (3, MS_POR_DEFECTO),
+    'puesto_editar': (4, MS_POR_DEFECTO),
+    'puesto_eliminar': (4, MS_POR_DEFECTO),
+    'mesa_lista': (5, MS_POR_DEFECTO),
+    'mesa_crear': (3, MS_POR_DEFECTO),
+    'mesa_editar': (4, MS_POR_DEFECTO),
+    'mesa_eliminar': (4, MS_POR_DEFECTO),
+    'encuestador_inicio': (3, MS_POR_DEFECTO),
+    'encuestador_elegir_evento': (5, MS_POR_DEFECTO),
+    'encuestador_registrar_voto': (7, MS_POR_DEFECTO),
+    # Fijas más un UPDATE de ConteoEncuesta por candidato anterior distinto (no por ítem)
+    # y los resúmenes por hora/día (un UPDATE por cubeta; en bloque si son muchas)
+    'api_encuestas_lote': (22, MS_POR_DEFECTO),
+    'encuestador_estadisticas': (5, MS_POR_DEFECTO),
+    'api_estadisticas_en_vivo': (3, MS_POR_DEFECTO),
+    'encuestador_productividad': (4, MS_POR_DEFECTO),
+    'api_drill_municipios': (3, MS_POR_DEFECTO),
+    'api_drill_mesas': (3, MS_POR_DEFECTO),
+    'api_drill_votantes': (3, MS_POR_DEFECTO),
+    'mapa_calor_votantes': (9, MS_POR_DEFECTO),
+    'api_mapa_calor': (4, MS_POR_DEFECTO),
+    'mapa_calor_tesela': (4, MS_POR_DEFECTO),
+    'exportar_encuestas': (3, MS_POR_DEFECTO),
+    'exportar_votantes': (3, MS_POR_DEFECTO),
+    'metricas_vistas': (2, MS_POR_DEFECTO),
+    # Changelists del admin
+    'admin:auth_group_changelist': (5, MS_POR_DEFECTO),
+    'admin:auth_user_changelist': (6, MS_POR_DEFECTO),
+    'admin:votacion_departamento_changelist': (5, MS_POR_DEFECTO),
+    'admin:votacion_municipio_changelist': (6, MS_POR_DEFECTO),
+    'admin:votacion_puestovotacion_changelist': (7, MS_POR_DEFECTO),
+    'admin:votacion_mesavotacion_changelist': (6, MS_POR_DEFECTO),
+    'admin:votacion_eventoelectoral_changelist': (5, MS_POR_DEFECTO),
+    'admin:votacion_partidopolitico_changelist': (5, MS_POR_DEFECTO),
+    'admin:votacion_candidato_changelist': (8, MS_POR_DEFECTO),
+    'admin:votacion_votante_changelist': (7, MS_POR_DEFECTO),
+    'admin:votacion_encuesta_changelist': (8, MS_POR_DEFECTO),
+    'admin:votacion_conteoencuesta_changelist': (6, MS_POR_DEFECTO),
+    'admin:votacion_encuestasporhora_changelist': (8, MS_POR_DEFECTO),
+    'admin:votacion_encuestaspordia_changelist': (8, MS_POR_DEFECTO),
+}
+
+
+def normalizar_sql(sql):
+    """SQL sin literales, para agrupar la misma consulta con distintos parámetros."""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(?:\.\d+)?\b', '?', sql)
+    return re.sub(r'\(\s*\?(?:\s*,\s*\?)*\s*\)', '(...)', sql)
+
+
+def repetidas(consultas):
+    """[(veces, sql normalizado)] de las consultas que se repiten, de mayor a menor."""
+    conteo = Counter(normalizar_sql(q['sql']) for q in consultas)
+    return [(n, sql) for sql, n in conteo.most_common() if n > 1]
+
+
+def preparar():
+    """Deja la caché y los contadores como tras un despliegue, antes de medir una petición."""
+    cache.clear()
+    Contador.objects.all().delete()
+
+
+def pedir(cliente, metodo, url, payload):
+    """Hace la petición con el cliente de pruebas; 'json' es un POST con cuerpo JSON."""
+    if metodo == 'json':
+        respuesta = cliente.post(url, json.dumps(payload), content_type='application/json')
+    else:
+        respuesta = getattr(cliente, metodo)(url, payload)
+    if respuesta.streaming:
+        b''.join(respuesta.streaming_content)
+    return respuesta
+
+
+def peticiones(datos, solo=None):
+    """(nombre de ruta, método, url, datos) de cada ruta de votacion y cada changelist."""
+    ids = {
+        'votante': datos['votante'].pk, 'candidato': datos['candidato'].pk,
+        'evento': datos['evento'].pk, 'partido': datos['partido'].pk,
+        'puesto': datos['puesto'].pk, 'mesa': datos['mesa'].pk,
+        'encuestador_elegir_evento': datos['votante'].pk,
+    }
+    x, y = teselas.tesela_de(6.25, -75.57, 8)
+    kwargs_por_parametro = {
+        'votante_pk': datos['votante'].pk, 'evento_pk': datos['evento'].pk,
+        'departamento_id': datos['departamento'].pk, 'z': 8, 'x': x, 'y': y,
+    }
+    drill = {'evento': datos['evento'].pk, 'candidato': datos['candidato'].pk}
+    consulta = {
+        'consulta_publica': ('post', {'cedula': datos['votante'].cedula}),
+        'encuestador_inicio': ('post', {'cedula': 'NOEXISTE1'}),
+        'api_municipios': ('get', {'departamento_id': datos['departamento'].pk}),
+        'api_puestos': ('get', {'municipio_id': datos['municipio'].pk}),
+        'api_mesas': ('get', {'puesto_id': datos['puesto'].pk}),
+        'api_encuestas_lote': ('json', {'encuestas': [
+            {'clave': f'presupuesto-{i}', 'cedula': cedula, 'evento': datos['evento'].pk,
+             'candidato': datos['candidato'].pk}
+            for i, cedula in enumerate(Votante.objects.values_list('cedula', flat=True)[:50])
+        ]}),
+        'encuestador_estadisticas': ('get', {'evento': datos['evento'].pk}),
+        'api_drill_municipios': ('get', drill),
+        'api_drill_mesas': ('get', {**drill, 'municipio': datos['municipio'].pk}),
+        'api_drill_votantes': ('get', {**drill, 'municipio': datos['municipio'].pk,
+                                       'puesto': datos['puesto'].pk, 'mesa': datos['mesa'].pk}),
+        'mapa_calor_votantes': ('get', {'evento': datos['evento'].pk}),
+        'api_mapa_calor': ('get', {'evento': datos['evento'].pk, 'z': 12,
+                                   'bbox': '-75.7,6.1,-75.4,6.4'}),
+        'exportar_encuestas': ('get', {'evento': datos['evento'].pk}),
+    }
+
+    for patron in urls.urlpatterns:
+        if not isinstance(patron, URLPattern) or not patron.name:
+            continue
+        if solo and patron.name not in solo:
+            continue
+        kwargs = {}
+        for parametro in patron.pattern.converters:
+            if parametro == 'pk':
+                prefijo = next(p for p in ids if patron.name.startswith(p))
+                kwargs['pk'] = ids[prefijo]
+            else:
+                kwargs[parametro] = kwargs_por_parametro[parametro]
+        metodo, payload = consulta.get(patron.name, ('get', {}))
+        yield patron.name, metodo, reverse(patron.name, kwargs=kwargs), payload
+
+    for modelo in admin.site._registry:
+        nombre = f'admin:{modelo._meta.app_label}_{modelo._meta.model_name}_changelist'
+        if solo and nombre not in solo:
+            continue
+        yield nombre, 'get', reverse(nombre), {}
+
+
+def sembrar():
+    """Geografía, eventos, candidatos, votantes geolocalizados y encuestas."""
+    usuario = User.objects.create_superuser('presupuesto_tmp', 'presupuesto@example.com', 'x')
+    departamentos = Departamento.objects.bulk_create([
+        Departamento(nombre=f'Departamento Presupuesto {i}', codigo=f'P{i}') for i in range(3)
+    ])
+    municipios = Municipio.objects.bulk_create([
+        Municipio(departamento=d, nombre=f'Municipio {d.codigo}-{i}', codigo=f'{d.codigo}{i:03}')
+        for d in departamentos for i in range(4)
+    ])
+    puestos = PuestoVotacion.objects.bulk_create([
+        PuestoVotacion(municipio=m, nombre=f'Puesto {m.codigo}-{i}', direccion='Calle 1', codigo=str(i))
+        for m in municipios for i in range(3)
+    ])
+    mesas = MesaVotacion.objects.bulk_create([
+        MesaVotacion(puesto=p, numero=i) for p in puestos for i in range(1, 5)
+    ])
+    partidos = PartidoPolitico.objects.bulk_create([
+        PartidoPolitico(nombre=f'Partido {i}', sigla=f'PP{i}') for i in range(4)
+    ])
+    eventos = [
+        EventoElectoral.objects.create(nombre=f'Evento {i}', tipo='PRESIDENCIA',
+                                       fecha=datetime.date(2026, 5, 31))
+        for i in range(2)
+    ]
+    candidatos = Candidato.objects.bulk_create([
+        Candidato(evento=e, partido=partidos[i % 4], nombres=f'Candidato {i}', apellidos='Presupuesto',
+                  municipio=municipios[i], departamento=municipios[i].departamento)
+        for e in eventos for i in range(6)
+    ])
+    votantes = []
+    for i in range(300):
+        mesa = mesas[i % len(mesas)]
+        municipio = municipios[(i % len(mesas)) // 12]
+        votantes.append(Votante(
+            cedula=f'PRES{i}', nombres=f'Nombre{i}', apellidos=f'Apellido{i % 40}',
+            busqueda=f'apellido{i % 40} nombre{i}',
+            departamento=municipio.departamento, municipio=municipio, puesto=mesa.puesto, mesa=mesa,
+            latitud=6.2 + (i % 17) * 0.01, longitud=-75.6 + (i % 13) * 0.01, registrado_por=usuario,
+        ))
+    votantes = Votante.objects.bulk_create(votantes)
+    Encuesta.objects.bulk_create([
+        Encuesta(votante=v, evento=e, candidato=candidatos[j * 6 + i % 6], encuestador=usuario)
+        for i, v in enumerate(votantes) for j, e in enumerate(eventos) if (i + j) % 3
+    ])
+    for evento in eventos:
+        conteos.recalcular(evento)
+    resumenes.recalcular()
+
+    # Votante/candidato/evento con datos relacionados para las vistas de detalle
+    votante = Votante.objects.filter(cedula='PRES1').first()
+    return {
+        'usuario': usuario, 'departamento': departamentos[0], 'municipio': municipios[0],
+        'puesto': puestos[0], 'mesa': mesas[0], 'partido': partidos[0], 'evento': eventos[0],
+        'candidato': candidatos[1], 'votante': votante,
+    }
@@ -0,0 +1,150 @@
+"""
+Lecturas analíticas contra una réplica de solo lectura.
+
+Con DATABASE_REPLICA_URL definido existe el alias 'replica'. Las vistas
+marcadas con @lee_de_replica (estadísticas y su drill-down, mapa de calor,
+exportaciones y consulta pública) leen de ahí los modelos de la app; todo lo
+demás, y cualquier escritura, va a 'default'. Sesiones y usuarios siempre se
+leen de la primaria: una sesión recién creada puede no haber llegado aún.
+
+Leer lo propio: ReplicaMiddleware anota si la petición escribió algo (el
+router ve cada db_for_write) y en ese caso deja una cookie que durante
+REPLICA_FIJAR_SEGUNDOS manda a la primaria todas las lecturas del usuario,
+p.ej. la página a la que redirige encuestador_registrar_voto.
+
+Sin réplica configurada el router no decide nada y todo queda en 'default'.
+Para probar en local basta una copia del archivo SQLite:
+    cp db.sqlite3 replica.sqlite3
+    DATABASE_URL=sqlite:///db.sqlite3 DATABASE_REPLICA_URL=sqlite:///replica.sqlite3
+(la copia no recibe las escrituras: se comporta como una réplica atrasada).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+ALIAS = 'replica'
+COOKIE = 'lee_primaria'
+APPS = {'votacion'}
+
+_leer_replica = ContextVar('replica_leer', default=False)
+_peticion = ContextVar('replica_peticion', default=None)
+
+
+def disponible():
+    return ALIAS in settings.DATABASES
+
+
+class RouterReplica:
+    def db_for_read(self, model, **hints):
+        if _leer_replica.get() and model._meta.app_label in APPS and disponible():
+            return ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        peticion = _peticion.get()
+        if peticion is not None:
+            peticion['escribio'] = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {'default', ALIAS}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # La réplica recibe el esquema de la primaria, nunca migraciones propias
+        return db != ALIAS
+
+
+@contextmanager
+def leyendo(activo=True):
+    """Dentro del bloque, las lecturas de la app van a la réplica (si hay)."""
+    token = _leer_replica.set(activo)
+    try:
+        yield
+    finally:
+        _leer_replica.reset(token)
+
+
+def _fijado(request):
+    return COOKIE in request.COOKIES
+
+
+def _iterar(contenido):
+    """Consume un streaming por partes, cada una leyendo de la réplica
+    (las exportaciones evalúan sus consultas después de que la vista retorna)."""
+    iterador = iter(contenido)
+    while True:
+        with leyendo():
+            try:
+                parte = next(iterador)
+            except StopIteration:
+                return
+        yield parte
+
+
+def lee_de_replica(vista):
+    """Decorador de vista: sus lecturas van a la réplica salvo que el usuario acabe de escribir.
+
+    Va debajo de @login_required / @staff_member_required, así el usuario de
+    la sesión se carga antes y desde la primaria.
+    """
+    if iscoroutinefunction(vista):
+        @wraps(vista)
+        async def envoltura(request, *args, **kwargs):
+            with leyendo(not _fijado(request)):
+                return await vista(request, *args, **kwargs)
+        return envoltura
+
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if _fijado(request):
+            return vista(request, *args, **kwargs)
+        with leyendo():
+            response = vista(request, *args, **kwargs)
+        if response.streaming and not response.is_async:
+            response.streaming_content = _iterar(response.streaming_content)
+        return response
+    return envoltura
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        peticion = {'escribio': False}
+        token = _peticion.set(peticion)
+        try:
+            response = self.get_response(request)
+        finally:
+            _peticion.reset(token)
+        return self._fijar(response, peticion)
+
+    async def __acall__(self, request):
+        peticion = {'escribio': False}
+        token = _peticion.set(peticion)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _peticion.reset(token)
+        return self._fijar(response, peticion)
+
+    def _fijar(self, response, peticion):
+        if peticion['escribio'] and disponible():
+            response.set_cookie(
+                COOKIE, '1', max_age=settings.REPLICA_FIJAR_SEGUNDOS,
+                httponly=True, samesite='Lax', secure=settings.SESSION_COOKIE_SECURE,
+            )
+        return response
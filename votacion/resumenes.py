@@ -0,0 +1,234 @@
+"""
+Resúmenes de encuestas por hora y por día (EncuestasPorHora / EncuestasPorDia).
+
+Cada fila cuenta las encuestas de un (evento, encuestador, municipio del
+votante) cuya fecha cae en la cubeta. Las señales de Encuesta llaman a
+`ajustar()` al crear, borrar o cambiar de evento/encuestador una encuesta;
+lote_encuestas hace lo mismo agrupado, y generar_datos_sinteticos reconstruye
+con `recalcular()`. Así "mis encuestas hoy" y las curvas de productividad
+leen unas pocas filas en vez de recorrer Encuesta.
+
+El municipio es el del votante cuando se registró la encuesta: si después
+cambia, el resumen conserva el anterior hasta `recalcular_conteos`.
+"""
+import datetime
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import Encuesta, EncuestasPorDia, EncuestasPorHora
+
+# por → (campo id, campos de la etiqueta: nombre y detalle opcional)
+AGRUPACIONES = {
+    'encuestador': ('encuestador_id', 'encuestador__username', 'encuestador__first_name'),
+    'municipio': ('municipio_id', 'municipio__nombre', 'municipio__departamento__nombre'),
+}
+MAX_FILAS = 50
+# Con más cubetas que esto por tabla, ajustar() escribe en bloque en vez de un UPDATE por cubeta
+UMBRAL_BLOQUE = 3
+
+
+def cubetas(fecha):
+    """(inicio de la hora local, día local) de una fecha de encuesta."""
+    local = timezone.localtime(fecha)
+    return local.replace(minute=0, second=0, microsecond=0), local.date()
+
+
+def _sumar(modelo, filtros, delta):
+    filas = modelo.objects.filter(**filtros)
+    if filas.update(encuestas=F('encuestas') + delta):
+        return
+    if delta < 0:
+        # Nada que descontar: el resumen ya estaba desviado, lo corrige `recalcular_conteos`.
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(encuestas=delta, **filtros)
+    except IntegrityError:
+        # Otra petición creó la fila entre el UPDATE y el INSERT
+        filas.update(encuestas=F('encuestas') + delta)
+
+
+def _en_o_nulo(campo, valores):
+    filtro = Q(**{f'{campo}__in': [v for v in valores if v is not None]})
+    if None in valores:
+        filtro |= Q(**{f'{campo}__isnull': True})
+    return filtro
+
+
+def _sumar_en_bloque(modelo, campo, cambios):
+    """Todas las cubetas con un SELECT, un UPDATE (bulk_update con F) y un INSERT."""
+    claves = list(cambios)
+    filtro = Q(evento_id__in={c[0] for c in claves}, **{f'{campo}__in': {c[3] for c in claves}})
+    filtro &= _en_o_nulo('encuestador_id', {c[1] for c in claves})
+    filtro &= _en_o_nulo('municipio_id', {c[2] for c in claves})
+    filas = {
+        (fila.evento_id, fila.encuestador_id, fila.municipio_id, getattr(fila, campo)): fila
+        for fila in modelo.objects.filter(filtro)
+    }
+    actualizar, crear = [], []
+    for (evento_id, encuestador_id, municipio_id, cubeta), delta in cambios.items():
+        fila = filas.get((evento_id, encuestador_id, municipio_id, cubeta))
+        if fila is not None:
+            fila.encuestas = F('encuestas') + delta
+            actualizar.append(fila)
+        elif delta > 0:
+            crear.append(modelo(evento_id=evento_id, encuestador_id=encuestador_id,
+                                municipio_id=municipio_id, encuestas=delta, **{campo: cubeta}))
+    if actualizar:
+        modelo.objects.bulk_update(actualizar, ['encuestas'], batch_size=500)
+    if crear:
+        try:
+            with transaction.atomic():
+                modelo.objects.bulk_create(crear, batch_size=500)
+        except IntegrityError:
+            # Otra petición creó alguna de las filas: se suman una por una
+            for fila in crear:
+                _sumar(modelo, {'evento_id': fila.evento_id, 'encuestador_id': fila.encuestador_id,
+                                'municipio_id': fila.municipio_id, campo: getattr(fila, campo)},
+                       fila.encuestas)
+
+
+def ajustar(deltas):
+    """Aplica {(evento_id, encuestador_id, municipio_id, fecha): delta} a ambas tablas.
+
+    Las consultas dependen de las cubetas tocadas, no de las encuestas: un
+    UPDATE por cubeta si son pocas (señales), en bloque si son más (lotes).
+    """
+    por_hora, por_dia = Counter(), Counter()
+    for (evento_id, encuestador_id, municipio_id, fecha), delta in deltas.items():
+        if not evento_id or not delta:
+            continue
+        hora, dia = cubetas(fecha)
+        por_hora[(evento_id, encuestador_id, municipio_id, hora)] += delta
+        por_dia[(evento_id, encuestador_id, municipio_id, dia)] += delta
+    for modelo, campo, cambios in ((EncuestasPorHora, 'hora', por_hora), (EncuestasPorDia, 'dia', por_dia)):
+        cambios = {clave: delta for clave, delta in cambios.items() if delta}
+        if len(cambios) > UMBRAL_BLOQUE:
+            _sumar_en_bloque(modelo, campo, cambios)
+            continue
+        for (evento_id, encuestador_id, municipio_id, cubeta), delta in cambios.items():
+            _sumar(modelo, {'evento_id': evento_id, 'encuestador_id': encuestador_id,
+                            'municipio_id': municipio_id, campo: cubeta}, delta)
+
+
+def encuestas_del_dia(encuestador, dia=None):
+    dia = dia or timezone.localdate()
+    return EncuestasPorDia.objects.filter(encuestador=encuestador, dia=dia).aggregate(
+        total=Sum('encuestas'))['total'] or 0
+
+
+# ── Reconstrucción y verificación ─────────────────────────────────
+
+def resumenes_reales(evento=None):
+    """({clave_hora: n}, {clave_dia: n}) calculados desde Encuesta."""
+    qs = Encuesta.objects.all()
+    if evento is not None:
+        qs = qs.filter(evento=evento)
+    por_hora, por_dia = Counter(), Counter()
+    filas = (
+        qs.order_by()
+        .values_list('evento_id', 'encuestador_id', 'votante__municipio_id', TruncHour('fecha'))
+        .annotate(n=Count('id'))
+    )
+    for evento_id, encuestador_id, municipio_id, hora, n in filas:
+        por_hora[(evento_id, encuestador_id, municipio_id, hora)] += n
+        por_dia[(evento_id, encuestador_id, municipio_id, hora.date())] += n
+    return por_hora, por_dia
+
+
+def resumenes_materializados(evento=None):
+    resultado = []
+    for modelo, campo in ((EncuestasPorHora, 'hora'), (EncuestasPorDia, 'dia')):
+        qs = modelo.objects.all()
+        if evento is not None:
+            qs = qs.filter(evento=evento)
+        guardados = Counter()
+        for evento_id, encuestador_id, municipio_id, cubeta, n in qs.values_list(
+                'evento_id', 'encuestador_id', 'municipio_id', campo, 'encuestas'):
+            if campo == 'hora':
+                cubeta = timezone.localtime(cubeta)
+            guardados[(evento_id, encuestador_id, municipio_id, cubeta)] += n
+        resultado.append(guardados)
+    return tuple(resultado)
+
+
+def diferencias(evento=None):
+    """Lista de (tabla, clave, materializado, real) que no coinciden."""
+    desvios = []
+    for tabla, reales, guardados in zip(('hora', 'dia'), resumenes_reales(evento),
+                                        resumenes_materializados(evento)):
+        for clave in sorted(set(reales) | set(guardados), key=str):
+            if reales.get(clave, 0) != guardados.get(clave, 0):
+                desvios.append((tabla, clave, guardados.get(clave, 0), reales.get(clave, 0)))
+    return desvios
+
+
+@transaction.atomic
+def recalcular(evento=None):
+    """Reconstruye ambas tablas desde Encuesta. Devuelve el número de filas creadas."""
+    por_hora, por_dia = resumenes_reales(evento)
+    creadas = 0
+    for modelo, campo, reales in ((EncuestasPorHora, 'hora', por_hora), (EncuestasPorDia, 'dia', por_dia)):
+        qs = modelo.objects.all()
+        if evento is not None:
+            qs = qs.filter(evento=evento)
+        qs.delete()
+        modelo.objects.bulk_create([
+            modelo(evento_id=evento_id, encuestador_id=encuestador_id, municipio_id=municipio_id,
+                   encuestas=n, **{campo: cubeta})
+            for (evento_id, encuestador_id, municipio_id, cubeta), n in reales.items()
+        ], batch_size=1000)
+        creadas += len(reales)
+    return creadas
+
+
+# ── Curvas de productividad ───────────────────────────────────────
+
+def productividad(por, cada, desde, hasta, evento_id=None):
+    """Encuestas por `por` (encuestador/municipio) en cada cubeta de [desde, hasta].
+
+    cada='dia': desde/hasta son fechas; cada='hora': datetimes locales.
+    Devuelve {'columnas': [...], 'filas': [{'id', 'etiqueta', 'valores', 'total'}]},
+    con las MAX_FILAS filas de más encuestas.
+    """
+    campo_id, campo_nombre, campo_detalle = AGRUPACIONES[por]
+    if cada == 'dia':
+        modelo, campo, paso = EncuestasPorDia, 'dia', datetime.timedelta(days=1)
+    else:
+        modelo, campo, paso = EncuestasPorHora, 'hora', datetime.timedelta(hours=1)
+    columnas = []
+    cubeta = desde
+    while cubeta <= hasta:
+        columnas.append(cubeta)
+        cubeta += paso
+
+    qs = modelo.objects.filter(**{f'{campo}__gte': desde, f'{campo}__lte': hasta})
+    if evento_id:
+        qs = qs.filter(evento_id=evento_id)
+    series = {}
+    for ident, nombre, detalle, cubeta, n in (
+            qs.order_by().values_list(campo_id, campo_nombre, campo_detalle, campo)
+            .annotate(n=Sum('encuestas'))):
+        if campo == 'hora':
+            cubeta = timezone.localtime(cubeta)
+        serie = series.setdefault(ident, {'id': ident, 'etiqueta': _etiqueta(por, nombre, detalle),
+                                          'cubetas': Counter()})
+        serie['cubetas'][cubeta] += n
+
+    filas = []
+    for serie in series.values():
+        valores = [serie['cubetas'].get(c, 0) for c in columnas]
+        filas.append({'id': serie['id'], 'etiqueta': serie['etiqueta'],
+                      'valores': valores, 'total': sum(valores)})
+    filas.sort(key=lambda f: (-f['total'], f['etiqueta']))
+    return {'columnas': columnas, 'filas': filas[:MAX_FILAS]}
+
+
+def _etiqueta(por, nombre, detalle):
+    if nombre is None:
+        return 'Sin municipio' if por == 'municipio' else 'Sin encuestador'
+    return f'{nombre} ({detalle})' if detalle else nombre
@@ -0,0 +1,161 @@
+"""
+Señales de la app votacion.
+Mantienen las tablas derivadas (conteos y resúmenes por hora/día de encuestas,
+versiones de teselas del mapa de calor y de las estadísticas por evento) y los
+contadores en caché al día con cada escritura.
+"""
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from . import busqueda, cedulas, contadores, conteos, estadisticas, geografia, resumenes, teselas
+from .models import (Candidato, Departamento, Encuesta, EventoElectoral, MesaVotacion,
+                     Municipio, PartidoPolitico, PuestoVotacion, Votante)
+
+
+@receiver(post_init, sender=Encuesta)
+def encuesta_recordar_original(sender, instance, **kwargs):
+    # __dict__ evita disparar una consulta si el campo fue diferido (.only/.defer)
+    instance._evento_original = instance.__dict__.get('evento_id')
+    instance._candidato_original = instance.__dict__.get('candidato_id')
+    instance._encuestador_original = instance.__dict__.get('encuestador_id')
+
+
+@receiver(post_save, sender=Encuesta)
+def encuesta_guardada(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    anterior = (instance._evento_original, instance._candidato_original)
+    actual = (instance.evento_id, instance.candidato_id)
+    autor_anterior = (instance._evento_original, instance._encuestador_original)
+    autor = (instance.evento_id, instance.encuestador_id)
+    if created:
+        conteos.ajustar(*actual, 1)
+        contadores.sumar('encuestas', 1)
+    elif anterior != actual:
+        conteos.ajustar(*anterior, -1)
+        conteos.ajustar(*actual, 1)
+    if created or anterior != actual or autor_anterior != autor:
+        latitud, longitud, municipio_id = _datos_votante(instance)
+        if created or anterior != actual:
+            teselas.invalidar_punto(latitud, longitud)
+        deltas = Counter({(*autor, municipio_id, instance.fecha): 1})
+        if not created:
+            deltas[(*autor_anterior, municipio_id, instance.fecha)] -= 1
+        resumenes.ajustar(deltas)
+    estadisticas.invalidar(instance._evento_original, instance.evento_id)
+    instance._evento_original, instance._candidato_original = actual
+    instance._encuestador_original = instance.encuestador_id
+
+
+@receiver(post_delete, sender=Encuesta)
+def encuesta_eliminada(sender, instance, **kwargs):
+    conteos.ajustar(instance.evento_id, instance.candidato_id, -1)
+    contadores.sumar('encuestas', -1)
+    estadisticas.invalidar(instance.evento_id)
+    latitud, longitud, municipio_id = _datos_votante(instance)
+    teselas.invalidar_punto(latitud, longitud)
+    resumenes.ajustar({(instance.evento_id, instance.encuestador_id, municipio_id, instance.fecha): -1})
+
+
+def _datos_votante(encuesta):
+    """(latitud, longitud, municipio_id) del votante, sin consulta si ya está cargado."""
+    campo = Encuesta._meta.get_field('votante')
+    if campo.is_cached(encuesta):
+        votante = encuesta.votante
+        return votante.latitud, votante.longitud, votante.municipio_id
+    datos = Votante.objects.filter(pk=encuesta.votante_id).values_list(
+        'latitud', 'longitud', 'municipio_id').first()
+    return datos or (None, None, None)
+
+
+# ── Votante: coordenadas para el mapa de calor ────────────────────
+
+@receiver(pre_save, sender=Votante)
+def votante_texto_busqueda(sender, instance, **kwargs):
+    instance.busqueda = busqueda.texto_votante(instance.apellidos, instance.nombres)
+
+
+@receiver(post_init, sender=Votante)
+def votante_recordar_original(sender, instance, **kwargs):
+    instance._coordenadas_originales = (
+        instance.__dict__.get('latitud'), instance.__dict__.get('longitud')
+    )
+    instance._cedula_original = instance.__dict__.get('cedula')
+
+
+@receiver(post_save, sender=Votante)
+def votante_guardado(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    cedulas.invalidar(instance._cedula_original, instance.cedula)
+    instance._cedula_original = instance.cedula
+    actuales = (instance.latitud, instance.longitud)
+    if created:
+        teselas.invalidar_punto(*actuales)
+        contadores.sumar('votantes', 1)
+        if instance.latitud is not None:
+            contadores.sumar('votantes_geo', 1)
+    elif actuales != instance._coordenadas_originales:
+        teselas.invalidar_punto(*instance._coordenadas_originales)
+        teselas.invalidar_punto(*actuales)
+        tenia = instance._coordenadas_originales[0] is not None
+        tiene = instance.latitud is not None
+        if tenia != tiene:
+            contadores.sumar('votantes_geo', 1 if tiene else -1)
+    if not created:
+        # El drill-down de estadísticas muestra nombre, cédula y ubicación electoral
+        estadisticas.invalidar(*Encuesta.objects.filter(votante=instance)
+                               .values_list('evento_id', flat=True).distinct())
+    instance._coordenadas_originales = actuales
+
+
+@receiver(post_delete, sender=Votante)
+def votante_eliminado(sender, instance, **kwargs):
+    cedulas.invalidar(instance.cedula)
+    teselas.invalidar_punto(instance.latitud, instance.longitud)
+    contadores.sumar('votantes', -1)
+    if instance.latitud is not None:
+        contadores.sumar('votantes_geo', -1)
+
+
+# ── Modelos de baja escritura: se invalida el contador ────────────
+
+@receiver([post_save, post_delete], sender=Candidato)
+def candidato_cambiado(sender, instance, **kwargs):
+    contadores.invalidar('candidatos_activos')
+    estadisticas.invalidar(instance.evento_id)
+
+
+@receiver([post_save, post_delete], sender=EventoElectoral)
+def evento_cambiado(sender, instance, **kwargs):
+    contadores.invalidar('eventos_activos')
+    estadisticas.invalidar(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=PartidoPolitico)
+def partido_cambiado(sender, instance, **kwargs):
+    # Sigla y color aparecen en las tarjetas de resultados
+    estadisticas.invalidar(*Candidato.objects.filter(partido=instance)
+                           .values_list('evento_id', flat=True).distinct())
+
+
+@receiver([post_save, post_delete], sender=PuestoVotacion)
+def puesto_cambiado(sender, **kwargs):
+    contadores.invalidar('puestos')
+    cedulas.limpiar()
+    geografia.invalidar()
+
+
+@receiver([post_save, post_delete], sender=MesaVotacion)
+@receiver([post_save, post_delete], sender=Municipio)
+def geografia_cambiada(sender, **kwargs):
+    # La consulta pública guarda en caché los nombres de municipio/puesto/mesa
+    cedulas.limpiar()
+    geografia.invalidar()
+
+
+@receiver([post_save, post_delete], sender=Departamento)
+def departamento_cambiado(sender, **kwargs):
+    geografia.invalidar()
@@ -0,0 +1,163 @@
+"""
+Pirámide de teselas (z/x/y) del mapa de calor con caché en disco.
+
+Cada tesela es la agregación en cuadrícula (ver votacion/mapa.py) de los
+votantes que caen dentro de ella, para el filtro evento/candidato pedido. Se
+calcula la primera vez que alguien la pide y se guarda como JSON en
+settings.TESELAS_DIR, con la versión del área en el nombre del archivo.
+
+Las señales incrementan VersionTesela solo de la tesela de ZOOM_VERSION que
+contiene al votante cuando cambia un votante o una encuesta; las teselas más
+profundas usan la versión de su ancestro en ZOOM_VERSION y las menos profundas
+la suma de las de sus descendientes en ese zoom, calculada al leer y guardada
+VIDA_VERSION_AGREGADA segundos en la caché. Así cada escritura toca una sola
+fila (la 0/0/0 no es un punto de contención para todo el país), mover el mapa
+solo lee archivos y un cambio invalida únicamente las teselas de su zona.
+"""
+import json
+import math
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q, Sum
+
+from . import mapa
+from .models import VersionTesela
+
+ZOOM_VERSION = 8
+ZOOM_MAXIMO = 18
+# Celdas por lado dentro de cada tesela
+CELDAS_TESELA = 32
+# Segundos que una tesela de zoom < ZOOM_VERSION puede mostrar datos de antes de un cambio
+VIDA_VERSION_AGREGADA = 10
+
+# Extensión aproximada de Colombia (oeste, sur, este, norte) para pre-renderizar
+EXTENSION_COLOMBIA = (-82.0, -4.3, -66.8, 13.6)
+
+
+def tesela_de(lat, lng, z):
+    """Índices x, y de la tesela Web Mercator que contiene el punto."""
+    lat = max(min(float(lat), 85.0511), -85.0511)
+    n = 2 ** z
+    x = int((float(lng) + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def bbox_tesela(z, x, y):
+    """(oeste, sur, este, norte) en grados de la tesela z/x/y."""
+    n = 2 ** z
+
+    def lat(fila):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * fila / n))))
+
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
+
+
+def tesela_valida(z, x, y):
+    return 0 <= z <= ZOOM_MAXIMO and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def _clave_version(z, x, y):
+    if z <= ZOOM_VERSION:
+        return z, x, y
+    corrimiento = z - ZOOM_VERSION
+    return ZOOM_VERSION, x >> corrimiento, y >> corrimiento
+
+
+def _version_agregada(z, x, y):
+    """Suma de las versiones de los descendientes en ZOOM_VERSION: crece con
+    cualquier cambio dentro de la tesela. La 's' la distingue en el nombre del
+    archivo y en el ETag de las versiones por fila."""
+    clave = f'teselas:version:{z}:{x}:{y}'
+    valor = cache.get(clave)
+    if valor is None:
+        corrimiento = ZOOM_VERSION - z
+        suma = VersionTesela.objects.filter(
+            z=ZOOM_VERSION,
+            x__gte=x << corrimiento, x__lt=(x + 1) << corrimiento,
+            y__gte=y << corrimiento, y__lt=(y + 1) << corrimiento,
+        ).aggregate(suma=Sum('version'))['suma']
+        valor = f's{suma or 0}'
+        cache.set(clave, valor, VIDA_VERSION_AGREGADA)
+    return valor
+
+
+def version(z, x, y):
+    if z < ZOOM_VERSION:
+        return _version_agregada(z, x, y)
+    vz, vx, vy = _clave_version(z, x, y)
+    return VersionTesela.objects.filter(z=vz, x=vx, y=vy).values_list('version', flat=True).first() or 0
+
+
+def invalidar_punto(lat, lng):
+    """Incrementa la versión de la tesela de ZOOM_VERSION que contiene el punto."""
+    if lat is None or lng is None:
+        return
+    invalidar_teselas([tesela_de(lat, lng, ZOOM_VERSION)])
+
+
+def invalidar_teselas(teselas_zoom_version, lote=300):
+    """Incrementa la versión de las teselas (x, y) de ZOOM_VERSION dadas.
+
+    Las de zoom menor no se tocan: su versión se deriva al leer.
+    """
+    claves = sorted({(ZOOM_VERSION, x, y) for x, y in teselas_zoom_version})
+    for i in range(0, len(claves), lote):
+        bloque = claves[i:i + lote]
+        VersionTesela.objects.bulk_create(
+            [VersionTesela(z=z, x=x, y=y) for z, x, y in bloque], ignore_conflicts=True
+        )
+        condicion = Q()
+        for z, x, y in bloque:
+            condicion |= Q(z=z, x=x, y=y)
+        VersionTesela.objects.filter(condicion).update(version=F('version') + 1)
+
+
+def _directorio(evento_id, candidato_id):
+    filtro = f'e{evento_id or 0}-c{candidato_id or 0}'
+    return Path(settings.TESELAS_DIR) / filtro
+
+
+def calcular(z, x, y, evento_id=None, candidato_id=None):
+    oeste, sur, este, norte = bbox = bbox_tesela(z, x, y)
+    qs = mapa.filtrar_bbox(mapa.votantes_geo(evento_id, candidato_id), bbox)
+    celdas = mapa.agregar_celdas(qs, (este - oeste) / CELDAS_TESELA)
+    return {'z': z, 'x': x, 'y': y, 'total': sum(c[2] for c in celdas), 'celdas': celdas}
+
+
+def obtener(z, x, y, evento_id=None, candidato_id=None):
+    """Devuelve (contenido JSON en bytes, versión); lo calcula y guarda si no está en disco."""
+    v = version(z, x, y)
+    carpeta = _directorio(evento_id, candidato_id) / str(z) / str(x)
+    archivo = carpeta / f'{y}-v{v}.json'
+    try:
+        return archivo.read_bytes(), v
+    except FileNotFoundError:
+        pass
+
+    contenido = json.dumps(calcular(z, x, y, evento_id, candidato_id), separators=(',', ':')).encode()
+    carpeta.mkdir(parents=True, exist_ok=True)
+    # Escritura atómica: otro worker puede estar leyendo o escribiendo la misma tesela
+    fd, temporal = tempfile.mkstemp(dir=carpeta, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(contenido)
+    os.replace(temporal, archivo)
+    for viejo in carpeta.glob(f'{y}-v*.json'):
+        if viejo != archivo:
+            viejo.unlink(missing_ok=True)
+    return contenido, v
+
+
+def teselas_en(extension, z):
+    """Itera (x, y) de las teselas de zoom z que cubren la extensión dada."""
+    oeste, sur, este, norte = extension
+    x0, y0 = tesela_de(norte, oeste, z)
+    x1, y1 = tesela_de(sur, este, z)
+    for x in range(x0, x1 + 1):
+        for y in range(y0, y1 + 1):
+            yield x, y
@@ -0,0 +1,741 @@
+import csv
+import io
+import json
+from datetime import date, timedelta
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from votacion import (carga, cedulas, contadores, conteos, estadisticas, exportar, mapa, planes, presupuestos,
+                      resumenes)
+from votacion.paginacion import codificar_cursor, filtro_antes, filtro_despues
+from votacion.models import (Candidato, Contador, ConteoEncuesta, Departamento, Encuesta, EncuestasPorDia,
+                             EncuestasPorHora, EnvioEncuesta, EventoElectoral, MesaVotacion, Municipio,
+                             PuestoVotacion, Votante)
+
+# La caché por defecto es en disco y sobrevive entre corridas: las pruebas que
+# la usan trabajan sobre una en memoria, vacía al empezar cada prueba.
+CACHE_PRUEBAS = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class DatosEncuestasMixin:
+    """Evento con dos candidatos y votantes sin encuestar, para las pruebas que escriben encuestas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.evento = EventoElectoral.objects.create(nombre='Consulta 2026', tipo='OTRO', fecha=date(2026, 3, 8))
+        cls.candidato_a = Candidato.objects.create(evento=cls.evento, nombres='Ana', apellidos='Ríos')
+        cls.candidato_b = Candidato.objects.create(evento=cls.evento, nombres='Beto', apellidos='Mora')
+        cls.votantes = [
+            Votante.objects.create(cedula=str(1000 + i), nombres=f'Nombre{i}', apellidos=f'Apellido{i}')
+            for i in range(3)
+        ]
+
+    def _encuestar(self, votante, candidato, **extra):
+        return Encuesta.objects.create(votante=votante, evento=self.evento, candidato=candidato, **extra)
+
+    def _escribir(self, funcion, *args, **kwargs):
+        """Ejecuta la escritura y sus callbacks on_commit (invalidación de versiones)."""
+        with self.captureOnCommitCallbacks(execute=True):
+            return funcion(*args, **kwargs)
+
+
+class ConteoEncuestaTests(DatosEncuestasMixin, TestCase):
+    def _votos(self, candidato):
+        return ConteoEncuesta.objects.filter(evento=self.evento, candidato=candidato) \
+            .values_list('votos', flat=True).first()
+
+    def test_alta_cambio_de_candidato_y_borrado(self):
+        primera = self._encuestar(self.votantes[0], self.candidato_a)
+        self._encuestar(self.votantes[1], self.candidato_a)
+        self.assertEqual(self._votos(self.candidato_a), 2)
+        self.assertIsNone(self._votos(self.candidato_b))
+
+        primera.candidato = self.candidato_b
+        primera.save()
+        self.assertEqual(self._votos(self.candidato_a), 1)
+        self.assertEqual(self._votos(self.candidato_b), 1)
+
+        primera.observacion = 'sin cambio de candidato'
+        primera.save()
+        self.assertEqual(self._votos(self.candidato_b), 1)
+
+        primera.delete()
+        self.assertEqual(self._votos(self.candidato_b), 0)
+        self.assertEqual(conteos.diferencias(self.evento), [])
+
+    def test_descuento_sobre_conteo_en_cero_no_aborta_la_escritura(self):
+        encuesta = self._encuestar(self.votantes[0], self.candidato_a)
+        ConteoEncuesta.objects.filter(candidato=self.candidato_a).update(votos=0)
+
+        encuesta.delete()
+
+        self.assertEqual(self._votos(self.candidato_a), 0)
+        self.assertFalse(Encuesta.objects.exists())
+
+
+class DrillVotantesTests(DatosEncuestasMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.usuario = User.objects.create_user('analista')
+        for i in range(7):
+            votante = Votante.objects.create(cedula=str(2000 + i), nombres=f'Nombre{i % 2}', apellidos='Mismo')
+            Encuesta.objects.create(votante=votante, evento=cls.evento, candidato=cls.candidato_a)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _pagina(self, **params):
+        params = {'evento': self.evento.pk, 'candidato': self.candidato_a.pk, **params}
+        respuesta = self.client.get(reverse('api_drill_votantes'), params)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_el_cursor_recorre_todas_las_filas_una_vez(self):
+        cedulas, despues = [], None
+        while True:
+            pagina = self._pagina(limite=3, **({'despues': despues} if despues else {}))
+            cedulas += [v['cedula'] for v in pagina['votantes']]
+            despues = pagina['siguiente']
+            if not despues:
+                break
+        self.assertEqual(sorted(cedulas), [str(2000 + i) for i in range(7)])
+
+    def test_limite_fuera_de_rango_se_acota(self):
+        for limite in ('-3', '0', 'abc', str(10 ** 30)):
+            with self.subTest(limite=limite):
+                pagina = self._pagina(limite=limite)
+                self.assertGreaterEqual(len(pagina['votantes']), 1)
+        self.assertEqual(len(self._pagina(limite='-3')['votantes']), 1)
+
+    def test_cursor_o_ids_invalidos_no_fallan(self):
+        # ["x","z","z",1], ["x","z","z"], ["x","z",true]: largo o tipos que no corresponden al orden
+        for despues in ('WyJ4IiwieiIsInoiLDFd', 'WyJ4IiwieiIsInoiXQ', 'WyJ4IiwieiIsdHJ1ZV0', 'no-es-base64'):
+            with self.subTest(despues=despues):
+                self.assertEqual(len(self._pagina(despues=despues)['votantes']), 7)
+        self.assertEqual(self._pagina(evento=str(10 ** 30))['votantes'], [])
+
+
+class ExportarTests(DatosEncuestasMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.staff = User.objects.create_user('admin', is_staff=True)
+        for votante, candidato in zip(cls.votantes, (cls.candidato_a, cls.candidato_a, cls.candidato_b)):
+            Encuesta.objects.create(votante=votante, evento=cls.evento, candidato=candidato,
+                                    observacion='nota "con" comillas & <xml>')
+
+    def _exportar(self, formato):
+        self.client.force_login(self.staff)
+        respuesta = self.client.get(reverse('exportar_encuestas'), {'formato': formato, 'evento': self.evento.pk})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        return respuesta, b''.join(respuesta.streaming_content)
+
+    def test_csv(self):
+        respuesta, cuerpo = self._exportar('csv')
+        self.assertEqual(respuesta['Content-Type'], 'text/csv; charset=utf-8')
+        filas = list(csv.reader(io.StringIO(cuerpo.decode('utf-8-sig'))))
+        self.assertEqual(filas[0], [col for col, _ in exportar.COLUMNAS_ENCUESTAS])
+        self.assertEqual(len(filas), 4)
+        self.assertEqual(filas[1][filas[0].index('observacion')], 'nota "con" comillas & <xml>')
+
+    def test_ndjson(self):
+        _, cuerpo = self._exportar('ndjson')
+        filas = [json.loads(linea) for linea in cuerpo.decode().splitlines()]
+        self.assertEqual([f['cedula'] for f in filas], [v.cedula for v in self.votantes])
+        self.assertEqual(filas[2]['candidato_apellidos'], 'Mora')
+
+    def test_xlsx(self):
+        from openpyxl import load_workbook
+
+        _, cuerpo = self._exportar('xlsx')
+        libro = load_workbook(io.BytesIO(cuerpo), read_only=True)
+        filas = list(libro['Encuestas'].values)
+        self.assertEqual(list(filas[0]), [col for col, _ in exportar.COLUMNAS_ENCUESTAS])
+        self.assertEqual(len(filas), 4)
+        self.assertEqual(filas[1][0], Encuesta.objects.order_by('id').first().pk)
+        self.assertEqual(filas[1][filas[0].index('observacion')], 'nota "con" comillas & <xml>')
+
+    def test_xlsx_entrega_bloques_antes_de_leer_todas_las_filas(self):
+        leidas = []
+
+        def filas():
+            for i in range(5000):
+                leidas.append(i)
+                yield (i, f'fila {i}')
+
+        bloques = exportar.generar_xlsx(['n', 'texto'], filas(), tamano_bloque=4096)
+        self.assertTrue(next(bloques))
+        self.assertLess(len(leidas), 5000)
+
+    def test_formato_no_soportado(self):
+        self.client.force_login(self.staff)
+        respuesta = self.client.get(reverse('exportar_encuestas'), {'formato': 'pdf'})
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class MapaCalorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('analista')
+        Votante.objects.bulk_create([
+            Votante(cedula=str(5000 + i), nombres='N', apellidos='A',
+                    latitud=Decimal('4.6') + Decimal(i // 20) / 1000, longitud=Decimal('-74.1') + Decimal(i % 20) / 1000)
+            for i in range(400)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _datos(self, **params):
+        return self.client.get(reverse('api_mapa_calor'), params)
+
+    def test_bbox_invalido_o_ausente_es_400(self):
+        for bbox in (None, 'a,b,c,d', '1,2,3', 'nan,0,1,1', '-73,5,-75,4'):
+            with self.subTest(bbox=bbox):
+                respuesta = self._datos(**({'bbox': bbox} if bbox else {}), z=10)
+                self.assertEqual(respuesta.status_code, 400)
+
+    @mock.patch('votacion.mapa.UMBRAL_PUNTOS', 10)
+    def test_zoom_excesivo_no_multiplica_las_celdas(self):
+        respuesta = self._datos(bbox='-79,0,-69,10', z=99)
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(datos['modo'], 'celdas')
+        self.assertGreaterEqual(datos['celda'], 10 / mapa.MAX_CELDAS_POR_LADO)
+        self.assertLessEqual(len(datos['celdas']), 4)
+        self.assertEqual(sum(n for _, _, n in datos['celdas']), 400)
+
+
+class ContadoresTests(DatosEncuestasMixin, TestCase):
+    def test_las_escrituras_ajustan_el_contador_al_confirmarse(self):
+        self.assertEqual(contadores.valor('encuestas'), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            encuesta = self._encuestar(self.votantes[0], self.candidato_a)
+            self._encuestar(self.votantes[1], self.candidato_b)
+        self.assertEqual(contadores.valor('encuestas'), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            encuesta.delete()
+            Votante.objects.create(cedula='9001', nombres='Nueva', apellidos='Persona', latitud=4.6, longitud=-74.1)
+        self.assertEqual(contadores.obtener('encuestas', 'votantes', 'votantes_geo'),
+                         {'encuestas': 1, 'votantes': 4, 'votantes_geo': 1})
+
+    def test_los_modelos_de_baja_escritura_invalidan_su_contador(self):
+        self.assertEqual(contadores.valor('candidatos_activos'), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Candidato.objects.filter(pk=self.candidato_b.pk).update(activo=False)
+            self.candidato_a.activo = False
+            self.candidato_a.save()
+        self.assertFalse(Contador.objects.filter(nombre='candidatos_activos').exists())
+        self.assertEqual(contadores.valor('candidatos_activos'), 0)
+
+    @override_settings(CONTADORES_TTL=0)
+    def test_un_contador_vencido_se_vuelve_a_contar(self):
+        contadores.valor('votantes')
+        Votante.objects.bulk_create([Votante(cedula='9002', nombres='Sin', apellidos='Señales')])
+        self.assertEqual(contadores.valor('votantes'), 4)
+
+    def test_reconciliar_reporta_y_corrige_desvios(self):
+        contadores.obtener()
+        Contador.objects.filter(nombre='votantes').update(valor=99)
+        self.assertEqual(contadores.reconciliar(), {'votantes': (99, 3)})
+        self.assertEqual(contadores.valor('votantes'), 3)
+
+
+@override_settings(CACHES=CACHE_PRUEBAS)
+class CedulasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        departamento = Departamento.objects.create(nombre='Antioquia', codigo='05')
+        cls.municipio = Municipio.objects.create(nombre='Medellín', codigo='05001', departamento=departamento)
+        cls.puesto = PuestoVotacion.objects.create(municipio=cls.municipio, nombre='Colegio A', direccion='Calle 1')
+        Votante.objects.create(cedula='1234567', nombres='Ana', apellidos='Gómez', puesto=cls.puesto)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_normaliza_la_cedula_buscada(self):
+        for cedula in ('1234567', '01.234.567', ' 1 234 567 '):
+            with self.subTest(cedula=cedula):
+                self.assertEqual(cedulas.buscar(cedula)['nombre_completo'], 'Ana Gómez')
+        self.assertIsNone(cedulas.buscar('...'))
+
+    def test_un_fallo_en_cache_se_invalida_al_crear_el_votante(self):
+        self.assertIsNone(cedulas.buscar('7654321'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Votante.objects.create(cedula='7654321', nombres='Luis', apellidos='Pérez')
+        self.assertEqual(cedulas.buscar('7654321')['nombre_completo'], 'Luis Pérez')
+
+    def test_un_cambio_de_geografia_invalida_todas_las_cedulas(self):
+        self.assertEqual(cedulas.buscar('1234567')['puesto']['nombre'], 'Colegio A')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.puesto.nombre = 'Colegio B'
+            self.puesto.save()
+        self.assertEqual(cedulas.buscar('1234567')['puesto']['nombre'], 'Colegio B')
+
+    def test_invalidar_borra_la_entrada_compartida(self):
+        cedulas.buscar('1234567')
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(cedulas.buscar('1.234.567'))
+        Votante.objects.filter(cedula='1234567').update(nombres='Ana María')
+        with self.captureOnCommitCallbacks(execute=True):
+            cedulas.invalidar('1234567')
+        self.assertEqual(cedulas.buscar('1234567')['nombre_completo'], 'Ana María Gómez')
+
+    async def test_abuscar_comparte_la_cache_de_buscar(self):
+        self.assertEqual((await cedulas.abuscar('01.234.567'))['nombre_completo'], 'Ana Gómez')
+        self.assertIsNone(await cedulas.abuscar('7654321'))
+        # Cambios sin señales: las dos funciones responden con lo que quedó en la caché
+        await Votante.objects.filter(cedula='1234567').aupdate(nombres='Ana María')
+        await Votante.objects.acreate(cedula='7654321', nombres='Luis', apellidos='Pérez')
+        self.assertEqual(cedulas.buscar('1234567')['nombre_completo'], 'Ana Gómez')
+        self.assertIsNone(cedulas.buscar('7654321'))
+
+    def test_normalizar_cedulas_respeta_las_colisiones(self):
+        Votante.objects.bulk_create([
+            Votante(cedula='01234567', nombres='Duplicada', apellidos='Gómez'),
+            Votante(cedula='ab-99', nombres='Pendiente', apellidos='Ruiz'),
+        ])
+        with self.assertRaises(CommandError):
+            call_command('normalizar_cedulas', verificar=True, stdout=StringIO())
+
+        salida = StringIO()
+        call_command('normalizar_cedulas', stdout=salida)
+        self.assertIn("1234567: id", salida.getvalue())
+        self.assertTrue(Votante.objects.filter(cedula='AB99').exists())
+        self.assertTrue(Votante.objects.filter(cedula='01234567').exists())
+
+
+@override_settings(CACHES=CACHE_PRUEBAS)
+class CargarVotantesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        departamento = Departamento.objects.create(nombre='Antioquia', codigo='05')
+        self.municipio = Municipio.objects.create(nombre='Medellín', codigo='05001', departamento=departamento)
+        self.directorio = TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+
+    def _cargar(self, nombre, contenido):
+        ruta = Path(self.directorio.name) / nombre
+        ruta.write_text(contenido, encoding='utf-8')
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('cargar_votantes', str(ruta), stdout=StringIO())
+
+    def test_recarga_parcial_conserva_columnas_ausentes(self):
+        self._cargar('completo.csv',
+                     'cedula,nombres,apellidos,telefono,municipio,direccion,latitud,longitud\n'
+                     '1001,Ana,Gómez,3001234567,05001,Calle 10 # 20-30,6.2442,-75.5812\n')
+        self._cargar('parcial.csv', 'cedula,nombres,apellidos\n1001,Ana María,Gómez Ruiz\n')
+
+        votante = Votante.objects.get(cedula='1001')
+        self.assertEqual(votante.nombres, 'Ana María')
+        self.assertEqual(votante.apellidos, 'Gómez Ruiz')
+        self.assertEqual(votante.busqueda, 'gomez ruiz ana maria')
+        self.assertEqual(votante.telefono, '3001234567')
+        self.assertEqual(votante.direccion, 'Calle 10 # 20-30')
+        self.assertEqual(votante.municipio_id, self.municipio.pk)
+        self.assertEqual(votante.departamento_id, self.municipio.departamento_id)
+        self.assertEqual(votante.latitud, Decimal('6.2442000'))
+        self.assertEqual(votante.longitud, Decimal('-75.5812000'))
+
+    def test_recarga_parcial_crea_votantes_nuevos_con_valores_por_defecto(self):
+        self._cargar('parcial.csv', 'cedula,nombres,apellidos\n2002,Luis,Pérez\n')
+
+        votante = Votante.objects.get(cedula='2002')
+        self.assertEqual(votante.telefono, '')
+        self.assertIsNone(votante.municipio_id)
+        self.assertIsNone(votante.latitud)
+
+    def test_la_carga_invalida_cedulas_y_contadores(self):
+        self.assertIsNone(cedulas.buscar('3003'))
+        self.assertEqual(contadores.valor('votantes'), 0)
+        self._cargar('nuevos.csv', 'cedula,nombres,apellidos\n3003,Eva,Luna\n03.004,Iván,Sol\n')
+
+        self.assertEqual(cedulas.buscar('3003')['nombre_completo'], 'Eva Luna')
+        self.assertEqual(cedulas.buscar('3004')['nombre_completo'], 'Iván Sol')
+        self.assertEqual(contadores.valor('votantes'), 2)
+
+
+class CargarDatosColombiaTests(TestCase):
+    def test_carga_la_divipola_completa_una_sola_vez(self):
+        call_command('cargar_datos_colombia', stdout=StringIO())
+        self.assertEqual(Departamento.objects.count(), 33)
+        self.assertEqual(Municipio.objects.count(), 1121)
+        self.assertTrue(Municipio.objects.filter(codigo='94001', nombre='Inírida').exists())
+        self.assertTrue(Municipio.objects.filter(codigo='95001', departamento__nombre='Guaviare').exists())
+
+        salida = StringIO()
+        with self.assertNumQueries(1):
+            call_command('cargar_datos_colombia', stdout=salida)
+        self.assertIn('sin cambios', salida.getvalue())
+
+
+class PaginacionCursorTests(TestCase):
+    CAMPOS = ['apellidos', 'nombres', 'id']
+
+    @classmethod
+    def setUpTestData(cls):
+        Votante.objects.bulk_create([
+            Votante(cedula=str(3000 + i), nombres=f'Nombre{i % 7}', apellidos=f'Apellido{i % 11:02d}')
+            for i in range(200)
+        ])
+        cls.orden = list(Votante.objects.order_by(*cls.CAMPOS).values_list(*cls.CAMPOS))
+
+    def test_filtros_respetan_el_orden_lexicografico(self):
+        cursor = list(self.orden[150])
+        despues = Votante.objects.filter(filtro_despues(self.CAMPOS, cursor)).order_by(*self.CAMPOS)
+        antes = Votante.objects.filter(filtro_antes(self.CAMPOS, cursor)).order_by(*self.CAMPOS)
+        self.assertEqual(list(despues.values_list(*self.CAMPOS)), self.orden[151:])
+        self.assertEqual(list(antes.values_list(*self.CAMPOS)), self.orden[:150])
+
+    def test_cursores_con_tipos_que_no_corresponden_se_ignoran(self):
+        self.client.force_login(User.objects.create_user('analista'))
+        evento = EventoElectoral.objects.create(nombre='Consulta', tipo='OTRO', fecha=date(2026, 3, 8))
+        Candidato.objects.create(evento=evento, nombres='Ana', apellidos='Ríos')
+        for url, token in (
+            (reverse('candidato_lista'), 'WyJ4IiwieiIsInoiLDFd'),  # ["x","z","z",1]: evento_id no es entero
+            (reverse('candidato_lista'), codificar_cursor([evento.pk, 'Ríos', 'Ana', 'x'])),
+            (reverse('votante_lista'), codificar_cursor(['Apellido01', 'Nombre1', True])),
+            (reverse('votante_lista'), codificar_cursor(['Apellido01', 'Nombre1', 10 ** 30])),
+        ):
+            for parametro in ('despues', 'antes'):
+                with self.subTest(url=url, token=token, parametro=parametro):
+                    self.assertEqual(self.client.get(url, {parametro: token}).status_code, 200)
+
+
+class MesaPuestoListaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        departamento = Departamento.objects.create(nombre='Guainía', codigo='94')
+        municipios = [Municipio.objects.create(departamento=departamento, nombre=n, codigo=c)
+                      for n, c in (('Inírida', '94001'), ('Barrancominas', '94343'))]
+        puestos = PuestoVotacion.objects.bulk_create([
+            PuestoVotacion(municipio=municipios[i % 2], nombre=f'Puesto {i:02d}', direccion='Calle 1')
+            for i in range(40)
+        ])
+        MesaVotacion.objects.bulk_create([
+            MesaVotacion(puesto=puesto, numero=n) for puesto in puestos for n in range(1, 4)
+        ])
+        cls.usuario = User.objects.create_user('registrador')
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _recorrer(self, url, clave, limite):
+        vistos, parametros = [], {'formato': 'json', 'limite': limite}
+        while True:
+            datos = self.client.get(url, parametros).json()
+            vistos += [fila['id'] for fila in datos[clave]]
+            if not datos['siguiente']:
+                return vistos
+            parametros['despues'] = datos['siguiente']
+
+    def test_el_cursor_recorre_cada_listado_una_vez_en_orden(self):
+        for url, clave, qs in (
+            (reverse('puesto_lista'), 'puestos', PuestoVotacion.objects.order_by('municipio_id', 'nombre', 'id')),
+            (reverse('mesa_lista'), 'mesas', MesaVotacion.objects.order_by('puesto_id', 'numero', 'id')),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self._recorrer(url, clave, 7), list(qs.values_list('id', flat=True)))
+
+    def test_limite_fuera_de_rango_se_acota(self):
+        url = reverse('mesa_lista')
+        for limite, filas in (('-5', 1), ('0', 100), ('100000', 120)):
+            with self.subTest(limite=limite):
+                datos = self.client.get(url, {'formato': 'json', 'limite': limite}).json()
+                self.assertEqual(len(datos['mesas']), filas)
+
+
+class PlanesConsultasTests(TestCase):
+    """Las consultas frecuentes de votacion/planes.py entran por un índice (lo mismo que verificar_planes)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ids = planes.sembrar(3000)
+        planes.analizar()
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # Como verificar_planes: con tablas pequeñas se quiere ver si hay un índice utilizable
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def test_ninguna_consulta_recorre_una_tabla_vigilada(self):
+        for nombre, qs, vigiladas, recorrido_ordenado in planes.consultas(self.ids):
+            with self.subTest(nombre):
+                plan, completas = planes.escaneos_completos(qs, recorrido_ordenado)
+                self.assertFalse(completas & set(vigiladas), plan)
+
+    def test_un_filtro_keyset_sin_cota_cuenta_como_recorrido(self):
+        # (a > x) OR (a = x AND ...) sin la cota a >= x: el índice se lee desde el principio
+        sin_cota = Votante.objects.filter(
+            filtro_despues(planes.ORDEN_VOTANTES, self.ids['cursor_votante']).children[-1])
+        _, completas = planes.escaneos_completos(sin_cota.order_by(*planes.ORDEN_VOTANTES)[:21])
+        self.assertIn(planes.VOTANTE, completas)
+
+
+# El admin resuelve sus estáticos contra el manifiesto de collectstatic, que no existe en pruebas
+@override_settings(CACHES=CACHE_PRUEBAS, METRICAS_MUESTREO=0,
+                   STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class PresupuestoConsultasTests(TestCase):
+    """Cada ruta y changelist hace exactamente las consultas de presupuestos.PRESUPUESTOS."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.datos = presupuestos.sembrar()
+
+    def setUp(self):
+        directorio = TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = self.settings(TESELAS_DIR=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.client.force_login(self.datos['usuario'])
+
+    def test_cada_vista_respeta_su_presupuesto(self):
+        for nombre, metodo, url, payload in presupuestos.peticiones(self.datos):
+            with self.subTest(nombre):
+                self.assertIn(nombre, presupuestos.PRESUPUESTOS, 'ruta sin presupuesto')
+                presupuestos.preparar()
+                with self.assertNumQueries(presupuestos.PRESUPUESTOS[nombre][0]):
+                    respuesta = presupuestos.pedir(self.client, metodo, url, payload)
+                self.assertLess(respuesta.status_code, 400)
+
+
+@override_settings(CACHES=CACHE_PRUEBAS, METRICAS_MUESTREO=1)
+class MetricasTests(TestCase):
+    def _cabeceras(self, url):
+        with self.assertLogs('votacion.metricas'):
+            return self.client.get(url).headers
+
+    def test_server_timing_solo_para_staff(self):
+        self.assertNotIn('Server-Timing', self._cabeceras(reverse('consulta_publica')))
+        self.client.force_login(User.objects.create_user('encuestador'))
+        self.assertNotIn('Server-Timing', self._cabeceras(reverse('dashboard')))
+        self.client.force_login(User.objects.create_user('coordinador', is_staff=True))
+        self.assertIn('sql;dur=', self._cabeceras(reverse('dashboard'))['Server-Timing'])
+
+    @override_settings(METRICAS_MUESTREO=0)
+    def test_sin_muestreo_no_se_mide(self):
+        self.client.force_login(User.objects.create_user('coordinador', is_staff=True))
+        with self.assertNoLogs('votacion.metricas'):
+            self.assertNotIn('Server-Timing', self.client.get(reverse('dashboard')).headers)
+
+
+class LoteEncuestasTests(DatosEncuestasMixin, TestCase):
+    def setUp(self):
+        self.encuestador = User.objects.create_user('encuestador')
+        self.client.force_login(self.encuestador)
+
+    def _item(self, clave, votante, candidato, **extra):
+        return {'clave': clave, 'cedula': votante.cedula, 'evento': self.evento.pk,
+                'candidato': candidato.pk, **extra}
+
+    def _enviar(self, *items):
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(reverse('api_encuestas_lote'), json.dumps({'encuestas': list(items)}),
+                                         content_type='application/json')
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def _votos(self, candidato):
+        return ConteoEncuesta.objects.get(evento=self.evento, candidato=candidato).votos
+
+    def test_crea_y_actualiza_segun_exista_la_encuesta(self):
+        self._encuestar(self.votantes[0], self.candidato_a)
+        datos = self._enviar(self._item('k1', self.votantes[0], self.candidato_b),
+                             self._item('k2', self.votantes[1], self.candidato_a))
+        self.assertEqual([r['estado'] for r in datos['resultados']], ['actualizada', 'creada'])
+        self.assertEqual(Encuesta.objects.get(votante=self.votantes[0]).candidato, self.candidato_b)
+        self.assertEqual((self._votos(self.candidato_a), self._votos(self.candidato_b)), (1, 1))
+        self.assertFalse(EnvioEncuesta.objects.get(clave='k1').creada)
+        self.assertTrue(EnvioEncuesta.objects.get(clave='k2').creada)
+
+    def test_una_clave_ya_aplicada_no_se_vuelve_a_aplicar(self):
+        primera = self._enviar(self._item('k1', self.votantes[0], self.candidato_a))['resultados'][0]
+        # Un cambio posterior no lo deshace el reintento tardío del primer envío
+        self._enviar(self._item('k2', self.votantes[0], self.candidato_b))
+        datos = self._enviar(self._item('k1', self.votantes[0], self.candidato_a))
+        self.assertEqual(datos['resultados'][0], {'clave': 'k1', 'estado': 'repetida',
+                                                  'encuesta': primera['encuesta']})
+        self.assertEqual(Encuesta.objects.get(votante=self.votantes[0]).candidato, self.candidato_b)
+        self.assertEqual((self._votos(self.candidato_a), self._votos(self.candidato_b)), (0, 1))
+        self.assertEqual(EnvioEncuesta.objects.count(), 2)
+
+    def test_duplicados_dentro_del_mismo_lote(self):
+        datos = self._enviar(
+            self._item('k1', self.votantes[0], self.candidato_a),
+            self._item('k1', self.votantes[0], self.candidato_b),   # misma clave: cuenta la primera
+            self._item('k2', self.votantes[1], self.candidato_a),
+            self._item('k3', self.votantes[1], self.candidato_b),   # mismo votante: gana el último
+        )
+        estados = [r['estado'] for r in datos['resultados']]
+        self.assertEqual(estados, ['creada', 'repetida', 'creada', 'actualizada'])
+        self.assertEqual(datos['resultados'][0]['encuesta'], datos['resultados'][1]['encuesta'])
+        self.assertEqual(Encuesta.objects.get(votante=self.votantes[0]).candidato, self.candidato_a)
+        self.assertEqual(Encuesta.objects.get(votante=self.votantes[1]).candidato, self.candidato_b)
+        self.assertEqual((self._votos(self.candidato_a), self._votos(self.candidato_b)), (1, 1))
+        self.assertEqual(contadores.valor('encuestas'), 2)
+
+    def test_ids_fuera_de_rango_se_rechazan_por_item(self):
+        items = [{'clave': f'k{i}', 'cedula': '123', 'evento': evento, 'candidato': 1}
+                 for i, evento in enumerate([10 ** 30, -1, 0, str(2 ** 63)])]
+        datos = self._enviar(*items)
+        self.assertEqual(datos['resumen']['rechazada'], 4)
+        for resultado in datos['resultados']:
+            self.assertEqual(resultado['error'], 'evento inválido')
+
+
+@override_settings(CACHES=CACHE_PRUEBAS)
+class EstadisticasCacheTests(DatosEncuestasMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('analista'))
+
+    def _drill(self):
+        respuesta = self.client.get(reverse('api_drill_municipios'),
+                                    {'evento': self.evento.pk, 'candidato': self.candidato_a.pk})
+        return sum(fila['votos'] for fila in respuesta.json())
+
+    def test_cada_escritura_de_encuesta_renueva_la_version(self):
+        self.assertEqual(self._drill(), 0)
+        with self.assertNumQueries(2):   # sesión y usuario: la respuesta sale de la caché
+            self.assertEqual(self._drill(), 0)
+
+        encuesta = self._escribir(self._encuestar, self.votantes[0], self.candidato_a)
+        self.assertEqual(self._drill(), 1)
+        encuesta.candidato = self.candidato_b
+        self._escribir(encuesta.save)
+        self.assertEqual(self._drill(), 0)
+        self._escribir(encuesta.delete)
+        self.assertEqual(self._drill(), 0)
+
+    def test_una_carga_masiva_renueva_todas_las_versiones(self):
+        version = estadisticas.version(self.evento.pk)
+        Encuesta.objects.bulk_create([Encuesta(votante=self.votantes[1], evento=self.evento,
+                                               candidato=self.candidato_a)])
+        self.assertEqual(estadisticas.version(self.evento.pk), version)
+        self._escribir(carga.despues_de_carga)
+        self.assertNotEqual(estadisticas.version(self.evento.pk), version)
+        self.assertEqual(self._drill(), 1)
+
+
+@override_settings(CACHES=CACHE_PRUEBAS, EN_VIVO_REINTENTO_MS=3000)
+class EnVivoTests(DatosEncuestasMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user('analista'))
+
+    def _mensajes(self, ultima=None):
+        """(id, evento, datos) de cada mensaje de la respuesta WSGI."""
+        cabeceras = {'HTTP_LAST_EVENT_ID': ultima} if ultima else {}
+        respuesta = self.client.get(reverse('api_estadisticas_en_vivo', args=[self.evento.pk]), **cabeceras)
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+        cuerpo = respuesta.content.decode()
+        self.assertTrue(cuerpo.startswith('retry: 3000\n\n'))
+        mensajes = []
+        for bloque in cuerpo.split('\n\n'):
+            campos = dict(linea.split(': ', 1) for linea in bloque.splitlines())
+            if 'event' in campos:
+                mensajes.append((campos['id'], campos['event'], json.loads(campos['data'])))
+        return mensajes
+
+    def test_vuelta_envia_estado_y_luego_solo_deltas(self):
+        encuesta = self._escribir(self._encuestar, self.votantes[0], self.candidato_a)
+        self._escribir(self._encuestar, self.votantes[1], self.candidato_a)
+        [(version, evento, datos)] = self._mensajes()
+        self.assertEqual(evento, 'estado')
+        self.assertEqual(datos, {'conteos': {str(self.candidato_a.pk): 2}, 'total': 2})
+
+        # Sin cambios desde Last-Event-ID: solo el reintento
+        self.assertEqual(self._mensajes(version), [])
+
+        encuesta.candidato = self.candidato_b
+        self._escribir(encuesta.save)
+        [(nueva, evento, datos)] = self._mensajes(version)
+        self.assertNotEqual(nueva, version)
+        self.assertEqual(evento, 'delta')
+        self.assertEqual(datos, {'deltas': [
+            {'candidato': self.candidato_a.pk, 'votos': -1},
+            {'candidato': self.candidato_b.pk, 'votos': 1},
+        ], 'total': 2})
+
+    def test_last_event_id_desconocido_recibe_el_estado_completo(self):
+        self._escribir(self._encuestar, self.votantes[0], self.candidato_a)
+        for ultima in ('no-existe', '<script>'):
+            [(_, evento, datos)] = self._mensajes(ultima)
+            self.assertEqual(evento, 'estado')
+            self.assertEqual(datos['total'], 1)
+
+
+class ResumenesEncuestasTests(DatosEncuestasMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.ana = User.objects.create_user('ana')
+        cls.beto = User.objects.create_user('beto')
+        departamento = Departamento.objects.create(nombre='Antioquia', codigo='05')
+        cls.municipio = Municipio.objects.create(departamento=departamento, nombre='Medellín', codigo='05001')
+        cls.votantes[0].municipio = cls.municipio
+        cls.votantes[0].save()
+
+    def _por_dia(self):
+        return set(EncuestasPorDia.objects.values_list('encuestador_id', 'municipio_id', 'encuestas'))
+
+    def test_cambio_de_encuestador_mueve_la_encuesta(self):
+        encuesta = self._encuestar(self.votantes[0], self.candidato_a, encuestador=self.ana)
+        self._encuestar(self.votantes[1], self.candidato_a, encuestador=self.ana)
+        self.assertEqual(self._por_dia(), {(self.ana.pk, self.municipio.pk, 1), (self.ana.pk, None, 1)})
+
+        encuesta.encuestador = self.beto
+        encuesta.save()
+        self.assertEqual(self._por_dia(), {(self.ana.pk, self.municipio.pk, 0), (self.ana.pk, None, 1),
+                                           (self.beto.pk, self.municipio.pk, 1)})
+        self.assertEqual(resumenes.encuestas_del_dia(self.ana), 1)
+        self.assertEqual(resumenes.encuestas_del_dia(self.beto), 1)
+
+        encuesta.candidato = self.candidato_b
+        encuesta.save()
+        self.assertEqual(resumenes.encuestas_del_dia(self.beto), 1)
+
+        encuesta.delete()
+        self.assertEqual(resumenes.encuestas_del_dia(self.beto), 0)
+        self.assertEqual(resumenes.diferencias(), [])
+
+    def test_una_sola_fila_por_cubeta_con_encuestador_y_municipio_nulos(self):
+        for votante in self.votantes[1:]:
+            self._encuestar(votante, self.candidato_a)
+        self.assertEqual(self._por_dia(), {(None, None, 2)})
+        self.assertEqual(EncuestasPorHora.objects.get().encuestas, 2)
+
+        fila = EncuestasPorDia.objects.get()
+        for encuestador in (None, self.ana):
+            EncuestasPorDia.objects.create(evento=self.evento, encuestador=encuestador,
+                                           municipio=self.municipio, dia=fila.dia)
+        for encuestador, municipio in ((None, None), (None, self.municipio), (self.ana, self.municipio)):
+            with self.subTest(encuestador=encuestador, municipio=municipio), \
+                    self.assertRaises(IntegrityError), transaction.atomic():
+                EncuestasPorDia.objects.create(evento=self.evento, encuestador=encuestador,
+                                               municipio=municipio, dia=fila.dia)
+
+    def test_escritura_en_bloque_suma_sobre_las_filas_con_nulos(self):
+        inicio = timezone.now().replace(minute=0, second=0, microsecond=0)
+        deltas = {(self.evento.pk, None, None, inicio + timedelta(hours=h)): 1
+                  for h in range(resumenes.UMBRAL_BLOQUE + 2)}
+        resumenes.ajustar(deltas)
+        resumenes.ajustar(deltas)
+        self.assertEqual(EncuestasPorHora.objects.count(), len(deltas))
+        self.assertEqual(set(EncuestasPorHora.objects.values_list('encuestas', flat=True)), {2})
@@ -12,6 +12,7 @@ urlpatterns = [
     path('api/municipios/', views.municipios_por_departamento, name='api_municipios'),
     path('api/puestos/', views.puestos_por_municipio, name='api_puestos'),
     path('api/mesas/', views.mesas_por_puesto, name='api_mesas'),
+    path('api/geografia/<int:departamento_id>/', views.geografia_departamento, name='api_geografia'),
 
     # Votantes
     path('votantes/', views.votante_lista, name='votante_lista'),
@@ -55,6 +56,21 @@ urlpatterns = [
     path('encuestador/', views.encuestador_inicio, name='encuestador_inicio'),
     path('encuestador/votante/<int:pk>/eventos/', views.encuestador_elegir_evento, name='encuestador_elegir_evento'),
     path('encuestador/votante/<int:votante_pk>/evento/<int:evento_pk>/votar/', views.encuestador_registrar_voto, name='encuestador_registrar_voto'),
+    path('api/encuestas/lote/', views.api_encuestas_lote, name='api_encuestas_lote'),
     path('encuestador/estadisticas/', views.encuestador_estadisticas, name='encuestador_estadisticas'),
+    path('encuestador/productividad/', views.encuestador_productividad, name='encuestador_productividad'),
+    path('api/estadisticas/<int:evento_pk>/en-vivo/', views.api_estadisticas_en_vivo, name='api_estadisticas_en_vivo'),
+    path('api/estadisticas/municipios/', views.api_drill_municipios, name='api_drill_municipios'),
+    path('api/estadisticas/mesas/', views.api_drill_mesas, name='api_drill_mesas'),
+    path('api/estadisticas/votantes/', views.api_drill_votantes, name='api_drill_votantes'),
     path('encuestador/mapa-calor/', views.mapa_calor_votantes, name='mapa_calor_votantes'),
+    path('api/mapa-calor/', views.api_mapa_calor, name='api_mapa_calor'),
+    path('encuestador/mapa-calor/tiles/<int:z>/<int:x>/<int:y>/', views.mapa_calor_tesela, name='mapa_calor_tesela'),
+
+    # Exportaciones (streaming, solo staff)
+    path('exportar/encuestas/', views.exportar_encuestas, name='exportar_encuestas'),
+    path('exportar/votantes/', views.exportar_votantes, name='exportar_votantes'),
+
+    # Métricas de rendimiento por vista (solo staff)
+    path('metricas/', views.metricas_vistas, name='metricas_vistas'),
 ]
@@ -1,49 +1,107 @@
+import datetime
+import json
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
-from django.db.models import Q, Count
-from django.core.paginator import Paginator
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse, HttpResponseBadRequest
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.http import require_POST
+from django.db.models import Count, Sum, Min, Max
+from django.db.models.functions import Coalesce
+from django.core.handlers.asgi import ASGIRequest
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.functional import SimpleLazyObject
 from .models import (Votante, Candidato, EventoElectoral, PartidoPolitico,
-                     Departamento, Municipio, PuestoVotacion, MesaVotacion, Encuesta)
+                     Departamento, Municipio, PuestoVotacion, MesaVotacion, Encuesta,
+                     ConteoEncuesta)
 from .forms import (VotanteForm, CandidatoForm, EventoElectoralForm,
-                    PartidoForm, PuestoVotacionForm, MesaVotacionForm, VotanteBuscarForm)
+                    PartidoForm, PuestoVotacionForm, MesaVotacionForm, VotanteBuscarForm,
+                    UbicacionFiltroForm)
+from .paginacion import codificar_cursor, decodificar_cursor, filtro_despues, paginar
+from .replica import lee_de_replica
+from . import (busqueda, cedulas, contadores, en_vivo, estadisticas, exportar, geografia, lote_encuestas,
+               mapa, metricas, resumenes, teselas)
 
 
 # ─── DASHBOARD ───────────────────────────────────────────────────────────────
 
 @login_required
 def dashboard(request):
+    totales = contadores.obtener('votantes', 'candidatos_activos', 'eventos_activos', 'puestos', 'encuestas')
     context = {
-        'total_votantes': Votante.objects.count(),
-        'total_candidatos': Candidato.objects.filter(activo=True).count(),
-        'total_eventos': EventoElectoral.objects.filter(activo=True).count(),
-        'total_puestos': PuestoVotacion.objects.count(),
-        'total_encuestas': Encuesta.objects.count(),
+        'total_votantes': totales['votantes'],
+        'total_candidatos': totales['candidatos_activos'],
+        'total_eventos': totales['eventos_activos'],
+        'total_puestos': totales['puestos'],
+        'total_encuestas': totales['encuestas'],
         'eventos_activos': EventoElectoral.objects.filter(activo=True).order_by('-fecha')[:5],
-        'ultimos_votantes': Votante.objects.order_by('-creado_en')[:5],
+        'ultimos_votantes': Votante.objects.select_related('municipio__departamento').order_by('-creado_en')[:5],
     }
     return render(request, 'votacion/dashboard.html', context)
 
 
 # ─── AJAX: Carga encadenada ───────────────────────────────────────────────────
 
-def municipios_por_departamento(request):
+async def _json_condicional(request, etag, consulta):
+    """JsonResponse con ETag de la versión de geografía; 304 sin consultar si el cliente ya la tiene."""
+    if geografia.coincide(request, etag):
+        respuesta = HttpResponse(status=304)
+    else:
+        respuesta = JsonResponse([fila async for fila in consulta], safe=False)
+    respuesta['ETag'] = etag
+    respuesta['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+
+# Vistas async: bajo ASGI (config.asgi) no ocupan un hilo mientras esperan a la
+# base; bajo WSGI Django las ejecuta igual, en el hilo de la petición.
+
+async def municipios_por_departamento(request):
     dep_id = request.GET.get('departamento_id')
-    data = list(Municipio.objects.filter(departamento_id=dep_id).values('id', 'nombre').order_by('nombre'))
-    return JsonResponse(data, safe=False)
+    etag = await geografia.aetag('m', dep_id)
+    data = Municipio.objects.filter(departamento_id=dep_id).values('id', 'nombre').order_by('nombre')
+    return await _json_condicional(request, etag, data)
 
 
-def puestos_por_municipio(request):
+async def puestos_por_municipio(request):
     mun_id = request.GET.get('municipio_id')
-    data = list(PuestoVotacion.objects.filter(municipio_id=mun_id).values('id', 'nombre', 'direccion').order_by('nombre'))
-    return JsonResponse(data, safe=False)
+    etag = await geografia.aetag('p', mun_id)
+    data = PuestoVotacion.objects.filter(municipio_id=mun_id).values('id', 'nombre', 'direccion').order_by('nombre')
+    return await _json_condicional(request, etag, data)
 
 
-def mesas_por_puesto(request):
+async def mesas_por_puesto(request):
     puesto_id = request.GET.get('puesto_id')
-    data = list(MesaVotacion.objects.filter(puesto_id=puesto_id).values('id', 'numero', 'zona').order_by('numero'))
-    return JsonResponse(data, safe=False)
+    etag = await geografia.aetag('s', puesto_id)
+    data = MesaVotacion.objects.filter(puesto_id=puesto_id).values('id', 'numero', 'zona').order_by('numero')
+    return await _json_condicional(request, etag, data)
+
+
+def geografia_departamento(request, departamento_id):
+    """Municipios, puestos y mesas del departamento en un solo JSON versionado."""
+    etag = geografia.etag('d', departamento_id)
+    if geografia.coincide(request, etag):
+        respuesta = HttpResponse(status=304)
+    else:
+        contenido, comprimido = geografia.paquete(departamento_id)
+        if 'gzip' in request.headers.get('Accept-Encoding', ''):
+            respuesta = HttpResponse(comprimido, content_type='application/json')
+            respuesta['Content-Encoding'] = 'gzip'
+        else:
+            respuesta = HttpResponse(contenido, content_type='application/json')
+    respuesta['ETag'] = etag
+    respuesta['Vary'] = 'Accept-Encoding'
+    if request.GET.get('v') == geografia.version():
+        # La URL lleva la versión: si la geografía cambia, cambia la URL
+        respuesta['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        respuesta['Cache-Control'] = 'public, no-cache'
+    return respuesta
 
 
 # ─── VOTANTES ────────────────────────────────────────────────────────────────
@@ -51,7 +109,9 @@ def mesas_por_puesto(request):
 @login_required
 def votante_lista(request):
     form = VotanteBuscarForm(request.GET)
-    votantes = Votante.objects.select_related('departamento', 'municipio', 'puesto', 'mesa').all()
+    votantes = Votante.objects.select_related(
+        'departamento', 'municipio__departamento', 'puesto__municipio', 'mesa').all()
+    filtrado = buscando = False
 
     if form.is_valid():
         cedula = form.cleaned_data.get('cedula')
@@ -60,21 +120,29 @@ def votante_lista(request):
         municipio = form.cleaned_data.get('municipio')
 
         if cedula:
-            votantes = votantes.filter(cedula__icontains=cedula)
-        if nombre:
-            votantes = votantes.filter(Q(nombres__icontains=nombre) | Q(apellidos__icontains=nombre))
+            # Cédulas guardadas normalizadas: el prefijo usa el índice único
+            votantes = votantes.filter(cedula__startswith=cedulas.normalizar(cedula))
         if departamento:
             votantes = votantes.filter(departamento=departamento)
         if municipio:
             votantes = votantes.filter(municipio=municipio)
-
-    paginator = Paginator(votantes, 20)
-    page_obj = paginator.get_page(request.GET.get('page'))
+        if nombre:
+            votantes = busqueda.filtrar(votantes, nombre)
+            buscando = True
+        filtrado = any((cedula, nombre, departamento, municipio))
+
+    # Sin filtros el total sale del contador en caché, sin COUNT sobre la tabla.
+    # Con búsqueda por nombre se respeta el orden por similitud.
+    page_obj = paginar(
+        votantes, request,
+        campos=None if buscando else ('apellidos', 'nombres', 'id'),
+        total=None if filtrado else contadores.valor('votantes'),
+    )
 
     return render(request, 'votacion/votante_lista.html', {
         'page_obj': page_obj,
         'form': form,
-        'total': votantes.count(),
+        'total': page_obj.total,
     })
 
 
@@ -105,6 +173,7 @@ def votante_crear(request):
         'titulo': 'Registrar Votante',
         'from_encuestador': from_encuestador,
         'departamentos': Departamento.objects.all().order_by('nombre'),
+        'geo_version': geografia.version(),
     })
 
 
@@ -119,7 +188,13 @@ def votante_editar(request, pk):
             return redirect('votante_lista')
     else:
         form = VotanteForm(instance=votante)
-    return render(request, 'votacion/votante_form.html', {'form': form, 'titulo': 'Editar Votante', 'votante': votante})
+    return render(request, 'votacion/votante_form.html', {
+        'form': form,
+        'titulo': 'Editar Votante',
+        'votante': votante,
+        'departamentos': Departamento.objects.all().order_by('nombre'),
+        'geo_version': geografia.version(),
+    })
 
 
 @login_required
@@ -154,8 +229,7 @@ def candidato_lista(request):
     if evento_id:
         candidatos = candidatos.filter(evento_id=evento_id)
 
-    paginator = Paginator(candidatos, 20)
-    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj = paginar(candidatos, request, campos=('evento_id', 'apellidos', 'nombres', 'id'))
 
     return render(request, 'votacion/candidato_lista.html', {
         'page_obj': page_obj,
@@ -313,11 +387,63 @@ def partido_eliminar(request, pk):
 
 # ─── PUESTOS DE VOTACIÓN ──────────────────────────────────────────────────────
 
+def _filtro_ubicacion(request, con_puesto=False):
+    """Formulario de filtro y kwargs (relativos a PuestoVotacion) que aplica."""
+    form = UbicacionFiltroForm(request.GET or None, con_puesto=con_puesto)
+    filtros = {}
+    if form.is_bound:
+        form.is_valid()
+        # Se aplican los niveles válidos aunque un nivel inferior haya quedado
+        # desfasado al cambiar el superior
+        datos = form.cleaned_data
+        if datos.get('departamento'):
+            filtros['municipio__departamento'] = datos['departamento']
+        if datos.get('municipio'):
+            filtros['municipio'] = datos['municipio']
+            if datos.get('puesto'):
+                filtros['id'] = datos['puesto'].id
+    return form, filtros
+
+
+def _limite_json(request):
+    return max(1, min(_id_o_none(request.GET.get('limite')) or 100, 500))
+
+
 @login_required
 def puesto_lista(request):
-    puestos = PuestoVotacion.objects.select_related('municipio__departamento').annotate(
-        num_mesas=Count('mesas')).order_by('municipio__departamento__nombre', 'municipio__nombre', 'nombre')
-    return render(request, 'votacion/puesto_lista.html', {'puestos': puestos})
+    form, filtros = _filtro_ubicacion(request)
+    puestos = PuestoVotacion.objects.select_related('municipio__departamento').filter(**filtros)
+    como_json = request.GET.get('formato') == 'json'
+    page_obj = paginar(
+        puestos, request,
+        campos=('municipio_id', 'nombre', 'id'),
+        por_pagina=_limite_json(request) if como_json else 50,
+        total=None if filtros else contadores.valor('puestos'),
+    )
+    # Mesas por puesto solo para la página visible
+    num_mesas = dict(
+        MesaVotacion.objects.filter(puesto_id__in=[p.id for p in page_obj])
+        .values('puesto_id').annotate(n=Count('id')).values_list('puesto_id', 'n')
+    )
+    for puesto in page_obj:
+        puesto.num_mesas = num_mesas.get(puesto.id, 0)
+
+    if como_json:
+        return JsonResponse({
+            'total': page_obj.total,
+            'anterior': page_obj.anterior,
+            'siguiente': page_obj.siguiente,
+            'puestos': [{
+                'id': p.id,
+                'nombre': p.nombre,
+                'direccion': p.direccion,
+                'codigo': p.codigo,
+                'municipio': p.municipio.nombre,
+                'departamento': p.municipio.departamento.nombre,
+                'num_mesas': p.num_mesas,
+            } for p in page_obj],
+        })
+    return render(request, 'votacion/puesto_lista.html', {'puestos': page_obj, 'page_obj': page_obj, 'form': form})
 
 
 @login_required
@@ -365,9 +491,31 @@ def puesto_eliminar(request, pk):
 
 @login_required
 def mesa_lista(request):
-    mesas = MesaVotacion.objects.select_related('puesto__municipio__departamento').order_by(
-        'puesto__municipio__nombre', 'puesto__nombre', 'numero')
-    return render(request, 'votacion/mesa_lista.html', {'mesas': mesas})
+    form, filtros = _filtro_ubicacion(request, con_puesto=True)
+    mesas = MesaVotacion.objects.select_related('puesto__municipio__departamento').filter(
+        **{f'puesto__{campo}': valor for campo, valor in filtros.items()})
+    como_json = request.GET.get('formato') == 'json'
+    page_obj = paginar(
+        mesas, request,
+        campos=('puesto_id', 'numero', 'id'),
+        por_pagina=_limite_json(request) if como_json else 50,
+    )
+
+    if como_json:
+        return JsonResponse({
+            'total': page_obj.total,
+            'anterior': page_obj.anterior,
+            'siguiente': page_obj.siguiente,
+            'mesas': [{
+                'id': m.id,
+                'numero': m.numero,
+                'zona': m.zona,
+                'puesto': m.puesto.nombre,
+                'municipio': m.puesto.municipio.nombre,
+                'departamento': m.puesto.municipio.departamento.nombre,
+            } for m in page_obj],
+        })
+    return render(request, 'votacion/mesa_lista.html', {'mesas': page_obj, 'page_obj': page_obj, 'form': form})
 
 
 @login_required
@@ -413,18 +561,16 @@ def mesa_eliminar(request, pk):
 
 # ─── CONSULTA PÚBLICA ─────────────────────────────────────────────────────────
 
-def consulta_publica(request):
-    """Vista pública para que ciudadanos consulten su puesto de votación."""
+@lee_de_replica
+async def consulta_publica(request):
+    """Vista pública para que ciudadanos consulten su puesto de votación (async)."""
     resultado = None
     error = None
     if request.method == 'POST':
         cedula = request.POST.get('cedula', '').strip()
         if cedula:
-            try:
-                resultado = Votante.objects.select_related(
-                    'departamento', 'municipio', 'puesto', 'mesa'
-                ).get(cedula=cedula)
-            except Votante.DoesNotExist:
+            resultado = await cedulas.abuscar(cedula)
+            if resultado is None:
                 error = f'No se encontró ningún registro con la cédula {cedula}.'
         else:
             error = 'Por favor ingrese su número de cédula.'
@@ -446,35 +592,31 @@ def encuestador_inicio(request):
         if not cedula:
             error = 'Por favor ingresa un número de cédula.'
         else:
-            try:
-                votante = Votante.objects.get(cedula=cedula)
+            votante = cedulas.buscar(cedula)
+            if votante:
                 # Votante encontrado → elegir evento
-                return redirect('encuestador_elegir_evento', pk=votante.pk)
-            except Votante.DoesNotExist:
-                # No existe → redirigir al registro con cédula pre-llenada
-                return redirect(f'/votantes/nuevo/?cedula={cedula}&from=encuestador')
-
-    # Estadística rápida para motivar al encuestador
-    mis_encuestas_hoy = 0
-    from django.utils import timezone
-    hoy = timezone.now().date()
-    mis_encuestas_hoy = Encuesta.objects.filter(
-        encuestador=request.user,
-        fecha__date=hoy
-    ).count()
+                return redirect('encuestador_elegir_evento', pk=votante['id'])
+            # No existe → redirigir al registro con cédula pre-llenada
+            parametros = urlencode({'cedula': cedulas.normalizar(cedula), 'from': 'encuestador'})
+            return redirect(f"{reverse('votante_crear')}?{parametros}")
+
+    # Estadística rápida para motivar al encuestador: sale del resumen por día
+    # (unas pocas filas por evento y municipio), no de la tabla de encuestas
+    mis_encuestas_hoy = resumenes.encuestas_del_dia(request.user)
 
     return render(request, 'votacion/encuestador/inicio.html', {
         'error': error,
         'cedula': cedula,
         'mis_encuestas_hoy': mis_encuestas_hoy,
-        'total_encuestas': Encuesta.objects.count(),
+        'total_encuestas': contadores.valor('encuestas'),
     })
 
 
 @login_required
 def encuestador_elegir_evento(request, pk):
     """Muestra los eventos activos para que el encuestador elija cuál encuestar."""
-    votante = get_object_or_404(Votante, pk=pk)
+    votante = get_object_or_404(
+        Votante.objects.select_related('departamento', 'municipio', 'puesto', 'mesa'), pk=pk)
     eventos_qs = EventoElectoral.objects.filter(activo=True).annotate(
         num_candidatos=Count('candidatos')
     ).filter(num_candidatos__gt=0)
@@ -544,16 +686,19 @@ def encuestador_registrar_voto(request, votante_pk, evento_pk):
 
 
 @login_required
+@lee_de_replica
 def encuestador_estadisticas(request):
     """Dashboard de resultados de encuestas por evento."""
 
-    eventos = EventoElectoral.objects.filter(activo=True).annotate(
-        total_encuestas=Count('encuestas')
-    ).order_by('-fecha')
+    # Totales desde la tabla materializada ConteoEncuesta (O(candidatos), no O(encuestas))
+    eventos = list(EventoElectoral.objects.filter(activo=True).annotate(
+        total_encuestas=Coalesce(Sum('conteos__votos'), 0)
+    ).order_by('-fecha'))
 
     evento_seleccionado = None
     resultados = []
     total_evento = 0
+    version = None
 
     # Determinar el evento a mostrar:
     # 1) el que viene en ?evento=
@@ -562,113 +707,250 @@ def encuestador_estadisticas(request):
     evento_id = request.GET.get('evento')
     if evento_id:
         evento_seleccionado = get_object_or_404(EventoElectoral, pk=evento_id)
-    elif eventos.exists():
-        evento_seleccionado = eventos.first()
+    elif eventos:
+        evento_seleccionado = eventos[0]
 
     if evento_seleccionado:
-        total_evento = Encuesta.objects.filter(evento=evento_seleccionado).count()
-
-        # ── Resultados agregados por candidato ──────────────────
-        resultados_qs = list(
-            Encuesta.objects
-            .filter(evento=evento_seleccionado)
-            .values(
-                'candidato__id',
-                'candidato__nombres',
-                'candidato__apellidos',
-                'candidato__foto',
-                'candidato__partido__sigla',
-                'candidato__partido__color',
-                'candidato__numero_lista',
-                'candidato__cargo_aspirado',
-            )
-            .annotate(votos=Count('id'))
-            .order_by('-votos')
-        )
-
-        for r in resultados_qs:
-            r['porcentaje'] = round((r['votos'] / total_evento * 100), 1) if total_evento > 0 else 0
-
-        # ── Drill-down: detalle por municipio para cada candidato ─
-        from collections import defaultdict
-
-        encuestas_detalle = (
-            Encuesta.objects
-            .filter(evento=evento_seleccionado)
-            .select_related(
-                'votante', 'votante__municipio', 'votante__departamento',
-                'votante__puesto', 'votante__mesa', 'candidato'
-            )
-            .order_by(
-                'candidato__id',
-                'votante__municipio__nombre',
-                'votante__puesto__nombre',
-                'votante__mesa__numero',
-                'votante__apellidos'
-            )
-        )
-
-        # drill[candidato_id] = lista de municipios con sus mesas y votantes
-        # Usamos estructura: { cid: { mun_label: { mesa_label: [votantes] } } }
-        raw = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
-
-        for enc in encuestas_detalle:
-            cid = enc.candidato_id
-            v = enc.votante
-            mun  = v.municipio.nombre if v.municipio else 'Sin municipio'
-            dep  = v.departamento.nombre if v.departamento else ''
-            mun_label  = f'{mun} ({dep})' if dep else mun
-            puesto     = v.puesto.nombre if v.puesto else 'Sin puesto'
-            mesa_num   = f'Mesa {v.mesa.numero}' if v.mesa else 'Sin mesa'
-            mesa_label = f'{puesto} — {mesa_num}'
-            raw[cid][mun_label][mesa_label].append({
-                'nombre': v.nombre_completo,
-                'cedula': v.cedula,
-            })
-
-        # Convertir a estructura serializable para el template
-        # Lista de candidatos con su detalle, en el mismo orden que resultados_qs
-        drill_list = []
-        for r in resultados_qs:
-            cid = r['candidato__id']
-            municipios = []
-            for mun_label, mesas in raw.get(cid, {}).items():
-                mesas_list = []
-                for mesa_label, votantes in mesas.items():
-                    mesas_list.append({
-                        'mesa': mesa_label,
-                        'votantes': votantes,
-                        'total': len(votantes),
-                    })
-                municipios.append({
-                    'municipio': mun_label,
-                    'mesas': mesas_list,
-                    'total': sum(m['total'] for m in mesas_list),
-                })
-            drill_list.append(municipios)
-
-        # Combinar resultados con su drill-down en el mismo índice
-        resultados = []
-        for r, drill in zip(resultados_qs, drill_list):
-            r['drill'] = drill
-            resultados.append(r)
+        # El fragmento de resultados se guarda en caché bajo la versión del
+        # evento (votacion/estadisticas.py); las consultas solo corren si
+        # el template lo renderiza de nuevo.
+        version = estadisticas.version(evento_seleccionado.pk)
+        resultados = SimpleLazyObject(lambda: _resultados_evento(evento_seleccionado))
+        total_evento = SimpleLazyObject(lambda: sum(r['votos'] for r in resultados))
 
     return render(request, 'votacion/encuestador/estadisticas.html', {
         'eventos': eventos,
         'evento_seleccionado': evento_seleccionado,
         'resultados': resultados,
         'total_evento': total_evento,
+        'version_estadisticas': version,
+        'cache_ttl': settings.ESTADISTICAS_CACHE_TTL,
     })
 
 
+def _resultados_evento(evento):
+    """Resultados agregados por candidato, con su porcentaje del total."""
+    resultados = list(
+        ConteoEncuesta.objects
+        .filter(evento=evento, votos__gt=0)
+        .values(
+            'votos',
+            'candidato__id',
+            'candidato__nombres',
+            'candidato__apellidos',
+            'candidato__foto',
+            'candidato__partido__sigla',
+            'candidato__partido__color',
+            'candidato__numero_lista',
+            'candidato__cargo_aspirado',
+        )
+        .order_by('-votos', 'candidato__apellidos')
+    )
+    total = sum(r['votos'] for r in resultados)
+    for r in resultados:
+        r['porcentaje'] = round((r['votos'] / total * 100), 1) if total > 0 else 0
+    # El drill-down municipio → mesa → votantes se carga bajo demanda
+    # desde los endpoints api/estadisticas/* (ver más abajo).
+    return resultados
+
+
+@login_required
+def api_estadisticas_en_vivo(request, evento_pk):
+    """Server-Sent Events con los cambios de conteo del evento (ver votacion/en_vivo.py).
+
+    Bajo ASGI la conexión queda abierta y recibe cada delta; bajo WSGI se
+    responde lo ocurrido desde Last-Event-ID y el navegador reconecta.
+    """
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(en_vivo.flujo(evento_pk), content_type='text/event-stream')
+    else:
+        response = HttpResponse(en_vivo.vuelta(evento_pk, request.headers.get('Last-Event-ID')),
+                                content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# ── ESTADÍSTICAS: DRILL-DOWN BAJO DEMANDA (JSON) ──────────────────
+# Cada nivel se agrega en la base de datos con GROUP BY y solo se pide
+# cuando el usuario expande el nodo: candidato → municipios → mesas → votantes.
+# Un id vacío en municipio/puesto/mesa significa "sin asignar" (NULL).
+
+def _id_o_none(valor):
+    try:
+        valor = int(valor) if valor not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+    # Fuera de 64 bits la base de datos rechaza el parámetro (OverflowError en SQLite)
+    return valor if valor is None or abs(valor) < 2 ** 63 else None
+
+
+def _encuestas_drill(request):
+    """Encuestas del evento/candidato pedidos, filtradas por los niveles ya abiertos."""
+    qs = Encuesta.objects.filter(
+        evento_id=_id_o_none(request.GET.get('evento')),
+        candidato_id=_id_o_none(request.GET.get('candidato')),
+    )
+    for nivel in ('municipio', 'puesto', 'mesa'):
+        if nivel in request.GET:
+            valor = _id_o_none(request.GET[nivel])
+            if valor is None:
+                qs = qs.filter(**{f'votante__{nivel}__isnull': True})
+            else:
+                qs = qs.filter(**{f'votante__{nivel}_id': valor})
+    return qs.order_by()
+
+
+@login_required
+@lee_de_replica
+@estadisticas.en_cache
+def api_drill_municipios(request):
+    filas = (
+        _encuestas_drill(request)
+        .values('votante__municipio_id', 'votante__municipio__nombre',
+                'votante__municipio__departamento__nombre')
+        .annotate(votos=Count('id'))
+        .order_by('votante__municipio__nombre')
+    )
+    data = []
+    for f in filas:
+        nombre = f['votante__municipio__nombre'] or 'Sin municipio'
+        dep = f['votante__municipio__departamento__nombre']
+        data.append({
+            'municipio': f['votante__municipio_id'],
+            'etiqueta': f'{nombre} ({dep})' if dep else nombre,
+            'votos': f['votos'],
+        })
+    return JsonResponse(data, safe=False)
+
+
+@login_required
+@lee_de_replica
+@estadisticas.en_cache
+def api_drill_mesas(request):
+    filas = (
+        _encuestas_drill(request)
+        .values('votante__puesto_id', 'votante__puesto__nombre',
+                'votante__mesa_id', 'votante__mesa__numero')
+        .annotate(votos=Count('id'))
+        .order_by('votante__puesto__nombre', 'votante__mesa__numero')
+    )
+    data = []
+    for f in filas:
+        puesto = f['votante__puesto__nombre'] or 'Sin puesto'
+        mesa = f'Mesa {f["votante__mesa__numero"]}' if f['votante__mesa_id'] else 'Sin mesa'
+        data.append({
+            'puesto': f['votante__puesto_id'],
+            'mesa': f['votante__mesa_id'],
+            'etiqueta': f'{puesto} — {mesa}',
+            'votos': f['votos'],
+        })
+    return JsonResponse(data, safe=False)
+
+
+@login_required
+@lee_de_replica
+@estadisticas.en_cache
+def api_drill_votantes(request):
+    """Página de votantes de una mesa, ordenada por (apellidos, nombres, id) con cursor."""
+    campos = ('votante__apellidos', 'votante__nombres', 'votante_id')
+    limite = max(1, min(_id_o_none(request.GET.get('limite')) or 50, 200))
+    qs = _encuestas_drill(request).order_by(*campos)
+    cursor = decodificar_cursor(request.GET.get('despues'), (str, str, int))
+    if cursor:
+        qs = qs.filter(filtro_despues(campos, cursor))
+    filas = list(qs.values_list(*campos, 'votante__cedula')[:limite + 1])
+    siguiente = codificar_cursor(filas[limite - 1][:3]) if len(filas) > limite else None
+    return JsonResponse({
+        'votantes': [
+            {'nombre': f'{nombres} {apellidos}', 'cedula': cedula}
+            for apellidos, nombres, _, cedula in filas[:limite]
+        ],
+        'siguiente': siguiente,
+    })
+
+
+# ── PRODUCTIVIDAD POR ENCUESTADOR / MUNICIPIO ─────────────────────
+# Lee los resúmenes EncuestasPorDia / EncuestasPorHora (votacion/resumenes.py):
+# el costo depende de las filas del rango, no del total de encuestas.
+
+@staff_member_required
+@lee_de_replica
+def encuestador_productividad(request):
+    """Encuestas por encuestador o municipio, por día (?dias=) o por hora de un ?dia=."""
+    por = request.GET.get('por') if request.GET.get('por') in resumenes.AGRUPACIONES else 'encuestador'
+    cada = 'hora' if request.GET.get('cada') == 'hora' else 'dia'
+    evento_id = _id_o_none(request.GET.get('evento'))
+    hoy = timezone.localdate()
+    dias = min(max(_id_o_none(request.GET.get('dias')) or 14, 1), 90)
+    dia = parse_date(request.GET.get('dia') or '') or hoy
+    if cada == 'dia':
+        desde, hasta = hoy - datetime.timedelta(days=dias - 1), hoy
+    else:
+        desde = timezone.make_aware(datetime.datetime.combine(dia, datetime.time()))
+        hasta = desde + datetime.timedelta(hours=23)
+    datos = resumenes.productividad(por, cada, desde, hasta, evento_id)
+
+    if request.GET.get('formato') == 'json':
+        return JsonResponse({
+            'por': por, 'cada': cada,
+            'columnas': [c.isoformat() for c in datos['columnas']],
+            'filas': datos['filas'],
+        })
+    maximo = max((v for f in datos['filas'] for v in f['valores']), default=0)
+    for fila in datos['filas']:
+        fila['celdas'] = [(v, round(v / maximo, 2) if maximo else 0) for v in fila['valores']]
+        fila['curva'] = _curva(fila['valores'])
+    return render(request, 'votacion/encuestador/productividad.html', {
+        'datos': datos,
+        'por': por,
+        'cada': cada,
+        'dias': dias,
+        'dia': dia,
+        'evento_id': evento_id,
+        'eventos': EventoElectoral.objects.order_by('-fecha').values_list('pk', 'nombre'),
+        'opciones_dias': (7, 14, 30, 90),
+    })
+
+
+def _curva(valores, ancho=120, alto=24):
+    """Puntos de un polyline SVG con la forma de la serie (escala propia de la fila)."""
+    maximo = max(valores, default=0) or 1
+    paso = ancho / max(len(valores) - 1, 1)
+    return ' '.join(f'{i * paso:.1f},{alto - v / maximo * alto:.1f}' for i, v in enumerate(valores))
+
+
+# ── ENCUESTAS POR LOTE (JSON) ─────────────────────────────────────
+
+@login_required
+@require_POST
+def api_encuestas_lote(request):
+    """Registra un lote de encuestas con claves de idempotencia (ver votacion/lote_encuestas.py).
+
+    Cuerpo: {"encuestas": [{"clave", "cedula", "evento", "candidato", "observacion"}]},
+    opcionalmente con Content-Encoding: gzip. Requiere el token CSRF (X-CSRFToken).
+    """
+    try:
+        cuerpo = lote_encuestas.leer_cuerpo(request)
+        resultados = lote_encuestas.registrar(request.user, cuerpo.get('encuestas'))
+    except lote_encuestas.ErrorLote as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    resumen = {estado: 0 for estado in ('creada', 'actualizada', 'repetida', 'rechazada')}
+    for resultado in resultados:
+        resumen[resultado['estado']] += 1
+    return JsonResponse({'resumen': resumen, 'resultados': resultados})
+
+
 # ── MAPA DE CALOR DE VOTANTES ─────────────────────────────────────
 
 @login_required
+@lee_de_replica
 def mapa_calor_votantes(request):
-    """Mapa de calor de votantes según su dirección de residencia."""
-    from django.core.serializers.json import DjangoJSONEncoder
-    import json
+    """Mapa de calor de votantes según su dirección de residencia.
 
+    La página solo lleva los filtros y la extensión de los puntos; los datos
+    del área visible se piden a `api_mapa_calor` (celdas agregadas o puntos).
+    """
     # Filtros opcionales
     evento_id    = request.GET.get('evento')
     candidato_id = request.GET.get('candidato')
@@ -681,45 +963,122 @@ def mapa_calor_votantes(request):
     if evento_id:
         evento_sel = get_object_or_404(EventoElectoral, pk=evento_id)
         candidatos = Candidato.objects.filter(evento=evento_sel, activo=True)
-
-    # Construir queryset de votantes con coordenadas
-    votantes_qs = Votante.objects.filter(
-        latitud__isnull=False,
-        longitud__isnull=False
-    ).select_related('municipio', 'departamento')
-
-    # Si hay filtro de candidato, solo mostrar votantes que lo encuestaron
-    if candidato_id and evento_id:
-        candidato_sel = get_object_or_404(Candidato, pk=candidato_id)
-        ids_votantes = Encuesta.objects.filter(
-            candidato_id=candidato_id
-        ).values_list('votante_id', flat=True)
-        votantes_qs = votantes_qs.filter(pk__in=ids_votantes)
-    elif evento_id:
-        # Todos los votantes encuestados en ese evento
-        ids_votantes = Encuesta.objects.filter(
-            evento_id=evento_id
-        ).values_list('votante_id', flat=True)
-        votantes_qs = votantes_qs.filter(pk__in=ids_votantes)
-
-    # Serializar puntos para el mapa
-    puntos = []
-    for v in votantes_qs:
-        puntos.append({
-            'lat':    float(v.latitud),
-            'lng':    float(v.longitud),
-            'nombre': v.nombre_completo,
-            'cedula': v.cedula,
-            'mun':    v.municipio.nombre if v.municipio else '',
-            'dir':    v.direccion or '',
-        })
+        if candidato_id:
+            candidato_sel = get_object_or_404(Candidato, pk=candidato_id)
+
+    # Total y extensión en una sola consulta agregada
+    extension = mapa.votantes_geo(
+        evento_sel.pk if evento_sel else None,
+        candidato_sel.pk if candidato_sel else None,
+    ).aggregate(
+        total=Count('id'),
+        sur=Min('latitud'), norte=Max('latitud'),
+        oeste=Min('longitud'), este=Max('longitud'),
+    )
+    total_puntos = extension.pop('total')
 
     return render(request, 'votacion/encuestador/mapa_calor.html', {
-        'puntos_json':    json.dumps(puntos, cls=DjangoJSONEncoder),
-        'total_puntos':   len(puntos),
+        'extension_json': json.dumps({k: float(v) for k, v in extension.items() if v is not None}),
+        'total_puntos':   total_puntos,
+        'usar_teselas':   total_puntos > mapa.UMBRAL_PUNTOS,
+        'umbral_puntos':  mapa.UMBRAL_PUNTOS,
         'eventos':        eventos,
         'candidatos':     candidatos,
         'evento_sel':     evento_sel,
         'candidato_sel':  candidato_sel,
-        'total_votantes_geo': Votante.objects.filter(latitud__isnull=False).count(),
+        'total_votantes_geo': contadores.valor('votantes_geo'),
+    })
+
+
+@login_required
+@lee_de_replica
+def api_mapa_calor(request):
+    """Datos del recuadro visible: ?bbox=oeste,sur,este,norte&z=zoom&evento=&candidato="""
+    bbox = mapa.parsear_bbox(request.GET.get('bbox'))
+    if bbox is None:
+        return JsonResponse({'error': 'bbox inválido: se espera oeste,sur,este,norte'}, status=400)
+    evento_id = _id_o_none(request.GET.get('evento'))
+    zoom = _id_o_none(request.GET.get('z'))
+    return JsonResponse(mapa.datos_mapa(
+        evento_id=evento_id,
+        candidato_id=_id_o_none(request.GET.get('candidato')) if evento_id else None,
+        bbox=bbox,
+        zoom=zoom,
+    ))
+
+
+@login_required
+@lee_de_replica
+def mapa_calor_tesela(request, z, x, y):
+    """Tesela de densidad z/x/y (celdas agregadas), servida desde la caché en disco."""
+    if not teselas.tesela_valida(z, x, y):
+        return JsonResponse({'error': 'Tesela fuera de rango'}, status=404)
+    evento_id = _id_o_none(request.GET.get('evento'))
+    candidato_id = _id_o_none(request.GET.get('candidato')) if evento_id else None
+    contenido, version = teselas.obtener(z, x, y, evento_id, candidato_id)
+    etag = f'"t{z}-{x}-{y}-e{evento_id or 0}-c{candidato_id or 0}-v{version}"'
+    if request.headers.get('If-None-Match') == etag:
+        respuesta = HttpResponse(status=304)
+    else:
+        respuesta = HttpResponse(contenido, content_type='application/json')
+    respuesta['ETag'] = etag
+    respuesta['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+
+# ── EXPORTACIÓN EN STREAMING ──────────────────────────────────────
+
+def _respuesta_exportacion(formato, nombre, encabezados, filas, titulo):
+    content_type, extension = exportar.FORMATOS[formato]
+    respuesta = StreamingHttpResponse(
+        exportar.generar(formato, encabezados, filas, titulo), content_type=content_type
+    )
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre}.{extension}"'
+    # Evita que un proxy acumule la respuesta completa antes de enviarla
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
+
+
+@staff_member_required
+@lee_de_replica
+def exportar_encuestas(request):
+    formato = request.GET.get('formato', 'csv')
+    if formato not in exportar.FORMATOS:
+        return HttpResponseBadRequest('Formato no soportado')
+    evento_id = _id_o_none(request.GET.get('evento'))
+    encabezados, filas = exportar.filas_encuestas(evento_id)
+    nombre = f'encuestas_evento_{evento_id}' if evento_id else 'encuestas'
+    return _respuesta_exportacion(formato, nombre, encabezados, filas, 'Encuestas')
+
+
+@staff_member_required
+@lee_de_replica
+def exportar_votantes(request):
+    formato = request.GET.get('formato', 'csv')
+    if formato not in exportar.FORMATOS:
+        return HttpResponseBadRequest('Formato no soportado')
+    encabezados, filas = exportar.filas_votantes(
+        departamento_id=_id_o_none(request.GET.get('departamento')),
+        municipio_id=_id_o_none(request.GET.get('municipio')),
+    )
+    return _respuesta_exportacion(formato, 'votantes', encabezados, filas, 'Votantes')
+
+
+# ── MÉTRICAS POR VISTA (solo staff) ───────────────────────────────
+
+@staff_member_required
+def metricas_vistas(request):
+    """Agregados por vista de los últimos ?minutos= frente al mismo lapso anterior."""
+    maximo = max(settings.METRICAS_VENTANA_MINUTOS // 2, 1)
+    minutos = min(max(_id_o_none(request.GET.get('minutos')) or 15, 1), maximo)
+    vistas = metricas.resumen(minutos)
+    pools = metricas.pools()
+    if request.GET.get('formato') == 'json':
+        return JsonResponse({'minutos': minutos, 'vistas': vistas, 'pools': pools})
+    return render(request, 'votacion/metricas.html', {
+        'vistas': vistas,
+        'pools': pools,
+        'minutos': minutos,
+        'opciones_minutos': [m for m in (5, 15, 30, 60) if m <= maximo],
+        'muestreo': settings.METRICAS_MUESTREO,
     })